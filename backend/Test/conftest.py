@@ -0,0 +1,64 @@
+import os
+import secrets
+import tempfile
+
+# Database e store di prova in una cartella temporanea, impostati prima che
+# backend.core.config venga importato dai test
+_tmp = tempfile.mkdtemp(prefix="fitapp-test-")
+_db = os.path.join(_tmp, "fitapp.db")
+os.environ.setdefault("SQLITE_DB_PATH", _db)
+os.environ.setdefault("ASYNC_SQLITE_DB_PATH", f"sqlite+aiosqlite:///{_db}")
+os.environ.setdefault("ASYNC_DATABASE_URL", f"sqlite+aiosqlite:///{_db}")
+os.environ.setdefault("SYNC_DATABASE_URL", f"sqlite:///{_db}")
+os.environ.setdefault("RESPONSE_CACHE_SQLITE_PATH", os.path.join(_tmp, "response_cache.db"))
+os.environ.setdefault("PASSWORD_HASH_ROUNDS", "4")
+
+
+import asyncio  # noqa: E402
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def db_schema():
+    """Tabelle dell'app nel database di prova"""
+    from backend.core.database import async_engine
+    from backend.db_models.base import Base
+    from backend.db_models import (  # noqa: F401
+        collection_version, exercise, refresh_token, revoked_token, trainee_feed, user_models, workout
+    )
+
+    async def create():
+        async with async_engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    asyncio.run(create())
+    return async_engine
+
+
+@pytest.fixture
+def make_user(db_schema):
+    """Crea un utente con il ruolo indicato: User detached con gli attributi già caricati"""
+    from backend.core.database import AsyncSessionLocal
+    from backend.db_models.user_models import User
+
+    async def create(role: str):
+        async with AsyncSessionLocal() as db:
+            user = User(
+                email=f"{secrets.token_hex(4)}@fitapp.dev", hashed_password="x", full_name="Test User", role=role
+            )
+            db.add(user)
+            await db.commit()
+            return user
+
+    return lambda role: asyncio.run(create(role))
+
+
+@pytest.fixture
+def coach(make_user):
+    return make_user("coach")
+
+
+@pytest.fixture
+def trainee(make_user):
+    return make_user("trainee")
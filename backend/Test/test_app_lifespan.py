@@ -0,0 +1,18 @@
+import secrets
+
+from fastapi.testclient import TestClient
+
+from backend.main import create_app
+
+
+def test_password_hashing_survives_a_second_lifespan():
+    # Due lifespan nello stesso processo (es. due TestClient o --profile-startup)
+    for _ in range(2):
+        with TestClient(create_app()) as client:
+            response = client.post("/auth/register", json={
+                "email": f"{secrets.token_hex(4)}@fitapp.dev",
+                "password": "Passw0rd1",
+                "full_name": "Test User",
+                "role": "trainee"
+            })
+            assert response.status_code == 201, response.text
@@ -0,0 +1,124 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import insert
+
+from backend.core.database import AsyncSessionLocal
+from backend.db_models.workout import workout_exercises
+from backend.main import create_app
+from backend.routers.auth import create_access_token
+
+EXERCISES = "/exercises/exercises/"
+WORKOUTS = "/workouts/workouts/"
+FEED = "/trainees/trainees/workouts/"
+COACH_WORKOUTS = "/coaches/coaches/workouts/"
+
+
+@pytest.fixture
+def client(db_schema):
+    with TestClient(create_app()) as client:
+        yield client
+
+
+def _auth(user) -> dict:
+    """Header Authorization con un access token dell'utente"""
+    token = create_access_token({"sub": user.email, "role": user.role, "user_id": str(user.id)})
+    return {"Authorization": f"Bearer {token}"}
+
+
+def _etag(client: TestClient, url: str, headers: dict) -> str:
+    response = client.get(url, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.headers["etag"]
+
+
+def _not_modified(client: TestClient, url: str, headers: dict, etag: str) -> bool:
+    response = client.get(url, headers={**headers, "If-None-Match": etag})
+    assert response.status_code in (200, 304), response.text
+    return response.status_code == 304
+
+
+def test_matching_etag_returns_304(client, coach):
+    coach = _auth(coach)
+    etag = _etag(client, EXERCISES, coach)
+
+    response = client.get(EXERCISES, headers={**coach, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+
+    # Confronto debole e liste di ETag
+    assert _not_modified(client, EXERCISES, coach, f"W/{etag}")
+    assert _not_modified(client, EXERCISES, coach, f'"altro", W/{etag}')
+    assert not _not_modified(client, EXERCISES, coach, '"altro"')
+
+
+def test_etag_depends_on_query_string_and_owner(client, coach, make_user):
+    coach, other_coach = _auth(coach), _auth(make_user("coach"))
+    etag = _etag(client, EXERCISES, coach)
+    assert _etag(client, f"{EXERCISES}?fields=summary", coach) != etag
+    assert _etag(client, f"{EXERCISES}?limit=5", coach) != etag
+    assert _etag(client, EXERCISES, other_coach) != etag
+    # Stessi parametri in ordine diverso: stessa risposta, stesso ETag
+    assert _etag(client, f"{EXERCISES}?limit=5&fields=summary", coach) == \
+        _etag(client, f"{EXERCISES}?fields=summary&limit=5", coach)
+
+
+def test_writes_change_the_etag(client, coach, trainee):
+    trainee_id = trainee.id
+    coach, trainee = _auth(coach), _auth(trainee)
+
+    exercises = _etag(client, EXERCISES, coach)
+    response = client.post(
+        EXERCISES, json={"name": "Panca piana", "difficulty": "beginner", "target_muscles": "petto"}, headers=coach
+    )
+    assert response.status_code == 201, response.text
+    exercise_id = response.json()["id"]
+    assert not _not_modified(client, EXERCISES, coach, exercises)
+
+    workouts = _etag(client, WORKOUTS, coach)
+    response = client.post(COACH_WORKOUTS, json={"name": "Forza A"}, headers=coach)
+    assert response.status_code in (200, 201), response.text
+    workout_id = response.json()["id"]
+    assert not _not_modified(client, WORKOUTS, coach, workouts)
+
+    async def link():
+        async with AsyncSessionLocal() as db:
+            await db.execute(insert(workout_exercises), [{"workout_id": workout_id, "exercise_id": exercise_id}])
+            await db.commit()
+    client.portal.call(link)
+
+    feed = _etag(client, FEED, trainee)
+    response = client.post(
+        f"{COACH_WORKOUTS}assign", json={"workout_id": workout_id, "trainee_id": trainee_id}, headers=coach
+    )
+    assert response.status_code in (200, 201), response.text
+    assert not _not_modified(client, FEED, trainee, feed)
+
+    feed = _etag(client, FEED, trainee)
+    response = client.patch(
+        f"{FEED}{workout_id}/progress",
+        json={"workout_id": workout_id, "trainee_id": trainee_id, "completed": True},
+        headers=trainee
+    )
+    assert response.status_code == 200, response.text
+    assert not _not_modified(client, FEED, trainee, feed)
+
+    exercises, workouts, feed = (
+        _etag(client, EXERCISES, coach), _etag(client, WORKOUTS, coach), _etag(client, FEED, trainee)
+    )
+    response = client.put(
+        f"{EXERCISES}{exercise_id}", json={"name": "Panca inclinata", "difficulty": "advanced"}, headers=coach
+    )
+    assert response.status_code == 200, response.text
+    assert not _not_modified(client, EXERCISES, coach, exercises)
+    assert not _not_modified(client, WORKOUTS, coach, workouts)
+    assert not _not_modified(client, FEED, trainee, feed)
+
+    exercises, workouts, feed = (
+        _etag(client, EXERCISES, coach), _etag(client, WORKOUTS, coach), _etag(client, FEED, trainee)
+    )
+    response = client.delete(f"{EXERCISES}{exercise_id}", headers=coach)
+    assert response.status_code in (200, 204), response.text
+    assert not _not_modified(client, EXERCISES, coach, exercises)
+    assert not _not_modified(client, WORKOUTS, coach, workouts)
+    assert not _not_modified(client, FEED, trainee, feed)
@@ -0,0 +1,17 @@
+from backend.services.exercise_service import _MARK_CLOSE, _MARK_OPEN, _html_highlight, _match_expression
+
+
+def test_highlight_escapes_stored_text_before_marking():
+    marked = f"{_MARK_OPEN}Dip{_MARK_CLOSE} <b>x</b> & <script>alert(1)</script>"
+    assert _html_highlight(marked) == (
+        "<mark>Dip</mark> &lt;b&gt;x&lt;/b&gt; &amp; &lt;script&gt;alert(1)&lt;/script&gt;"
+    )
+
+
+def test_highlight_keeps_missing_snippet():
+    assert _html_highlight(None) is None
+
+
+def test_match_expression_quotes_user_tokens():
+    assert _match_expression('panca" OR "*') == '"panca"* "OR"*'
+    assert _match_expression("???") is None
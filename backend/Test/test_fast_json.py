@@ -0,0 +1,105 @@
+from datetime import datetime
+from typing import List, Optional
+
+import pytest
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+
+from backend.core import fast_json
+from backend.db_models.base import Base
+from backend.db_models.exercise import Exercise
+from backend.db_models.user_models import User
+from backend.db_models.workout import Workout, workout_exercises
+from backend.routers.enums import FieldSet
+from backend.schemas.exercise_schemas import ExerciseOut, ExerciseSummary
+from backend.services.exercise_service import EXERCISE_PROFILES
+from backend.services.workout_service import WORKOUT_PROFILES
+
+pytest.importorskip("orjson")
+
+# (profili, fields, include): tutte le combinazioni servite dalle liste
+PROFILES = [
+    (EXERCISE_PROFILES, FieldSet.SUMMARY, None),
+    (EXERCISE_PROFILES, FieldSet.FULL, None),
+    (EXERCISE_PROFILES, FieldSet.FULL, "coach"),
+    (WORKOUT_PROFILES, FieldSet.SUMMARY, None),
+    (WORKOUT_PROFILES, FieldSet.FULL, None),
+    (WORKOUT_PROFILES, FieldSet.FULL, ""),
+    (WORKOUT_PROFILES, FieldSet.FULL, "coach"),
+    (WORKOUT_PROFILES, FieldSet.FULL, "coach,exercises"),
+]
+
+
+class ExerciseWithNotes(ExerciseOut):
+    """Campi solo dello schema: l'entità non li ha, prendono il default"""
+    notes: Optional[str] = None
+    tags: List[str] = ["forza"]
+
+
+class SummaryWithNotes(ExerciseSummary):
+    notes: Optional[str] = "nessuna"
+
+
+@pytest.fixture(scope="module")
+def session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{
+            "id": 1, "email": "coach@fitapp.dev", "hashed_password": "x", "full_name": "Coach Àlfa", "role": "coach",
+            "created_at": datetime(2024, 3, 1, 8, 30, 0, 123456)
+        }])
+        conn.execute(insert(Exercise), [
+            {
+                "name": f"Esercizio {i} \"virgolette\" è ✓",
+                "description": None if i % 2 else "Descrizione <b>\\n</b>\n\tcon a capo",
+                "difficulty": ("beginner", "intermediate", "advanced")[i % 3],
+                "target_muscles": "petto, tricipiti",
+                "coach_id": 1,
+                "created_at": datetime(2024, 3, 1, 9, i, 0, i * 1000),
+                "updated_at": datetime(2024, 3, 2, 10, 0) if i % 2 else None,
+            }
+            for i in range(6)
+        ])
+        conn.execute(insert(Workout), [
+            {"name": f"Scheda {i}", "description": "Scheda di prova" if i else None, "coach_id": 1,
+             "status": ("DRAFT", "ACTIVE", "ARCHIVED")[i % 3]}
+            for i in range(3)
+        ])
+        conn.execute(insert(workout_exercises), [
+            {"workout_id": i + 1, "exercise_id": (i * 2 + j) % 6 + 1} for i in range(2) for j in range(2)
+        ])
+    with Session(engine) as session:
+        yield session
+    engine.dispose()
+
+
+def _assert_identical(content, schema):
+    assert fast_json.render_trusted(content, schema) == fast_json.render_validated(content, schema)
+
+
+@pytest.mark.parametrize("profiles, fields, include", PROFILES)
+def test_trusted_rendering_is_byte_identical(session, profiles, fields, include):
+    profile = profiles.resolve(fields, include)
+    items = profile.fetch(session.execute(profile.select()))
+    assert items
+
+    _assert_identical(items, List[profile.schema])
+    _assert_identical(profile.page(items, "c2NoZWRh"), profile.page_schema)
+    _assert_identical(profile.page([], None), profile.page_schema)
+
+
+def test_missing_attributes_fall_back_to_defaults(session):
+    # Entità ORM e Row a cui mancano campi dello schema
+    full = EXERCISE_PROFILES.resolve(FieldSet.FULL)
+    entities = full.fetch(session.execute(full.select()))
+    _assert_identical(entities, List[ExerciseWithNotes])
+
+    summary = EXERCISE_PROFILES.summary
+    rows = summary.fetch(session.execute(summary.select()))
+    _assert_identical(rows, List[SummaryWithNotes])
+
+    # Dict (es. risultati della ricerca) e attributi non caricati (letti via getattr)
+    _assert_identical([dict(row._mapping) for row in rows], List[ExerciseSummary])
+    session.expire_all()
+    _assert_identical(entities, List[ExerciseOut])
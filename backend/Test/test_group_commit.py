@@ -0,0 +1,114 @@
+import asyncio
+import sqlite3
+
+from sqlalchemy import text
+
+from backend.core.database import async_engine
+from backend.core.group_commit import GroupCommitWriter
+
+
+def _db_path() -> str:
+    return async_engine.url.database
+
+
+def _committed_names() -> list:
+    # Connessione separata: vede solo ciò che è stato confermato
+    conn = sqlite3.connect(_db_path())
+    try:
+        return [row[0] for row in conn.execute("SELECT name FROM group_commit_probe ORDER BY id")]
+    finally:
+        conn.close()
+
+
+def _insert(name: str, fail: bool = False):
+    async def operation(session):
+        await session.execute(text("INSERT INTO group_commit_probe (name) VALUES (:name)"), {"name": name})
+        if fail:
+            raise ValueError(name)
+        return name
+    return operation
+
+
+async def _reset_probe():
+    async with async_engine.begin() as conn:
+        await conn.exec_driver_sql("CREATE TABLE IF NOT EXISTS group_commit_probe (id INTEGER PRIMARY KEY, name TEXT)")
+        await conn.exec_driver_sql("DELETE FROM group_commit_probe")
+
+
+def test_batch_is_invisible_until_commit():
+    async def scenario():
+        await _reset_probe()
+        seen = []
+
+        async def probe(session):
+            # La prima operazione ha già rilasciato il suo SAVEPOINT
+            seen.append(_committed_names())
+            return "probe"
+
+        writer = GroupCommitWriter(max_batch=10, max_delay_ms=50)
+        writer.start()
+        results = await asyncio.gather(
+            writer.submit(_insert("uno")),
+            writer.submit(probe),
+            writer.submit(_insert("due")),
+        )
+        await writer.stop()
+        return results, seen, writer.batches
+
+    results, seen, batches = asyncio.run(scenario())
+    assert results == ["uno", "probe", "due"]
+    assert seen == [[]]
+    assert batches == 1
+    assert _committed_names() == ["uno", "due"]
+
+
+def test_failed_operation_rolls_back_only_its_savepoint():
+    async def scenario():
+        await _reset_probe()
+        writer = GroupCommitWriter(max_batch=10, max_delay_ms=50)
+        writer.start()
+        results = await asyncio.gather(
+            writer.submit(_insert("uno")),
+            writer.submit(_insert("errore", fail=True)),
+            writer.submit(_insert("due")),
+            return_exceptions=True
+        )
+        await writer.stop()
+        return results
+
+    first, failed, second = asyncio.run(scenario())
+    assert (first, second) == ("uno", "due")
+    assert isinstance(failed, ValueError)
+    assert _committed_names() == ["uno", "due"]
+
+
+def test_stop_resolves_operations_already_taken_from_the_queue():
+    async def scenario():
+        await _reset_probe()
+        writer = GroupCommitWriter(max_batch=10, max_delay_ms=200)
+        writer.start()
+        futures = [asyncio.ensure_future(writer.submit(_insert(f"op{i}"))) for i in range(3)]
+        await asyncio.sleep(0.01)  # il writer ha preso le operazioni e attende il batch
+        await writer.stop()
+        done, pending = await asyncio.wait(futures, timeout=1)
+        return [future.result() for future in futures], pending, writer.running
+
+    results, pending, running = asyncio.run(scenario())
+    assert not pending
+    assert results == ["op0", "op1", "op2"]
+    assert not running
+    assert _committed_names() == ["op0", "op1", "op2"]
+
+
+def test_submit_after_stop_fails_queued_operations():
+    async def scenario():
+        writer = GroupCommitWriter(max_batch=10, max_delay_ms=10)
+        writer.start()
+        await writer.stop()
+        future = asyncio.ensure_future(writer.submit(_insert("tardi")))
+        await asyncio.sleep(0)
+        await writer.stop()
+        return await asyncio.gather(future, return_exceptions=True)
+
+    result, = asyncio.run(scenario())
+    assert isinstance(result, RuntimeError)
@@ -0,0 +1,160 @@
+import asyncio
+
+from sqlalchemy import delete
+
+from backend.core.collection_versions import EXERCISES, bump_versions
+from backend.core.database import AsyncSessionLocal
+from backend.core.muscle_index import MuscleIndex, _CoachIndex, normalize_muscles, replace_exercise_muscles
+from backend.db_models.exercise import Exercise
+
+
+def test_normalize_muscles():
+    assert normalize_muscles("Petto, Tricipiti;  petto / SPALLE anteriori") == [
+        "petto", "tricipiti", "spalle anteriori"
+    ]
+    assert normalize_muscles(None) == []
+
+
+def test_slots_are_reused_without_leaking_bits():
+    index = _CoachIndex(version=0)
+    index.set(10, [1, 2], "beginner")
+    index.set(11, [2], "advanced")
+    index.remove(10)
+    assert index.muscles == {2: 1 << 1}
+    assert index.difficulty == {"advanced": 1 << 1}
+
+    # Il nuovo esercizio prende lo slot liberato, senza ereditarne i muscoli
+    index.set(12, [3], "beginner")
+    assert index.slot_of[12] == 0
+    assert index.ids_of(index.all) == [12, 11]
+    assert index.ids_of(index.muscles[3]) == [12]
+    assert 1 not in index.muscles
+    assert index.ids_of(index.difficulty["beginner"]) == [12]
+
+
+def test_set_again_replaces_muscles_and_difficulty():
+    index = _CoachIndex(version=0)
+    index.set(10, [1, 2], "beginner")
+    index.set(10, [3], "advanced")
+    assert index.muscles == {3: 1}
+    assert index.difficulty == {"advanced": 1}
+    assert index.mask_of([10, 99]) == 1
+
+
+async def _seed_exercises(coach_id: int, exercises: dict) -> dict:
+    """exercises: nome -> (target_muscles, difficulty); restituisce nome -> id"""
+    async with AsyncSessionLocal() as db:
+        ids = {}
+        for name, (muscles, difficulty) in exercises.items():
+            exercise = Exercise(name=name, target_muscles=muscles, difficulty=difficulty, coach_id=coach_id)
+            db.add(exercise)
+            await db.flush()
+            await db.run_sync(replace_exercise_muscles, exercise.id, muscles)
+            ids[name] = exercise.id
+        await db.commit()
+        return ids
+
+
+def test_query_and_or_not(coach):
+    index = MuscleIndex(max_coaches=10)
+
+    async def scenario():
+        coach_id = coach.id
+        ids = await _seed_exercises(coach_id, {
+            "panca": ("Petto, Tricipiti", "beginner"),
+            "dip": ("petto, tricipiti, spalle", "advanced"),
+            "squat": ("Quadricipiti, Glutei", "intermediate"),
+            "french press": ("Tricipiti", "beginner"),
+        })
+        async with AsyncSessionLocal() as db:
+            query = lambda **kw: index.query(db, coach_id, **kw)  # noqa: E731
+            results = {
+                "all": await query(all_of=["petto", "TRICIPITI"]),
+                "any": await query(any_of=["glutei", "spalle"]),
+                "not": await query(all_of=["tricipiti"], none_of=["spalle"]),
+                "difficulty": await query(all_of=["tricipiti"], difficulty="beginner"),
+                "unknown": await query(all_of=["polpacci"]),
+                "unknown_any": await query(any_of=["polpacci"]),
+                "coverage": await index.coverage(db, coach_id, [ids["panca"], ids["squat"]]),
+            }
+        return ids, results
+
+    ids, results = asyncio.run(scenario())
+    assert sorted(results["all"]) == sorted([ids["panca"], ids["dip"]])
+    assert sorted(results["any"]) == sorted([ids["dip"], ids["squat"]])
+    assert sorted(results["not"]) == sorted([ids["panca"], ids["french press"]])
+    assert sorted(results["difficulty"]) == sorted([ids["panca"], ids["french press"]])
+    assert results["unknown"] == []
+    assert results["unknown_any"] == []
+    assert results["coverage"] == {"petto": 1, "tricipiti": 1, "spalle": 0, "quadricipiti": 1, "glutei": 1}
+
+
+def test_writes_update_the_cached_index(coach):
+    index = MuscleIndex(max_coaches=10)
+
+    async def scenario():
+        coach_id = coach.id
+        ids = await _seed_exercises(coach_id, {"panca": ("petto", "beginner"), "squat": ("glutei", "beginner")})
+        async with AsyncSessionLocal() as db:
+            before = await index.query(db, coach_id, all_of=["petto"])
+            # Come i servizi: scrittura e nuova versione nella stessa transazione, indice aggiornato dopo il commit
+            await db.execute(delete(Exercise).where(Exercise.id == ids["panca"]))
+            await db.run_sync(bump_versions, EXERCISES, [coach_id])
+            await db.commit()
+            index.exercise_deleted(coach_id, ids["panca"])
+            after = await index.query(db, coach_id, all_of=["petto"])
+        return ids, before, after, index.loads
+
+    ids, before, after, loads = asyncio.run(scenario())
+    assert before == [ids["panca"]]
+    assert after == []
+    assert loads == 1
+
+
+def test_write_from_another_worker_reloads_the_index(coach):
+    index = MuscleIndex(max_coaches=10)
+
+    async def scenario():
+        coach_id = coach.id
+        ids = await _seed_exercises(coach_id, {"panca": ("petto", "beginner")})
+        async with AsyncSessionLocal() as db:
+            before = await index.query(db, coach_id, all_of=["petto"])
+            # Scrittura di un altro processo: l'indice in memoria non viene avvisato
+            exercise = Exercise(name="croci", target_muscles="petto", difficulty="beginner", coach_id=coach_id)
+            db.add(exercise)
+            await db.flush()
+            await db.run_sync(replace_exercise_muscles, exercise.id, "petto")
+            await db.run_sync(bump_versions, EXERCISES, [coach_id])
+            await db.commit()
+            after = await index.query(db, coach_id, all_of=["petto"])
+            again = await index.query(db, coach_id, all_of=["petto"])
+        return ids, exercise.id, before, after, again, index.loads
+
+    ids, new_id, before, after, again, loads = asyncio.run(scenario())
+    assert before == [ids["panca"]]
+    assert sorted(after) == sorted([ids["panca"], new_id])
+    assert again == after
+    assert loads == 2
+
+
+def test_load_overlapping_a_write_is_not_kept(coach):
+    index = MuscleIndex(max_coaches=10)
+
+    async def scenario():
+        coach_id = coach.id
+        ids = await _seed_exercises(coach_id, {"panca": ("petto", "beginner")})
+
+        async def concurrent_write():
+            # Gira mentre il caricamento dell'indice attende il DB
+            index.exercise_saved(coach_id, ids["panca"], [], "beginner")
+
+        async with AsyncSessionLocal() as db:
+            result, _ = await asyncio.gather(index.query(db, coach_id, all_of=["petto"]), concurrent_write())
+            cached = coach_id in index._coaches
+            await index.query(db, coach_id, all_of=["petto"])
+        return ids, result, cached, index.loads
+
+    ids, result, cached, loads = asyncio.run(scenario())
+    assert result == [ids["panca"]]  # la richiesta in corso usa comunque l'indice caricato
+    assert not cached
+    assert loads == 2
@@ -0,0 +1,66 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select, text
+
+from backend.core.database import AsyncSessionLocal
+from backend.core.pagination import InvalidCursor, db_datetime, decode_cursor, encode_cursor, escape_like
+from backend.db_models.workout import Workout
+from backend.services.workout_service import list_workouts_for_coach
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor("created_at", "2026-01-02 03:04:05", 42)
+    assert "=" not in cursor
+    assert decode_cursor(cursor, 3) == ("created_at", "2026-01-02 03:04:05", 42)
+
+
+@pytest.mark.parametrize("cursor", ["", "not-base64!", encode_cursor(1, 2), "eyJhIjoxfQ", "bnVsbA"])
+def test_invalid_cursors_are_rejected(cursor):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor, 3)
+
+
+def test_db_datetime_matches_sqlite_storage_format():
+    assert db_datetime(datetime(2026, 1, 2, 3, 4, 5)) == "2026-01-02 03:04:05"
+    assert db_datetime(datetime(2026, 1, 2, 3, 4, 5, 120)) == "2026-01-02 03:04:05.000120"
+
+
+def test_escape_like_keeps_wildcards_literal():
+    assert escape_like("50%_a\\") == "50\\%\\_a\\\\%"
+
+
+def test_keyset_pages_cover_every_workout_once(coach):
+    async def scenario():
+        async with AsyncSessionLocal() as db:
+            # created_at come lo scrive il server_default (CURRENT_TIMESTAMP, al secondo):
+            # molti pari merito, risolti dall'id
+            created = ["2026-01-01 12:00:00"] * 5 + ["2026-01-01 12:00:01", "2026-01-02 00:00:00"]
+            await db.execute(
+                text(
+                    "INSERT INTO workouts (name, coach_id, status, created_at) "
+                    "VALUES (:name, :coach_id, 'DRAFT', :created_at)"
+                ),
+                [
+                    {"name": f"Scheda {index}", "coach_id": coach.id, "created_at": created_at}
+                    for index, created_at in enumerate(created)
+                ]
+            )
+            await db.commit()
+
+            expected = [row.id for row in (await db.execute(
+                select(Workout.id).where(Workout.coach_id == coach.id)
+                .order_by(Workout.created_at.desc(), Workout.id.desc())
+            )).all()]
+
+            seen, cursor = [], None
+            while True:
+                page, cursor = await list_workouts_for_coach(db, coach.id, 2, cursor)
+                seen.extend(workout.id for workout in page)
+                if cursor is None:
+                    return expected, seen
+
+    expected, seen = asyncio.run(scenario())
+    assert len(expected) == 7
+    assert seen == expected
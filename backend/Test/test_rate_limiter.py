@@ -0,0 +1,57 @@
+import asyncio
+
+import pytest
+from starlette.requests import Request
+
+from backend.core.config import settings
+from backend.core.rate_limiter import (
+    AuthRateLimiter, MemoryBucketStore, RateLimitExceeded, RateLimiterUnavailable, SQLiteBucketStore
+)
+
+
+def _request(ip: str = "10.0.0.1") -> Request:
+    return Request({"type": "http", "method": "POST", "path": "/auth/login", "headers": [], "client": (ip, 1234)})
+
+
+class LockedStore(MemoryBucketStore):
+    blocking = True
+
+    def take(self, key, capacity, rate):
+        raise RuntimeError("database is locked")
+
+
+@pytest.fixture
+def limits(monkeypatch):
+    monkeypatch.setattr(settings, "AUTH_RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(settings, "AUTH_RATE_LIMIT_IP_BURST", 100)
+    monkeypatch.setattr(settings, "AUTH_RATE_LIMIT_EMAIL_BURST", 2)
+    monkeypatch.setattr(settings, "AUTH_RATE_LIMIT_EMAIL_PER_MINUTE", 1)
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+def test_email_bucket_rejects_after_burst(limits, backend, tmp_path):
+    store = MemoryBucketStore() if backend == "memory" else SQLiteBucketStore(str(tmp_path / "rl.db"))
+    limiter = AuthRateLimiter(store)
+
+    async def attempts():
+        for _ in range(2):
+            await limiter.check(_request(), "login", "Coach@fitapp.dev")
+        await limiter.check(_request(), "login", " coach@fitapp.dev ")
+
+    with pytest.raises(RateLimitExceeded):
+        asyncio.run(attempts())
+    assert limiter.rejected == 1
+
+
+def test_store_errors_fail_open(limits, monkeypatch):
+    monkeypatch.setattr(settings, "AUTH_RATE_LIMIT_FAIL_OPEN", True)
+    limiter = AuthRateLimiter(LockedStore())
+    asyncio.run(limiter.check(_request(), "login", "coach@fitapp.dev"))
+    assert limiter.errors == 1
+
+
+def test_store_errors_fail_closed(limits, monkeypatch):
+    monkeypatch.setattr(settings, "AUTH_RATE_LIMIT_FAIL_OPEN", False)
+    limiter = AuthRateLimiter(LockedStore())
+    with pytest.raises(RateLimiterUnavailable):
+        asyncio.run(limiter.check(_request(), "login", "coach@fitapp.dev"))
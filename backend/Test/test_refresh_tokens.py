@@ -0,0 +1,113 @@
+import asyncio
+import secrets
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from backend.services import auth_service
+from backend.core.database import AsyncSessionLocal, register_sqlite_pragmas, register_sqlite_transactions
+from backend.db_models.refresh_token import RefreshToken
+from backend.services.auth_service import hash_refresh_token, issue_refresh_token, rotate_refresh_token
+
+
+async def _login(user_id: int) -> str:
+    async with AsyncSessionLocal() as db:
+        return await issue_refresh_token(db, user_id)
+
+
+async def _rotate(token: str, session_factory=AsyncSessionLocal):
+    async with session_factory() as db:
+        try:
+            return await rotate_refresh_token(db, token)
+        except HTTPException as e:
+            await db.rollback()
+            return e
+
+
+async def _family_revoked(token: str) -> bool:
+    async with AsyncSessionLocal() as db:
+        family_id = (await db.execute(
+            select(RefreshToken.family_id).where(RefreshToken.token_hash == hash_refresh_token(token))
+        )).scalar_one()
+        active = (await db.execute(
+            select(RefreshToken.id).where(RefreshToken.family_id == family_id, RefreshToken.revoked_at.is_(None))
+        )).all()
+        return not active
+
+
+def test_rotation_and_reuse_detection(trainee):
+    async def scenario():
+        user_id = trainee.id
+        first = await _login(user_id)
+        user, second = await _rotate(first)
+        reused = await _rotate(first)
+        after_reuse = await _rotate(second)
+        return user.id == user_id, second != first, reused, after_reuse, await _family_revoked(second)
+
+    same_user, new_token, reused, after_reuse, family_revoked = asyncio.run(scenario())
+    assert same_user and new_token
+    assert isinstance(reused, HTTPException) and reused.status_code == 401
+    # Dopo il riuso anche il token emesso dalla rotazione è revocato
+    assert isinstance(after_reuse, HTTPException)
+    assert family_revoked
+
+
+def test_concurrent_rotations_of_the_same_token_succeed_once(db_schema, trainee, monkeypatch):
+    # Le due rotazioni si aspettano (al più 0.2 s) prima di emettere il nuovo token:
+    # se il controllo del token non fosse atomico entrambe arriverebbero qui
+    both_checked = asyncio.Event()
+    arrivals = []
+
+    async def issue_after_barrier(db, user_id, family_id=None):
+        arrivals.append(user_id)
+        if len(arrivals) == 2:
+            both_checked.set()
+        try:
+            await asyncio.wait_for(both_checked.wait(), 0.2)
+        except asyncio.TimeoutError:
+            pass
+        return await issue_refresh_token(db, user_id, family_id)
+
+    monkeypatch.setattr(auth_service, "issue_refresh_token", issue_after_barrier)
+
+    # Seconda engine sullo stesso file: un altro worker uvicorn
+    other_engine = create_async_engine(db_schema.url, connect_args={"check_same_thread": False})
+    register_sqlite_pragmas(other_engine.sync_engine)
+    register_sqlite_transactions(other_engine.sync_engine)
+
+    def other_worker():
+        return AsyncSession(other_engine, expire_on_commit=False)
+
+    async def scenario():
+        token = await _login(trainee.id)
+        results = await asyncio.gather(_rotate(token), _rotate(token, other_worker))
+        await other_engine.dispose()
+        return results, await _family_revoked(token)
+
+    results, family_revoked = asyncio.run(scenario())
+    rotated = [result for result in results if not isinstance(result, HTTPException)]
+    rejected = [result for result in results if isinstance(result, HTTPException)]
+    assert len(rotated) == 1 and len(rejected) == 1
+    assert rejected[0].status_code == 401
+    assert len(arrivals) == 1
+    assert family_revoked
+
+
+def test_expired_token_is_rejected(trainee):
+    async def scenario():
+        token = secrets.token_urlsafe(32)
+        async with AsyncSessionLocal() as db:
+            db.add(RefreshToken(
+                user_id=trainee.id,
+                token_hash=hash_refresh_token(token),
+                family_id=secrets.token_hex(16),
+                expires_at=datetime.utcnow() - timedelta(seconds=1)
+            ))
+            await db.commit()
+        return await _rotate(token), await _rotate("unknown")
+
+    expired, unknown = asyncio.run(scenario())
+    assert isinstance(expired, HTTPException) and expired.status_code == 401
+    assert isinstance(unknown, HTTPException) and unknown.status_code == 401
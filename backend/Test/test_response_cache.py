@@ -0,0 +1,151 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.orm import Session
+from starlette.requests import Request
+
+from backend.core.collection_versions import CHANGED_COLLECTIONS
+from backend.core.config import settings
+from backend.core import response_cache as response_cache_module
+from backend.core.response_cache import MemoryResponseStore, ResponseCache, SQLiteResponseStore
+
+TAG = ("workouts:1",)
+OTHER_TAG = ("workouts:2",)
+HEADERS = {"ETag": '"v1"'}
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return MemoryResponseStore(max_bytes=10_000, ttl=60)
+    return SQLiteResponseStore(str(tmp_path / "cache.db"), max_bytes=10_000, ttl=60)
+
+
+def _request(path: str = "/workouts/", headers: dict = None) -> Request:
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": path,
+        "query_string": b"",
+        "headers": [(name.lower().encode(), value.encode()) for name, value in (headers or {}).items()],
+    })
+
+
+def test_put_and_get(store):
+    assert store.put("k", b"[1]", HEADERS, TAG, store.generations(TAG))
+    assert store.get("k") == (b"[1]", HEADERS)
+    assert store.get("missing") is None
+
+
+def test_invalidate_removes_only_tagged_entries(store):
+    store.put("a", b"a", HEADERS, TAG, store.generations(TAG))
+    store.put("b", b"b", HEADERS, OTHER_TAG, store.generations(OTHER_TAG))
+    assert store.invalidate(TAG) == 1
+    assert store.get("a") is None
+    assert store.get("b") == (b"b", HEADERS)
+
+
+def test_put_built_before_an_invalidation_is_discarded(store):
+    # Lettura iniziata prima di una scrittura, put arrivata dopo l'invalidazione
+    generations = store.generations(TAG)
+    store.invalidate(TAG)
+    assert not store.put("k", b"stale", HEADERS, TAG, generations)
+    assert store.get("k") is None
+
+    assert store.put("k", b"fresh", HEADERS, TAG, store.generations(TAG))
+    assert store.get("k") == (b"fresh", HEADERS)
+
+
+def test_eviction_keeps_total_size_under_the_cap(store):
+    body = b"x" * 3_000
+    for index in range(5):
+        store.put(f"k{index}", body, HEADERS, TAG, store.generations(TAG))
+    assert store.stats()["bytes"] <= 10_000
+    assert store.get("k4") == (body, HEADERS)
+    assert store.get("k0") is None
+
+
+def test_sqlite_invalidation_is_shared_between_workers(tmp_path):
+    path = str(tmp_path / "cache.db")
+    worker_a = SQLiteResponseStore(path, max_bytes=10_000, ttl=60)
+    worker_b = SQLiteResponseStore(path, max_bytes=10_000, ttl=60)
+    generations = worker_a.generations(TAG)
+    worker_a.put("k", b"body", HEADERS, TAG, generations)
+    assert worker_b.get("k") == (b"body", HEADERS)
+
+    worker_b.invalidate(TAG)
+    assert worker_a.get("k") is None
+    assert not worker_a.put("k", b"body", HEADERS, TAG, generations)
+
+
+class FailingStore(MemoryResponseStore):
+    blocking = True
+
+    def get(self, key):
+        raise RuntimeError("database is locked")
+
+    def generations(self, tags):
+        raise RuntimeError("database is locked")
+
+    def invalidate(self, tags):
+        raise RuntimeError("database is locked")
+
+
+def test_store_errors_are_cache_misses(monkeypatch):
+    monkeypatch.setattr(settings, "CONDITIONAL_GET_ENABLED", False)
+    cache = ResponseCache(FailingStore(max_bytes=10_000, ttl=60), max_entry_bytes=1_000)
+    user = SimpleNamespace(id=1, role="coach")
+
+    async def build():
+        return [{"id": 1}]
+
+    async def scenario():
+        response = await cache.respond(_request(), None, user, "workouts", build, schema=list)
+        cache.invalidate(TAG)
+        await asyncio.wait(list(cache._pending))
+        return response
+
+    response = asyncio.run(scenario())
+    assert response.status_code == 200
+    assert response.body == b'[{"id":1}]'
+    assert response.headers["X-Cache"] == "MISS"
+    assert cache.errors == 3  # get, generations, invalidate
+
+
+def test_hit_and_not_modified(monkeypatch):
+    monkeypatch.setattr(settings, "CONDITIONAL_GET_ENABLED", False)
+    cache = ResponseCache(MemoryResponseStore(max_bytes=10_000, ttl=60), max_entry_bytes=1_000)
+    user = SimpleNamespace(id=1, role="coach")
+    calls = []
+
+    async def build():
+        calls.append(1)
+        return [{"id": 1}]
+
+    async def scenario():
+        first = await cache.respond(_request(), None, user, "workouts", build, schema=list)
+        second = await cache.respond(_request(), None, user, "workouts", build, schema=list)
+        cache.invalidate(TAG)
+        third = await cache.respond(_request(), None, user, "workouts", build, schema=list)
+        return first, second, third
+
+    first, second, third = asyncio.run(scenario())
+    assert [r.headers["X-Cache"] for r in (first, second, third)] == ["MISS", "HIT", "MISS"]
+    assert len(calls) == 2
+
+
+def test_tags_are_invalidated_on_commit_and_dropped_on_rollback(monkeypatch):
+    invalidated = []
+    monkeypatch.setattr(response_cache_module.response_cache, "invalidate", invalidated.append)
+
+    session = Session()
+    session.begin()
+    session.info[CHANGED_COLLECTIONS] = {"exercises:1"}
+    session.rollback()
+    assert CHANGED_COLLECTIONS not in session.info
+
+    session.begin()
+    session.info[CHANGED_COLLECTIONS] = {"exercises:1"}
+    session.commit()
+    assert invalidated == [{"exercises:1"}]
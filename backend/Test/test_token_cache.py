@@ -0,0 +1,58 @@
+import secrets
+import time
+from datetime import timedelta
+
+import pytest
+from jose.exceptions import ExpiredSignatureError, JWTError
+
+from backend.core.revocation import revocation_list
+from backend.core.token_cache import VerifiedTokenCache, decode_access_token, token_cache
+from backend.routers.auth import create_access_token
+
+
+def _token(**claims) -> str:
+    return create_access_token({"sub": f"{secrets.token_hex(4)}@fitapp.dev", "role": "trainee", **claims})
+
+
+def test_cached_payload_is_not_shared_between_requests():
+    token = _token()
+    first = decode_access_token(token)
+    first["role"] = "coach"
+    second = decode_access_token(token)
+    second["injected"] = True
+
+    assert token_cache.get(token)["role"] == "trainee"
+    assert "injected" not in decode_access_token(token)
+
+
+def test_cached_token_expires_with_its_exp():
+    cache = VerifiedTokenCache(max_size=10)
+    cache.put("token", {"sub": "a", "exp": time.time() + 60})
+    assert cache.get("token")["sub"] == "a"
+
+    cache.put("token", {"sub": "a", "exp": time.time() - 1})
+    with pytest.raises(ExpiredSignatureError):
+        cache.get("token")
+    # Voce scaduta rimossa: la verifica successiva riparte dal JWT
+    assert cache.get("token") is None
+
+
+def test_expired_token_is_rejected_on_a_cache_hit(monkeypatch):
+    token = _token()
+    decode_access_token(token)
+    payload = token_cache.get(token)
+    # Il token scade mentre è in cache
+    monkeypatch.setattr(time, "time", lambda: payload["exp"] + 1)
+    with pytest.raises(ExpiredSignatureError):
+        decode_access_token(token)
+
+
+def test_revoked_jti_is_rejected_on_a_cache_hit():
+    token = create_access_token({"sub": "revoked@fitapp.dev"}, expires_delta=timedelta(minutes=5))
+    payload = decode_access_token(token)
+    hits = token_cache.hits
+
+    revocation_list.add(payload["jti"], payload["exp"])
+    with pytest.raises(JWTError):
+        decode_access_token(token)
+    assert token_cache.hits == hits + 1
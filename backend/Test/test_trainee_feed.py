@@ -0,0 +1,104 @@
+import asyncio
+import json
+
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+
+from backend.core.database import AsyncSessionLocal, async_engine
+from backend.core.trainee_feed import rebuild_all_feeds
+from backend.db_models.exercise import Exercise
+from backend.db_models.workout import Workout, WorkoutAssignment
+from backend.routers.enums import ExerciseDifficulty
+from backend.schemas.exercise_schemas import ExerciseUpdate
+from backend.schemas.workout_schemas import WorkoutOut
+from backend.services.coach_service import assign_workout_to_trainee
+from backend.services.exercise_service import delete_exercise_by_coach, update_exercise_by_coach
+from backend.services.trainee_service import get_trainee_feed
+
+
+async def _seed_workout(coach_id: int) -> tuple:
+    """Scheda del coach con due esercizi, non ancora assegnata: (id scheda, id esercizi)"""
+    async with AsyncSessionLocal() as db:
+        exercises = [
+            Exercise(name="Panca piana", target_muscles="petto", difficulty="beginner", coach_id=coach_id),
+            Exercise(name="Squat", target_muscles="quadricipiti", difficulty="intermediate", coach_id=coach_id),
+        ]
+        workout = Workout(name="Forza A", coach_id=coach_id, exercises=exercises)
+        db.add(workout)
+        await db.commit()
+        return workout.id, [exercise.id for exercise in exercises]
+
+
+async def _feed(trainee_id: int) -> list:
+    async with AsyncSessionLocal() as db:
+        return json.loads(await get_trainee_feed(db, trainee_id))
+
+
+async def _live(trainee_id: int) -> list:
+    """Le stesse schede lette dalle tabelle, come le costruiva la query prima del feed"""
+    async with AsyncSessionLocal() as db:
+        workouts = (await db.scalars(
+            select(Workout)
+            .join(WorkoutAssignment, WorkoutAssignment.workout_id == Workout.id)
+            .where(WorkoutAssignment.user_id == trainee_id)
+            .options(selectinload(Workout.exercises))
+            .order_by(WorkoutAssignment.assigned_at.desc(), Workout.id.desc())
+        )).all()
+        result = []
+        for workout in workouts:
+            data = WorkoutOut.model_validate(workout).model_dump(mode="json")
+            data["exercises"].sort(key=lambda exercise: exercise["id"])
+            result.append(data)
+        return result
+
+
+def test_feed_follows_assign_update_and_delete(coach, trainee):
+    coach_id, trainee_id = coach.id, trainee.id
+
+    async def scenario():
+        workout_id, exercise_ids = await _seed_workout(coach_id)
+        steps = {"before": (await _feed(trainee_id), [])}
+
+        async with AsyncSessionLocal() as db:
+            await assign_workout_to_trainee(db, coach_id, workout_id, trainee_id)
+        steps["assign"] = (await _feed(trainee_id), await _live(trainee_id))
+
+        async with AsyncSessionLocal() as db:
+            await update_exercise_by_coach(
+                db, exercise_ids[0], coach_id,
+                ExerciseUpdate(name="Panca inclinata", difficulty=ExerciseDifficulty.ADVANCED)
+            )
+        steps["update"] = (await _feed(trainee_id), await _live(trainee_id))
+
+        async with AsyncSessionLocal() as db:
+            await delete_exercise_by_coach(db, exercise_ids[1], coach_id)
+        steps["delete"] = (await _feed(trainee_id), await _live(trainee_id))
+        return steps
+
+    steps = asyncio.run(scenario())
+    for step, (feed, live) in steps.items():
+        assert feed == live, step
+
+    assert [exercise["name"] for exercise in steps["assign"][0][0]["exercises"]] == ["Panca piana", "Squat"]
+    updated = steps["update"][0][0]["exercises"][0]
+    assert (updated["name"], updated["difficulty"]) == ("Panca inclinata", "advanced")
+    assert [exercise["name"] for exercise in steps["delete"][0][0]["exercises"]] == ["Panca inclinata"]
+
+
+def test_rebuild_all_feeds_matches_live_query(coach, trainee):
+    coach_id, trainee_id = coach.id, trainee.id
+
+    async def scenario():
+        workout_id, _ = await _seed_workout(coach_id)
+        async with AsyncSessionLocal() as db:
+            await assign_workout_to_trainee(db, coach_id, workout_id, trainee_id)
+        expected = await _live(trainee_id)
+
+        async with async_engine.begin() as conn:
+            count = await conn.run_sync(rebuild_all_feeds)
+        return count, expected, await _feed(trainee_id)
+
+    count, expected, feed = asyncio.run(scenario())
+    assert count >= 1
+    assert feed == expected
+    assert len(feed) == 1 and len(feed[0]["exercises"]) == 2
@@ -0,0 +1,37 @@
+import asyncio
+
+from backend.core.database import AsyncSessionLocal
+from backend.core.user_cache import user_cache
+from backend.db_models.user_models import User
+
+
+def _scenario(user_id: int, commit: bool):
+    async def scenario():
+        async with AsyncSessionLocal() as db:
+            user = await db.get(User, user_id)
+            user_cache.put(user)
+
+            user.full_name = "Nuovo Nome"
+            await db.flush()
+            # Flush senza commit: la riga confermata è ancora quella in cache
+            cached_after_flush = user_cache.get_by_id(user_id) is not None
+            if commit:
+                await db.commit()
+            else:
+                await db.rollback()
+            return cached_after_flush, user_cache.get_by_id(user_id), db.info
+    return asyncio.run(scenario())
+
+
+def test_orm_update_invalidates_after_commit(trainee):
+    cached_after_flush, cached, info = _scenario(trainee.id, commit=True)
+    assert cached_after_flush
+    assert cached is None
+    assert not info
+
+
+def test_rolled_back_update_keeps_entry(trainee):
+    cached_after_flush, cached, info = _scenario(trainee.id, commit=False)
+    assert cached_after_flush
+    assert cached is not None and cached.full_name == "Test User"
+    assert not info
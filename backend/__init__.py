@@ -1 +1,10 @@
-from . import main, utils
\ No newline at end of file
+import importlib
+
+__all__ = ['main', 'utils']
+
+
+def __getattr__(name):
+    # Import su richiesta: importare un sottomodulo non deve caricare l'intera app
+    if name in __all__:
+        return importlib.import_module(f".{name}", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
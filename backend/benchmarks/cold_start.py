@@ -0,0 +1,82 @@
+"""
+Benchmark dell'avvio a freddo: ogni misura è un processo Python nuovo che
+importa backend.main, crea l'app con create_app() (import) ed esegue il
+lifespan fino al primo yield (startup).
+Scenari: primo avvio su DB vuoto, riavvio con riflessione completa dello
+schema (SCHEMA_FINGERPRINT_ENABLED=false) e riavvio con impronta invariata.
+
+Uso: python -m backend.benchmarks.cold_start [--runs N]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+CHILD_CODE = """
+import asyncio, json, time
+start = time.perf_counter()
+from backend.main import create_app
+app = create_app()
+imported = time.perf_counter()
+
+async def boot():
+    async with app.router.lifespan_context(app):
+        return time.perf_counter()
+
+ready = asyncio.run(boot())
+print(json.dumps({"import_ms": (imported - start) * 1000, "startup_ms": (ready - imported) * 1000}))
+"""
+
+
+def _boot(db_path: Path, fingerprint: bool) -> dict:
+    env = dict(
+        os.environ,
+        ASYNC_SQLITE_DB_PATH=f"sqlite+aiosqlite:///{db_path}",
+        ASYNC_DATABASE_URL=f"sqlite+aiosqlite:///{db_path}",
+        SYNC_DATABASE_URL=f"sqlite:///{db_path}",
+        SCHEMA_FINGERPRINT_ENABLED=str(fingerprint).lower(),
+        # Round fissi: la calibrazione bcrypt non fa parte di questa misura
+        PASSWORD_HASH_ROUNDS=os.environ.get("PASSWORD_HASH_ROUNDS", "10"),
+        POPULATE_TEST_DATA="false",
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD_CODE],
+        env=env, capture_output=True, text=True, check=True,
+        cwd=Path(__file__).resolve().parents[2]
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def _report(name: str, samples: list) -> None:
+    imports = statistics.median(s["import_ms"] for s in samples)
+    startups = statistics.median(s["startup_ms"] for s in samples)
+    print(f"{name:<28} import {imports:8.1f} ms   startup {startups:8.1f} ms   totale {imports + startups:8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        first_boot = []
+        for run in range(args.runs):
+            first_boot.append(_boot(Path(tmp) / f"fresh_{run}.db", fingerprint=True))
+
+        db_path = Path(tmp) / "bench.db"
+        _boot(db_path, fingerprint=True)
+        reflection = [_boot(db_path, fingerprint=False) for _ in range(args.runs)]
+        fingerprint = [_boot(db_path, fingerprint=True) for _ in range(args.runs)]
+
+    print(f"Mediana su {args.runs} avvii per scenario")
+    _report("primo avvio (DB vuoto)", first_boot)
+    _report("riavvio, riflessione", reflection)
+    _report("riavvio, impronta schema", fingerprint)
+
+
+if __name__ == "__main__":
+    main()
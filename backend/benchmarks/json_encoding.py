@@ -0,0 +1,123 @@
+"""
+Benchmark della serializzazione delle liste: pagine di 10, 1.000 e 50.000
+elementi lette con i profili di caricamento dell'app da un DB SQLite in memoria.
+Percorsi confrontati:
+- jsonable_encoder: validazione nel modello pydantic, jsonable_encoder e json.dumps
+  (il percorso classico di FastAPI)
+- pydantic: TypeAdapter precostruito, validazione e dump_json (percorso standard)
+- orjson: righe fidate con serializzatore precompilato e orjson (FAST_JSON_ENABLED)
+
+Uso: python -m backend.benchmarks.json_encoding [--sizes 10 1000 50000] [--runs N]
+"""
+import argparse
+import json
+import statistics
+import time
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+
+from backend.core import fast_json
+from backend.db_models.base import Base
+from backend.db_models.exercise import Exercise
+from backend.db_models.user_models import User
+from backend.db_models.workout import Workout, workout_exercises
+from backend.routers.enums import FieldSet
+from backend.services.exercise_service import EXERCISE_PROFILES
+from backend.services.workout_service import WORKOUT_PROFILES
+
+EXERCISES_PER_WORKOUT = 3
+
+# Nome -> (profilo, righe da leggere)
+DATASETS = {
+    "esercizi (full)": lambda: EXERCISE_PROFILES.resolve(FieldSet.FULL),
+    "esercizi (summary)": lambda: EXERCISE_PROFILES.resolve(FieldSet.SUMMARY),
+    "schede + esercizi": lambda: WORKOUT_PROFILES.resolve(FieldSet.FULL),
+}
+
+
+def _populate(engine, rows: int) -> None:
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{
+            "id": 1, "email": "coach@fitapp.dev", "hashed_password": "x", "full_name": "Coach", "role": "coach"
+        }])
+        conn.execute(insert(Exercise), [
+            {
+                "name": f"Esercizio {i}",
+                "description": "Descrizione dell'esercizio " * 4,
+                "difficulty": ("beginner", "intermediate", "advanced")[i % 3],
+                "target_muscles": "petto, tricipiti",
+                "coach_id": 1,
+            }
+            for i in range(rows)
+        ])
+        conn.execute(insert(Workout), [
+            {"name": f"Scheda {i}", "description": "Scheda di prova", "coach_id": 1} for i in range(rows)
+        ])
+        conn.execute(insert(workout_exercises), [
+            {"workout_id": i + 1, "exercise_id": (i * EXERCISES_PER_WORKOUT + j) % rows + 1}
+            for i in range(rows) for j in range(EXERCISES_PER_WORKOUT)
+        ])
+
+
+def _jsonable_encoder(content, schema) -> bytes:
+    model = fast_json.type_adapter(schema).validate_python(content, from_attributes=True)
+    return JSONResponse(jsonable_encoder(model)).body
+
+
+PATHS = {
+    "jsonable_encoder": _jsonable_encoder,
+    "pydantic": fast_json.render_validated,
+    "orjson": fast_json.render_trusted,
+}
+
+
+def _measure(render, content, schema, runs: int) -> float:
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        render(content, schema)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 50000])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    if fast_json.orjson is None:
+        raise SystemExit("orjson non installato: pip install orjson")
+
+    engine = create_engine("sqlite://")
+    _populate(engine, max(args.sizes))
+
+    print(f"Mediana su {args.runs} serializzazioni, ms (speedup di orjson rispetto a jsonable_encoder)")
+    with Session(engine) as session:
+        for name, resolve in DATASETS.items():
+            profile = resolve()
+            for size in args.sizes:
+                items = profile.fetch(session.execute(profile.select().order_by(profile.model.id).limit(size)))
+                content = profile.page(items, None)
+                schema = profile.page_schema
+
+                # Stesso JSON da tutti i percorsi; orjson e pydantic producono gli stessi byte
+                outputs = {path: render(content, schema) for path, render in PATHS.items()}
+                assert outputs["orjson"] == outputs["pydantic"], name
+                assert json.loads(outputs["jsonable_encoder"]) == json.loads(outputs["pydantic"]), name
+
+                timings = {path: _measure(render, content, schema, args.runs) for path, render in PATHS.items()}
+                print(
+                    f"{name:<20} {size:>6} elementi   "
+                    + "   ".join(f"{path} {ms:9.2f}" for path, ms in timings.items())
+                    + f"   (x{timings['jsonable_encoder'] / timings['orjson']:.1f})"
+                )
+                session.expunge_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Benchmark del profilo di pragma SQLite: throughput di scrittura (una
+transazione per insert, come le richieste API) e di lettura concorrente
+(point query da più thread) con i pragma di default e con Settings.sqlite_pragmas.
+
+Uso: python -m backend.benchmarks.sqlite_pragmas [--writes N] [--reads N] [--threads N]
+"""
+import argparse
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from backend.core.config import settings
+from backend.core.database import apply_sqlite_pragmas
+
+
+def _connect(path: Path, tuned: bool) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, check_same_thread=False)
+    if tuned:
+        apply_sqlite_pragmas(conn)
+    return conn
+
+
+def bench_writes(path: Path, tuned: bool, count: int) -> float:
+    conn = _connect(path, tuned)
+    conn.execute(
+        "CREATE TABLE workouts (id INTEGER PRIMARY KEY, coach_id INTEGER, name TEXT, description TEXT)"
+    )
+    conn.commit()
+    start = time.perf_counter()
+    for i in range(count):
+        conn.execute(
+            "INSERT INTO workouts (coach_id, name, description) VALUES (?, ?, ?)",
+            (i % 50, f"Workout {i}", "x" * 200)
+        )
+        conn.commit()
+    elapsed = time.perf_counter() - start
+    conn.close()
+    return count / elapsed
+
+
+def bench_reads(path: Path, tuned: bool, count: int, threads: int, rows: int) -> float:
+    per_thread = count // threads
+
+    def worker(seed: int):
+        conn = _connect(path, tuned)
+        for i in range(per_thread):
+            conn.execute("SELECT * FROM workouts WHERE id = ?", ((seed + i * 7919) % rows + 1,)).fetchone()
+        conn.close()
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return per_thread * threads / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--writes", type=int, default=2000)
+    parser.add_argument("--reads", type=int, default=200000)
+    parser.add_argument("--threads", type=int, default=4)
+    args = parser.parse_args()
+
+    print(f"Profilo: {settings.sqlite_pragmas}")
+    print(f"{'profilo':<10}{'write/s':>12}{'read/s':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, tuned in (("default", False), ("tuned", True)):
+            path = Path(tmp) / f"{label}.db"
+            writes = bench_writes(path, tuned, args.writes)
+            reads = bench_reads(path, tuned, args.reads, args.threads, args.writes)
+            print(f"{label:<10}{writes:>12.0f}{reads:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1 +1,9 @@
-from . import auth_dependencies, config, dependencies, database, logger, security
+import importlib
+
+__all__ = ['auth_dependencies', 'config', 'dependencies', 'database', 'logger', 'security']
+
+
+def __getattr__(name):
+    if name in __all__:
+        return importlib.import_module(f".{name}", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,12 +1,11 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.future import select
-from jose import JWTError, jwt
 from pydantic import BaseModel
 from typing import Optional
-from backend.core.config import settings
+from backend.core.token_middleware import TokenValidationError, resolve_principal
 from backend.core.database import get_db
+from backend.core.user_cache import get_user_by_email_cached
 from backend.db_models.user_models import User as UserModel, UserRole
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
@@ -15,7 +14,7 @@ class TokenData(BaseModel):
     email: Optional[str] = None
 
 async def get_current_user(
-    token: str = Depends(oauth2_scheme),
+    request: Request,
     db: AsyncSession = Depends(get_db),
 ) -> UserModel:
     credentials_exception = HTTPException(
@@ -25,15 +24,14 @@ async def get_current_user(
     )
 
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
-    except JWTError:
+        payload = resolve_principal(request)
+    except TokenValidationError:
+        raise credentials_exception
+    email: str = payload.get("sub")
+    if email is None:
         raise credentials_exception
 
-    result = await db.execute(select(UserModel).where(UserModel.email == email))
-    user = result.scalar_one_or_none()
+    user = await get_user_by_email_cached(db, email)
     if user is None:
         raise credentials_exception
 
@@ -48,10 +46,10 @@ async def get_current_active_user(current_user: UserModel = Depends(get_current_
     return current_user
 
 async def get_current_coach(
-    token: str = Depends(oauth2_scheme),
+    request: Request,
     db: AsyncSession = Depends(get_db)
 ) -> UserModel:
-    user = await get_current_user(token, db)
+    user = await get_current_user(request, db)
     if user.role != "coach":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
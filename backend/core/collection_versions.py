@@ -0,0 +1,133 @@
+"""
+GET condizionali per le liste (ETag / If-None-Match).
+
+Ogni collezione di un utente ha un contatore di versione in collection_versions,
+incrementato dai servizi nella stessa transazione della scrittura. L'ETag di una
+risposta è l'hash di (collezione, utente, versione, path e query string): se il
+client presenta lo stesso ETag la richiesta termina con 304 dopo una lettura per
+chiave primaria, senza caricare righe ORM né serializzare nulla.
+"""
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Dict, Iterable
+
+from fastapi import HTTPException, Request, Response, status
+from sqlalchemy import func, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from backend.core.config import settings
+from backend.db_models.collection_version import CollectionVersion
+
+WORKOUTS = "workouts"  # schede del coach
+EXERCISES = "exercises"  # libreria esercizi del coach
+TRAINEE = "trainee"  # schede assegnate all'allievo e i loro esercizi
+
+# Collezioni modificate dalla transazione in corso (Session.info): dopo il
+# commit chi ne tiene copie in cache le invalida (backend.core.response_cache)
+CHANGED_COLLECTIONS = "changed_collections"
+
+
+class NotModified(HTTPException):
+    def __init__(self, headers: Dict[str, str]):
+        super().__init__(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+
+def collection_tag(collection: str, owner_id: int) -> str:
+    return f"{collection}:{owner_id}"
+
+
+def bump_versions(conn, collection: str, owner_ids: Iterable[int]) -> None:
+    """
+    Nuova versione delle collezioni indicate. Sincrona: accetta una Connection
+    o una Session (via AsyncSession.run_sync) e resta nella transazione del chiamante.
+    """
+    owner_ids = sorted(set(owner_ids))
+    if not owner_ids:
+        return
+    statement = sqlite_insert(CollectionVersion)
+    conn.execute(
+        statement.on_conflict_do_update(
+            index_elements=[CollectionVersion.collection, CollectionVersion.owner_id],
+            set_={"version": CollectionVersion.version + 1, "updated_at": func.now()}
+        ),
+        [{"collection": collection, "owner_id": owner_id, "version": 1} for owner_id in owner_ids]
+    )
+    if isinstance(conn, Session):
+        conn.info.setdefault(CHANGED_COLLECTIONS, set()).update(
+            collection_tag(collection, owner_id) for owner_id in owner_ids
+        )
+
+
+def _http_date(value: datetime) -> str:
+    # SQLite restituisce CURRENT_TIMESTAMP senza fuso: è UTC
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    # If-None-Match usa il confronto debole: W/"x" equivale a "x"
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+class ConditionalResponse:
+    """Header di validazione da applicare alla risposta 200"""
+
+    __slots__ = ("headers",)
+
+    def __init__(self, headers: Dict[str, str]):
+        self.headers = headers
+
+    def apply(self, response: Response) -> Response:
+        response.headers.update(self.headers)
+        return response
+
+
+async def conditional_get(
+        request: Request,
+        db: AsyncSession,
+        collection: str,
+        owner_id: int
+) -> ConditionalResponse:
+    """
+    Da chiamare prima di leggere i dati: solleva NotModified se If-None-Match
+    coincide con la versione attuale. La versione è letta prima del corpo, quindi
+    una scrittura concorrente può al più rendere l'ETag più vecchio del corpo
+    (il client riceverà di nuovo la lista completa), mai il contrario.
+    """
+    if not settings.CONDITIONAL_GET_ENABLED:
+        return ConditionalResponse({})
+
+    row = (await db.execute(
+        select(CollectionVersion.version, CollectionVersion.updated_at).where(
+            CollectionVersion.collection == collection,
+            CollectionVersion.owner_id == owner_id
+        )
+    )).first()
+    version, updated_at = row if row is not None else (0, None)
+
+    # Stessa versione e stessa query string -> stesso corpo, byte per byte: ETag forte
+    key = "|".join((
+        collection,
+        str(owner_id),
+        str(version),
+        request.url.path,
+        "&".join(f"{name}={value}" for name, value in sorted(request.query_params.multi_items()))
+    ))
+    etag = f'"{hashlib.blake2b(key.encode(), digest_size=16).hexdigest()}"'
+
+    headers = {"ETag": etag, "Cache-Control": settings.CONDITIONAL_GET_CACHE_CONTROL}
+    if updated_at is not None:
+        headers["Last-Modified"] = _http_date(updated_at)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag_matches(if_none_match, etag):
+        raise NotModified(headers)
+    return ConditionalResponse(headers)
@@ -10,9 +10,22 @@ class Settings(BaseSettings):
     ASYNC_DATABASE_URL: str = "sqlite+aiosqlite:///./fitapp.db"
     DB_POOL_SIZE: int = 5
     DB_MAX_OVERFLOW: int = 10
+    SCHEMA_FINGERPRINT_ENABLED: bool = True  # salta la riflessione se lo schema non è cambiato
+    DB_POOL_TIMEOUT: int = 30  # secondi di attesa per una connessione (anche in coda al writer)
     DB_ECHO: bool = False
     DB_CONNECT_ARGS: dict = {"check_same_thread": False}
 
+    # Profilo prestazionale SQLite (applicato a ogni connessione)
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024  # byte
+    SQLITE_CACHE_SIZE: int = -64000  # negativo = KiB (circa 64 MB)
+    SQLITE_TEMP_STORE: str = "MEMORY"
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_CHECKPOINT_SECONDS: int = 300
+    SQLITE_CHECKPOINT_MODE: str = "PASSIVE"
+    SQLITE_OPTIMIZE_SECONDS: int = 3600
+
     # Path assoluti (solo per sviluppo)
     if os.name == 'nt':  # Windows
         SQLITE_DB_PATH: str = str(Path('C:/Users/misti/Desktop/App/fitapp.db').absolute())
@@ -26,6 +39,13 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
+    TOKEN_CACHE_SIZE: int = 4096  # token verificati tenuti in memoria
+    USER_CACHE_SIZE: int = 1024  # utenti autenticati tenuti in memoria
+    USER_CACHE_TTL_SECONDS: int = 60
+    REVOCATION_SYNC_SECONDS: float = 2.0  # propagazione delle revoche tra worker
+    REVOCATION_PURGE_SECONDS: int = 600
+    REVOCATION_FILTER_CAPACITY: int = 100_000
+    REVOCATION_FILTER_ERROR_RATE: float = 0.001
 
     # Auth & Security
     DEV_MODE: bool = True
@@ -33,6 +53,57 @@ class Settings(BaseSettings):
     CORS_ALLOWED_ORIGINS: List[str] = ["http://localhost:3000", "http://127.0.0.1:3000"]
     SECURE_COOKIES: bool = not DEV_MODE
     SESSION_TIMEOUT: int = 3600  # 1 ora
+    PASSWORD_HASH_MAX_CONCURRENCY: int = 2  # hash bcrypt eseguiti in parallelo
+    PASSWORD_HASH_QUEUE_SIZE: int = 32  # richieste in attesa prima del 503
+    PASSWORD_HASH_SCHEME: str = "bcrypt"  # "bcrypt" oppure "argon2" (richiede argon2-cffi)
+    PASSWORD_HASH_TARGET_MS: int = 250  # budget di latenza per la calibrazione bcrypt
+    PASSWORD_HASH_ROUNDS: Optional[int] = None  # se impostato salta la calibrazione
+    PASSWORD_HASH_MIN_ROUNDS: int = 10
+    PASSWORD_HASH_MAX_ROUNDS: int = 14
+    ARGON2_MEMORY_COST: int = 65536  # KiB
+    ARGON2_TIME_COST: int = 3
+    ARGON2_PARALLELISM: int = 2
+    AUTH_RATE_LIMIT_ENABLED: bool = True
+    AUTH_RATE_LIMIT_BACKEND: str = "memory"  # "memory" oppure "sqlite" (condiviso tra worker)
+    AUTH_RATE_LIMIT_SQLITE_PATH: str = "./ratelimit.db"
+    AUTH_RATE_LIMIT_FAIL_OPEN: bool = True  # store non disponibile: True lascia passare, False risponde 503
+    AUTH_RATE_LIMIT_IP_PER_MINUTE: int = 30
+    AUTH_RATE_LIMIT_IP_BURST: int = 10
+    AUTH_RATE_LIMIT_EMAIL_PER_MINUTE: int = 5
+    AUTH_RATE_LIMIT_EMAIL_BURST: int = 5
+
+    # Group commit: le scritture brevi vengono raggruppate in un'unica transazione
+    GROUP_COMMIT_ENABLED: bool = False
+    GROUP_COMMIT_MAX_BATCH: int = 64
+    GROUP_COMMIT_MAX_DELAY_MS: float = 5.0
+
+    # Paginazione keyset delle liste
+    PAGINATION_DEFAULT_LIMIT: int = 20
+    PAGINATION_MAX_LIMIT: int = 100
+
+    # GET condizionali sulle liste: ETag dai contatori di versione per collezione
+    CONDITIONAL_GET_ENABLED: bool = True
+    CONDITIONAL_GET_CACHE_CONTROL: str = "private, no-cache"  # il client rivalida sempre con If-None-Match
+
+    # Cache delle risposte GET di schede ed esercizi, invalidata al commit delle scritture
+    RESPONSE_CACHE_ENABLED: bool = True
+    RESPONSE_CACHE_BACKEND: str = "memory"  # "memory" (per worker) oppure "sqlite" (condivisa tra worker)
+    RESPONSE_CACHE_SQLITE_PATH: str = "./response_cache.db"
+    RESPONSE_CACHE_TTL_SECONDS: int = 60  # con "memory" e più worker: ritardo massimo delle scritture altrui
+    RESPONSE_CACHE_MAX_BYTES: int = 32 * 1024 * 1024
+    RESPONSE_CACHE_MAX_ENTRY_BYTES: int = 1024 * 1024  # risposte più grandi non vengono tenute
+
+    # Serializzazione JSON veloce (richiede orjson): righe del DB scritte senza validazione pydantic
+    FAST_JSON_ENABLED: bool = False
+
+    # Indice in memoria dei muscoli per coach (query AND/OR/NOT sugli esercizi)
+    MUSCLE_INDEX_MAX_COACHES: int = 256
+
+    # Probe /livez e /readyz: snapshot aggiornato da un task di background
+    HEALTH_CHECK_INTERVAL_SECONDS: float = 5.0
+    HEALTH_LATENCY_WINDOW: int = 120  # campioni di latenza DB per i percentili
+    HEALTH_MAX_SNAPSHOT_AGE_SECONDS: float = 30.0
+    HEALTH_MAX_LOOP_LAG_MS: float = 500.0
 
     # Logging Configuration
     LOG_LEVEL: str = "DEBUG" if DEV_MODE else "INFO"
@@ -41,6 +112,15 @@ class Settings(BaseSettings):
     LOG_RETENTION: str = "7 days"
     LOG_SENSITIVE_FILTER: bool = True
 
+    # Advisor degli indici (EXPLAIN QUERY PLAN per ogni statement distinto), solo sviluppo
+    QUERY_ADVISOR_ENABLED: bool = DEV_MODE
+    QUERY_ADVISOR_MAX_STATEMENTS: int = 500
+
+    # Conteggio SQL per richiesta (header Server-Timing) e rilevamento N+1
+    SQL_METRICS_ENABLED: bool = True
+    SQL_N_PLUS_ONE_DETECTION: bool = DEV_MODE
+    SQL_N_PLUS_ONE_THRESHOLD: int = 5  # stesso statement più di K volte nella stessa richiesta
+
     # Email
     SMTP_SERVER: Optional[str] = None
     SMTP_PORT: Optional[int] = None
@@ -75,6 +155,18 @@ class Settings(BaseSettings):
             "connect_args": self.DB_CONNECT_ARGS
         }
 
+    @property
+    def sqlite_pragmas(self):
+        """Pragma SQLite nell'ordine di applicazione (busy_timeout per primo)"""
+        return {
+            "busy_timeout": self.SQLITE_BUSY_TIMEOUT_MS,
+            "journal_mode": self.SQLITE_JOURNAL_MODE,
+            "synchronous": self.SQLITE_SYNCHRONOUS,
+            "cache_size": self.SQLITE_CACHE_SIZE,
+            "mmap_size": self.SQLITE_MMAP_SIZE,
+            "temp_store": self.SQLITE_TEMP_STORE
+        }
+
     @property
     def jwt_config(self):
         """Configurazione JWT strutturata"""
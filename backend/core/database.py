@@ -1,28 +1,84 @@
+from fastapi import Request
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
 from contextlib import asynccontextmanager
+import asyncio
 import logging
+import time
 
 from backend.db_models.base import Base
 from backend.core.config import settings
 
-# Configurazione logging
-logging.basicConfig()
+# Configurazione logging (gli handler sono configurati dall'app)
 logging.getLogger('sqlalchemy.engine').setLevel(
     logging.INFO if settings.DB_ECHO else logging.WARNING
 )
 
 
-# Configurazione dell'engine asincrono
+# SQLite ammette un solo writer alla volta: l'engine di scrittura ha un'unica
+# connessione e le transazioni in attesa si mettono in coda sul pool (FIFO).
 async_engine = create_async_engine(
     settings.ASYNC_SQLITE_DB_PATH,
     connect_args={"check_same_thread": False},
-    poolclass=StaticPool,
+    pool_size=1,
+    max_overflow=0,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
     echo=settings.DB_ECHO
 )
 
-# Session factory asincrona
+# Le letture usano un pool separato di connessioni in sola lettura
+async_read_engine = create_async_engine(
+    settings.ASYNC_SQLITE_DB_PATH,
+    connect_args={"check_same_thread": False},
+    pool_size=settings.database_config["pool_size"],
+    max_overflow=settings.database_config["max_overflow"],
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    echo=settings.DB_ECHO
+)
+
+
+def apply_sqlite_pragmas(dbapi_connection, pragmas: dict = None):
+    """Applica il profilo di pragma SQLite (Settings.sqlite_pragmas) a una connessione DBAPI"""
+    pragmas = settings.sqlite_pragmas if pragmas is None else pragmas
+    cursor = dbapi_connection.cursor()
+    for name, value in pragmas.items():
+        cursor.execute(f"PRAGMA {name} = {value}")
+    cursor.close()
+
+
+def register_sqlite_pragmas(sync_engine, read_only: bool = False):
+    """Registra l'applicazione dei pragma su ogni nuova connessione dell'engine"""
+    @event.listens_for(sync_engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        apply_sqlite_pragmas(dbapi_connection)
+        if read_only:
+            cursor = dbapi_connection.cursor()
+            cursor.execute("PRAGMA query_only = ON")
+            cursor.close()
+
+
+def register_sqlite_transactions(sync_engine):
+    """
+    pysqlite/aiosqlite non inviano BEGIN prima dei SAVEPOINT: il primo SAVEPOINT
+    aprirebbe la transazione e il suo RELEASE la confermerebbe. Come indicato
+    dalla documentazione di SQLAlchemy il BEGIN viene gestito qui, così i
+    SAVEPOINT restano annidati nella transazione della sessione.
+    """
+    @event.listens_for(sync_engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(sync_engine, "begin")
+    def _on_begin(conn):
+        conn.exec_driver_sql("BEGIN")
+
+
+register_sqlite_pragmas(async_engine.sync_engine)
+register_sqlite_transactions(async_engine.sync_engine)
+register_sqlite_pragmas(async_read_engine.sync_engine, read_only=True)
+
+# Session factory asincrone
 AsyncSessionLocal = sessionmaker(
     bind=async_engine,
     class_=AsyncSession,
@@ -31,61 +87,71 @@ AsyncSessionLocal = sessionmaker(
     autocommit=False
 )
 
+ReadSessionLocal = sessionmaker(
+    bind=async_read_engine,
+    class_=AsyncSession,
+    expire_on_commit=False,
+    autoflush=False,
+    autocommit=False
+)
+
+READ_ONLY_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
 @asynccontextmanager
-async def get_db_session() -> AsyncSession:
-    session = AsyncSessionLocal()
+async def get_db_session(read_only: bool = False) -> AsyncSession:
+    session = ReadSessionLocal() if read_only else AsyncSessionLocal()
     try:
         yield session
-        await session.commit()
+        if not read_only:
+            await session.commit()
     except Exception:
         await session.rollback()
         raise
     finally:
         await session.close()
 
-async def get_db() -> AsyncSession:
-    async with get_db_session() as session:
+async def get_db(request: Request) -> AsyncSession:
+    """Sessione per la richiesta: pool di lettura per GET/HEAD/OPTIONS, writer per il resto"""
+    async with get_db_session(read_only=request.method in READ_ONLY_METHODS) as session:
         yield session
 
 
-async def check_index_exists(conn, table_name, index_name):
-    """Verifica asincrona se un indice esiste"""
-    result = await conn.execute(
-        text(
-            f"SELECT name FROM sqlite_master "
-            f"WHERE type='index' AND name='{index_name}' "
-            f"AND tbl_name='{table_name}'"
-        )
-    )
-    return result.scalar() is not None
+async def get_read_db() -> AsyncSession:
+    """
+    Sessione sul pool di lettura anche in una richiesta di scrittura: per le
+    letture che precedono operazioni lente (es. bcrypt) senza tenere occupata
+    l'unica connessione del writer.
+    """
+    async with get_db_session(read_only=True) as session:
+        yield session
 
 
-async def async_init_db():
-    try:
-        async with async_engine.begin() as conn:
-            # Crea tutte le tabelle
-            await conn.run_sync(Base.metadata.create_all)
-
-            # Verifica e crea indici mancanti
-            inspector = await conn.run_sync(lambda sync_conn: inspect(sync_conn))
-            existing_tables = await conn.run_sync(
-                lambda sync_conn: inspector.get_table_names()
-            )
-
-            if 'users' in existing_tables:
-                if not await check_index_exists(conn, 'users', 'ix_users_email'):
-                    await conn.execute(
-                        text("CREATE UNIQUE INDEX ix_users_email ON users (email)")
-                    )
-                    logging.info("Created index ix_users_email on users table")
-
-            if 'workout_assignments' in existing_tables:
-                if not await check_index_exists(conn, 'workout_assignments', 'ix_wa_user_workout'):
-                    await conn.execute(
-                        text("CREATE INDEX ix_wa_user_workout ON workout_assignments (user_id, workout_id)")
-                    )
-                    logging.info("Created index ix_wa_user_workout on workout_assignments table")
+async def dispose_engines():
+    await async_read_engine.dispose()
+    await async_engine.dispose()
 
+
+async def run_sqlite_maintenance():
+    """Task di background: checkpoint periodico del WAL e PRAGMA optimize"""
+    last_optimize = time.monotonic()
+    while True:
+        await asyncio.sleep(settings.SQLITE_CHECKPOINT_SECONDS)
+        try:
+            async with async_engine.connect() as conn:
+                await conn.exec_driver_sql(f"PRAGMA wal_checkpoint({settings.SQLITE_CHECKPOINT_MODE})")
+                if time.monotonic() - last_optimize >= settings.SQLITE_OPTIMIZE_SECONDS:
+                    await conn.exec_driver_sql("PRAGMA optimize")
+                    last_optimize = time.monotonic()
+        except Exception as e:
+            logging.warning(f"SQLite maintenance failed: {str(e)}")
+
+
+async def async_init_db(force: bool = False):
+    from backend.core.schema_sync import sync_schema
+
+    try:
+        await sync_schema(async_engine, force=force)
     except Exception as e:
         logging.error(f"Database initialization failed: {str(e)}")
         raise
@@ -96,11 +162,18 @@ async def async_reset_db():
     if not settings.DEV_MODE:
         raise RuntimeError("Database reset is only allowed in development mode")
 
+    from backend.core.search_index import drop_search_index
+
     async with async_engine.begin() as conn:
+        await conn.run_sync(drop_search_index)
         await conn.run_sync(Base.metadata.drop_all)
         await conn.run_sync(Base.metadata.create_all)
         logging.info("Database reset completed")
 
+    # Gli indici aggiuntivi sono stati eliminati insieme alle tabelle
+    from backend.core.schema_sync import clear_schema_fingerprint
+    await clear_schema_fingerprint(async_engine)
+
 
 
 
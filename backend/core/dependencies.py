@@ -1,14 +1,13 @@
 from fastapi import Request, HTTPException, status, Depends
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.future import select
 from typing import Annotated
-from jose import JWTError, jwt
 from pydantic import BaseModel
 from typing import Optional
 from backend.core.database import get_db
 from backend.db_models.user_models import User, UserRole
-from backend.core.config import settings
+from backend.core.token_middleware import resolve_principal
+from backend.core.user_cache import get_user_by_email_cached
 
 
 class TokenData(BaseModel):
@@ -30,7 +29,7 @@ async def oauth2_scheme_cookie_or_header(request: Request):
 oauth2_scheme = oauth2_scheme_cookie_or_header
 
 async def get_current_user(
-    token: Annotated[str, Depends(oauth2_scheme)],
+    request: Request,
     db: Annotated[AsyncSession, Depends(get_db)]
 ) -> User:
     credentials_exception = HTTPException(
@@ -39,21 +38,13 @@ async def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
 
-    try:
-        payload = jwt.decode(
-            token,
-            settings.SECRET_KEY,
-            algorithms=[settings.ALGORITHM]
-        )
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
-        token_data = TokenData(email=email)
-    except JWTError:
+    principal = resolve_principal(request)
+    email: str = principal.get("sub")
+    if email is None:
         raise credentials_exception
+    token_data = TokenData(email=email)
 
-    result = await db.execute(select(User).where(User.email == token_data.email))
-    user = result.scalar_one_or_none()
+    user = await get_user_by_email_cached(db, token_data.email)
 
     if user is None:
         raise credentials_exception
@@ -64,31 +55,14 @@ async def get_current_user(
 async def get_current_active_user(
         request: Request
 ) -> dict:
-    token = request.cookies.get("access_token") or request.headers.get("Authorization", "").replace("Bearer ", "")
-
-    if not token:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        return payload
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
+    return resolve_principal(request)
 
 
 async def get_current_coach(request: Request) -> dict:
-    token = request.cookies.get("access_token") or request.headers.get("Authorization", "").replace("Bearer ", "")
-
-    if not token:
-        raise HTTPException(status_code=401, detail="Missing token")
-
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        if payload.get("role") != "coach":
-            raise HTTPException(status_code=403, detail="Coach role required")
-        return payload
-    except jwt.JWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
+    payload = resolve_principal(request)
+    if payload.get("role") != "coach":
+        raise HTTPException(status_code=403, detail="Coach role required")
+    return payload
 
 
 async def get_current_trainee(
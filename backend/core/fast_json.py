@@ -0,0 +1,216 @@
+"""
+Serializzazione JSON delle risposte.
+
+Percorso standard: i dati vengono validati con un TypeAdapter dello schema di
+risposta (costruito una volta per schema) e scritti da pydantic-core.
+
+Percorso veloce (FAST_JSON_ENABLED, richiede orjson): le righe lette dal DB
+sono considerate fidate e non vengono validate. Per ogni schema viene
+precompilato un serializzatore che prende dagli oggetti solo gli attributi
+dello schema e li passa a orjson. È anche la default_response_class dell'app.
+"""
+import logging
+import typing
+from operator import itemgetter
+from typing import Any, Callable, Dict, Optional
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, TypeAdapter
+from sqlalchemy.engine import Row
+
+from backend.core.config import settings
+
+try:
+    import orjson
+except ImportError:  # dipendenza opzionale: senza orjson resta il percorso standard
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+_adapters: Dict[Any, TypeAdapter] = {}
+_converters: Dict[Any, Optional[Callable[[Any], Any]]] = {}
+_serializers: Dict[type, "TrustedSerializer"] = {}
+_warned = False
+
+
+def fast_json_enabled() -> bool:
+    global _warned
+    if not settings.FAST_JSON_ENABLED:
+        return False
+    if orjson is None:
+        if not _warned:
+            logger.warning("FAST_JSON_ENABLED ma orjson non è installato: uso la serializzazione standard")
+            _warned = True
+        return False
+    return True
+
+
+def type_adapter(schema: Any) -> TypeAdapter:
+    adapter = _adapters.get(schema)
+    if adapter is None:
+        adapter = _adapters[schema] = TypeAdapter(schema)
+    return adapter
+
+
+def _default(value: Any) -> Any:
+    # Modelli pydantic dentro a contenuti non fidati (es. restituiti da un endpoint)
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    # OPT_UTC_Z: datetime con fuso UTC scritti con "Z", come fa pydantic
+    return orjson.dumps(content, default=_default, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def _tuple_getter(keys: tuple) -> Callable[[Any], tuple]:
+    getter = itemgetter(*keys)
+    return getter if len(keys) > 1 else (lambda obj: (getter(obj),))
+
+
+class TrustedSerializer:
+    """
+    Serializzatore precompilato di un modello pydantic per oggetti già conformi
+    (entità ORM, Row o dict): nessuna validazione, solo lettura dei campi.
+    Il modo di leggerli è scelto una volta per lista sul primo elemento:
+    posizioni per le Row, __dict__ per le entità ORM (senza passare dai
+    descrittori degli attributi). I campi assenti dall'oggetto prendono il
+    default dello schema.
+    """
+
+    def __init__(self, schema: type):
+        self.schema = schema
+        self.names = tuple(schema.model_fields)
+        self.keys = tuple(field.serialization_alias or name for name, field in schema.model_fields.items())
+        self.defaults = {
+            name: field.get_default(call_default_factory=True)
+            for name, field in schema.model_fields.items() if not field.is_required()
+        }
+        self.nested = []
+        self._state_getter = _tuple_getter(self.names)
+
+    def _build_nested(self) -> None:
+        # Separato dal costruttore: i serializzatori annidati possono riferirsi a questo
+        self.nested = [
+            (index, converter)
+            for index, field in enumerate(self.schema.model_fields.values())
+            for converter in (_converter(field.annotation),) if converter is not None
+        ]
+
+    def _getter_for(self, sample: Any) -> Optional[Callable[[Any], tuple]]:
+        if isinstance(sample, Row):
+            fields = sample._fields
+            if all(name in fields for name in self.names):
+                return _tuple_getter(tuple(fields.index(name) for name in self.names))
+        elif hasattr(sample, "_sa_instance_state"):
+            names, value = self.names, self._value
+            if all(name in sample.__dict__ for name in names):
+                state_getter = self._state_getter
+                return lambda obj: state_getter(obj.__dict__)
+
+            # Campi solo dello schema (default) o attributi non caricati: solo quelli via getattr
+            def getter(obj):
+                state = obj.__dict__
+                return [state[name] if name in state else value(obj, name) for name in names]
+            return getter
+        return None
+
+    def _value(self, obj: Any, name: str) -> Any:
+        value = obj.get(name, _MISSING) if isinstance(obj, dict) else getattr(obj, name, _MISSING)
+        if value is _MISSING:
+            if name not in self.defaults:
+                raise ValueError(f"{self.schema.__name__}.{name} mancante in {type(obj).__name__}")
+            value = self.defaults[name]
+        return value
+
+    def many(self, objs: Any) -> list:
+        objs = list(objs)
+        if not objs:
+            return []
+        getter = self._getter_for(objs[0])
+        names, keys, nested = self.names, self.keys, self.nested
+        result = []
+        for obj in objs:
+            values = None
+            if getter is not None:
+                try:
+                    values = getter(obj)
+                except LookupError:
+                    # Attributo non caricato o campo solo dello schema
+                    pass
+            if values is None:
+                values = [self._value(obj, name) for name in names]
+            if nested:
+                values = list(values)
+                for index, converter in nested:
+                    if values[index] is not None:
+                        values[index] = converter(values[index])
+            result.append(dict(zip(keys, values)))
+        return result
+
+    def to_python(self, obj: Any) -> dict:
+        return self.many((obj,))[0]
+
+
+def _serializer_for(schema: type) -> TrustedSerializer:
+    serializer = _serializers.get(schema)
+    if serializer is None:
+        serializer = _serializers[schema] = TrustedSerializer(schema)
+        serializer._build_nested()
+    return serializer
+
+
+def _converter(annotation: Any) -> Optional[Callable[[Any], Any]]:
+    """Funzione che porta un valore fidato di questo tipo a dati serializzabili da orjson (None: nessuna conversione)"""
+    if annotation in _converters:
+        return _converters[annotation]
+
+    converter = None
+    origin = typing.get_origin(annotation)
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        converter = _serializer_for(annotation).to_python
+    elif origin is typing.Union:
+        options = [arg for arg in typing.get_args(annotation) if arg is not type(None)]
+        if len(options) == 1:
+            converter = _converter(options[0])
+    elif origin in (list, tuple, set, frozenset):
+        args = typing.get_args(annotation)
+        item = args[0] if args else None
+        if isinstance(item, type) and issubclass(item, BaseModel):
+            converter = _serializer_for(item).many
+        else:
+            inner = _converter(item) if item is not None else None
+            if inner is not None:
+                converter = lambda values: [inner(value) for value in values]  # noqa: E731
+    _converters[annotation] = converter
+    return converter
+
+
+def render_trusted(content: Any, schema: Any) -> bytes:
+    """Percorso veloce: dati fidati scritti da orjson secondo schema, senza validazione"""
+    converter = _converter(schema)
+    return dumps(converter(content) if converter is not None else content)
+
+
+def render_validated(content: Any, schema: Any) -> bytes:
+    adapter = type_adapter(schema)
+    return adapter.dump_json(adapter.validate_python(content, from_attributes=True))
+
+
+def render_json(content: Any, schema: Any = None) -> bytes:
+    """
+    Corpo JSON per content: un modello pydantic, oppure dati letti dal DB da
+    serializzare secondo schema (validati, o fidati nel percorso veloce).
+    """
+    if isinstance(content, BaseModel):
+        return content.model_dump_json().encode()
+    if fast_json_enabled():
+        return render_trusted(content, schema)
+    return render_validated(content, schema)
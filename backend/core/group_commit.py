@@ -0,0 +1,148 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Optional, Tuple, TypeVar
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.core.config import settings
+from backend.core.database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+WriteOperation = Callable[[AsyncSession], Awaitable[T]]
+
+# Messo in coda da stop(): il writer esegue il batch in corso e termina
+_STOP = object()
+
+
+class GroupCommitWriter:
+    """
+    Writer di background che raggruppa le piccole transazioni di scrittura:
+    le operazioni in coda vengono eseguite nella stessa transazione (ognuna in
+    un proprio SAVEPOINT, vedi register_sqlite_transactions) e confermate con un
+    solo COMMIT, quindi un solo fsync.
+    Il future di ogni chiamante si risolve solo dopo il COMMIT del suo batch.
+    """
+
+    def __init__(self, max_batch: int, max_delay_ms: float):
+        self.max_batch = max_batch
+        self.max_delay = max_delay_ms / 1000
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self.batches = 0
+        self.operations = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def start(self) -> None:
+        if not self.running:
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            # Niente cancel: le operazioni già prese dalla coda vengono confermate
+            # (o fallite) e i loro future risolti prima che il writer termini
+            if not self._task.done():
+                await self._queue.put((_STOP, None))
+            try:
+                await self._task
+            except Exception as e:
+                logger.error(f"Group commit writer failed: {str(e)}")
+            self._task = None
+
+        # Le operazioni accodate dopo lo stop non verranno più eseguite
+        while self._queue is not None and not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            if future is not None and not future.done():
+                future.set_exception(RuntimeError("Group commit writer stopped"))
+
+    async def submit(self, operation: WriteOperation) -> T:
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((operation, future))
+        return await future
+
+    async def _collect(self) -> Tuple[list, bool]:
+        """Prossimo batch e se è l'ultimo (stop() richiesto)"""
+        batch = []
+        item = await self._queue.get()
+        deadline = asyncio.get_running_loop().time() + self.max_delay
+        while item[0] is not _STOP:
+            batch.append(item)
+            timeout = deadline - asyncio.get_running_loop().time()
+            if len(batch) >= self.max_batch or timeout <= 0:
+                return batch, False
+            try:
+                item = await asyncio.wait_for(self._queue.get(), timeout)
+            except asyncio.TimeoutError:
+                return batch, False
+        return batch, True
+
+    async def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch, stopping = await self._collect()
+            if not batch:
+                continue
+            results = []
+            try:
+                async with AsyncSessionLocal() as session:
+                    for operation, future in batch:
+                        try:
+                            async with session.begin_nested():
+                                results.append((future, await operation(session)))
+                        except Exception as e:
+                            # Solo questa operazione torna indietro (rollback al savepoint)
+                            if not future.done():
+                                future.set_exception(e)
+                    await session.commit()
+            except Exception as e:
+                logger.error(f"Group commit failed: {str(e)}")
+                for future, _ in results:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.operations += len(batch)
+            for future, result in results:
+                if not future.done():
+                    future.set_result(result)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.running,
+            "queue_depth": self.queue_depth,
+            "batches": self.batches,
+            "operations": self.operations,
+            "avg_batch_size": round(self.operations / self.batches, 2) if self.batches else 0,
+        }
+
+
+group_commit_writer = GroupCommitWriter(
+    settings.GROUP_COMMIT_MAX_BATCH,
+    settings.GROUP_COMMIT_MAX_DELAY_MS
+)
+
+
+async def run_write(db: AsyncSession, operation: WriteOperation) -> T:
+    """
+    Esegue un'operazione di scrittura. Con GROUP_COMMIT_ENABLED passa dal
+    writer di gruppo, altrimenti usa la sessione della richiesta e fa commit.
+    """
+    if not group_commit_writer.running:
+        result = await operation(db)
+        await db.commit()
+        return result
+
+    # Rilascia la connessione del writer eventualmente tenuta dalla richiesta,
+    # altrimenti il batch resterebbe in attesa del pool (pool_size=1)
+    await db.commit()
+    return await group_commit_writer.submit(operation)
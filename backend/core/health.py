@@ -0,0 +1,143 @@
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from typing import Optional
+
+from sqlalchemy import text
+
+from backend.core.config import settings
+from backend.core.database import async_engine, async_read_engine
+from backend.core.group_commit import group_commit_writer
+from backend.db_models.base import Base
+
+logger = logging.getLogger(__name__)
+
+
+def _percentile(samples: list, percent: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    index = max(0, math.ceil(percent / 100 * len(ordered)) - 1)
+    return round(ordered[index], 2)
+
+
+def _pool_stats(engine, max_overflow: int) -> dict:
+    pool = engine.sync_engine.pool
+    capacity = pool.size() + max(0, max_overflow)
+    checked_out = pool.checkedout()
+    return {
+        "size": pool.size(),
+        "checked_out": checked_out,
+        "saturation": round(checked_out / capacity, 2) if capacity else None,
+    }
+
+
+class HealthMonitor:
+    """
+    Task di background che misura periodicamente lo stato del servizio e
+    pubblica uno snapshot: /livez e /readyz leggono solo lo snapshot e non
+    toccano mai il database.
+    """
+
+    def __init__(self, interval: float, window: int):
+        self.interval = interval
+        self._latencies = deque(maxlen=window)
+        self._task: Optional[asyncio.Task] = None
+        self.snapshot: dict = {"status": "starting", "updated_at": None}
+        self.started_at = time.time()
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def _probe_database(self) -> dict:
+        start = time.perf_counter()
+        async with async_read_engine.connect() as conn:
+            result = await conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'table'"))
+            existing_tables = set(result.scalars().all())
+        self._latencies.append((time.perf_counter() - start) * 1000)
+        return {"connected": True, "missing_tables": sorted(set(Base.metadata.tables) - existing_tables)}
+
+    async def refresh(self, loop_lag_ms: float = 0.0) -> dict:
+        try:
+            database = await self._probe_database()
+        except Exception as e:
+            logger.warning(f"Health probe failed: {str(e)}")
+            database = {"connected": False, "error": str(e), "missing_tables": []}
+
+        latencies = list(self._latencies)
+        database["latency_ms"] = {
+            "p50": _percentile(latencies, 50),
+            "p95": _percentile(latencies, 95),
+            "p99": _percentile(latencies, 99),
+            "samples": len(latencies),
+        }
+
+        ready = (
+            database["connected"]
+            and not database["missing_tables"]
+            and loop_lag_ms <= settings.HEALTH_MAX_LOOP_LAG_MS
+        )
+        self.snapshot = {
+            "status": "ready" if ready else "degraded",
+            "updated_at": time.time(),
+            "database": database,
+            "pools": {
+                # Il writer è una sola connessione, senza overflow (backend.core.database)
+                "writer": _pool_stats(async_engine, 0),
+                "reader": _pool_stats(async_read_engine, settings.database_config["max_overflow"]),
+            },
+            "event_loop_lag_ms": round(loop_lag_ms, 2),
+            # Operazioni in coda al group commit (0 se GROUP_COMMIT_ENABLED è spento)
+            "group_commit_queue_depth": group_commit_writer.queue_depth,
+        }
+        return self.snapshot
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            # Ritardo del risveglio rispetto al previsto: misura quanto il loop è bloccato
+            await self.refresh(max(0.0, (loop.time() - expected) * 1000))
+
+    def liveness(self) -> tuple:
+        """(vivo, payload): il processo risponde e il task di monitoraggio gira"""
+        alive = self.running or self.snapshot["updated_at"] is None
+        return alive, {
+            "status": "alive" if alive else "monitor stopped",
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+        }
+
+    def readiness(self) -> tuple:
+        """(pronto, snapshot): uno snapshot troppo vecchio non è considerato valido"""
+        snapshot = dict(self.snapshot)
+        updated_at = snapshot.get("updated_at")
+        if updated_at is None:
+            return False, snapshot
+
+        snapshot["age_seconds"] = round(time.time() - updated_at, 2)
+        if snapshot["age_seconds"] > settings.HEALTH_MAX_SNAPSHOT_AGE_SECONDS:
+            snapshot["status"] = "stale"
+        return snapshot["status"] == "ready", snapshot
+
+
+health_monitor = HealthMonitor(
+    settings.HEALTH_CHECK_INTERVAL_SECONDS,
+    settings.HEALTH_LATENCY_WINDOW
+)
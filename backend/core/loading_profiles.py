@@ -0,0 +1,113 @@
+from typing import Dict, Optional, Sequence, Tuple, Type
+
+from fastapi import HTTPException, status
+from pydantic import BaseModel, create_model
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload, raiseload, selectinload
+
+from backend.routers.enums import FieldSet
+from backend.schemas.pagination import CursorPage
+
+
+class InvalidLoadingProfile(HTTPException):
+    def __init__(self, detail: str):
+        super().__init__(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
+
+
+class LoadingProfile:
+    """Cosa leggere per una richiesta e con quale schema serializzarlo"""
+
+    __slots__ = ("model", "columns", "options", "schema", "page_schema")
+
+    def __init__(self, model, columns: Optional[Sequence], options: Sequence, schema: Type[BaseModel]):
+        self.model = model
+        self.columns = columns
+        self.options = options
+        self.schema = schema
+        self.page_schema = CursorPage[schema]
+
+    def select(self):
+        """SELECT di partenza: solo le colonne del profilo, oppure l'entità con i suoi loader"""
+        if self.columns is not None:
+            return select(*self.columns)
+        return select(self.model).options(*self.options)
+
+    def fetch(self, result) -> list:
+        # Le righe di colonne espongono gli stessi attributi dell'entità (row.id, row.name, ...)
+        return result.all() if self.columns is not None else result.scalars().all()
+
+    def page(self, items: list, next_cursor: Optional[str]) -> dict:
+        """Contenuto della pagina, da serializzare con page_schema (backend.core.fast_json.render_json)"""
+        return {"items": items, "next_cursor": next_cursor}
+
+
+class LoadingProfiles:
+    """
+    Profili di caricamento di un modello, scelti con fields= e include=:
+    - fields=summary: una sola query sulle colonne di riepilogo, senza relazioni
+    - fields=full: l'entità completa; le relazioni in include= sono caricate con
+      selectinload (collezioni) o joinedload (molti-a-uno), tutte le altre con
+      raiseload: lo schema non le contiene e leggerle per errore solleva un'eccezione
+      invece di restituire silenziosamente una relazione vuota
+    Lo schema di risposta è costruito sulle relazioni richieste e messo in cache.
+    """
+
+    def __init__(
+            self,
+            model,
+            summary_columns: Sequence,
+            summary_schema: Type[BaseModel],
+            full_schema: Type[BaseModel],
+            relations: Dict[str, object],
+            default_include: Tuple[str, ...] = ()
+    ):
+        self.model = model
+        self.summary = LoadingProfile(model, list(summary_columns), (), summary_schema)
+        self.full_schema = full_schema
+        self.relations = relations  # nome relazione -> tipo nello schema di risposta
+        self.default_include = default_include
+        self._profiles: Dict[Tuple[str, ...], LoadingProfile] = {}
+
+    def _parse_include(self, include: Optional[str]) -> Tuple[str, ...]:
+        if include is None:
+            return self.default_include
+        names = {name.strip() for name in include.split(",") if name.strip()}
+        unknown = names - set(self.relations)
+        if unknown:
+            raise InvalidLoadingProfile(
+                f"Unknown include: {', '.join(sorted(unknown))}. "
+                f"Allowed: {', '.join(sorted(self.relations))}"
+            )
+        return tuple(sorted(names))
+
+    def resolve(self, fields: FieldSet = FieldSet.FULL, include: Optional[str] = None) -> LoadingProfile:
+        if fields == FieldSet.SUMMARY:
+            if include:
+                raise InvalidLoadingProfile("include is not supported with fields=summary")
+            return self.summary
+
+        names = self._parse_include(include)
+        profile = self._profiles.get(names)
+        if profile is None:
+            profile = self._profiles[names] = self._build(names)
+        return profile
+
+    def _build(self, names: Tuple[str, ...]) -> LoadingProfile:
+        options = []
+        for name in self.relations:
+            attribute = getattr(self.model, name)
+            if name not in names:
+                options.append(raiseload(attribute))
+            elif attribute.property.uselist:
+                options.append(selectinload(attribute))
+            else:
+                options.append(joinedload(attribute))
+
+        schema = self.full_schema
+        if names:
+            schema = create_model(
+                f"{self.full_schema.__name__}With{''.join(name.title() for name in names)}",
+                __base__=self.full_schema,
+                **{name: (self.relations[name], ...) for name in names}
+            )
+        return LoadingProfile(self.model, None, options, schema)
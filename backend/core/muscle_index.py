@@ -0,0 +1,316 @@
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.core.collection_versions import EXERCISES
+from backend.core.config import settings
+from backend.db_models.collection_version import CollectionVersion
+from backend.db_models.exercise import Exercise, Muscle, exercise_muscles
+
+_SEPARATORS = re.compile(r"[,;/]")
+MUSCLE_NAME_MAX_LENGTH = 50
+
+
+def normalize_muscle(name: str) -> str:
+    return " ".join(name.lower().split())[:MUSCLE_NAME_MAX_LENGTH]
+
+
+def normalize_muscles(target_muscles: Optional[str]) -> List[str]:
+    """"Petto, Tricipiti;  petto" -> ["petto", "tricipiti"]"""
+    names = []
+    for part in _SEPARATORS.split(target_muscles or ""):
+        name = normalize_muscle(part)
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def replace_exercise_muscles(conn, exercise_id: int, target_muscles: Optional[str]) -> List[int]:
+    """
+    Riscrive i tag muscolari di un esercizio. Sincrona: accetta una Connection
+    o una Session (via AsyncSession.run_sync) e resta nella transazione del chiamante.
+    """
+    conn.execute(delete(exercise_muscles).where(exercise_muscles.c.exercise_id == exercise_id))
+    names = normalize_muscles(target_muscles)
+    if not names:
+        return []
+
+    conn.execute(
+        sqlite_insert(Muscle).on_conflict_do_nothing(index_elements=["name"]),
+        [{"name": name} for name in names]
+    )
+    muscle_ids = conn.execute(select(Muscle.id).where(Muscle.name.in_(names))).scalars().all()
+    conn.execute(
+        insert(exercise_muscles),
+        [{"exercise_id": exercise_id, "muscle_id": muscle_id} for muscle_id in muscle_ids]
+    )
+    return list(muscle_ids)
+
+
+def backfill_muscle_tags(sync_conn) -> int:
+    """Popola exercise_muscles dagli esercizi esistenti (tabella appena creata)"""
+    rows = sync_conn.execute(select(Exercise.id, Exercise.target_muscles)).all()
+    for exercise_id, target_muscles in rows:
+        replace_exercise_muscles(sync_conn, exercise_id, target_muscles)
+    return len(rows)
+
+
+def _bit_count(bits: int) -> int:
+    return bin(bits).count("1")
+
+
+# int.bit_count è nativo da Python 3.10
+if hasattr(int, "bit_count"):
+    _bit_count = int.bit_count  # noqa: F811
+
+
+class _CoachIndex:
+    """
+    Esercizi di un coach come bitset: ogni esercizio occupa uno slot e ogni
+    muscolo (e livello di difficoltà) è un intero con un bit per slot.
+    Gli slot degli esercizi eliminati vengono riutilizzati. version è la
+    versione della collezione EXERCISES del coach a cui l'indice corrisponde.
+    """
+
+    __slots__ = ("exercise_ids", "slot_of", "free_slots", "muscles", "difficulty", "all", "version")
+
+    def __init__(self, version: int):
+        self.exercise_ids: List[Optional[int]] = []
+        self.slot_of: Dict[int, int] = {}
+        self.free_slots: List[int] = []
+        self.muscles: Dict[int, int] = {}  # muscle_id -> bitset
+        self.difficulty: Dict[str, int] = {}  # valore ExerciseDifficulty -> bitset
+        self.all = 0
+        self.version = version
+
+    def set(self, exercise_id: int, muscle_ids: Iterable[int], difficulty: str) -> None:
+        slot = self.slot_of.get(exercise_id)
+        if slot is None:
+            slot = self.free_slots.pop() if self.free_slots else len(self.exercise_ids)
+            if slot == len(self.exercise_ids):
+                self.exercise_ids.append(exercise_id)
+            else:
+                self.exercise_ids[slot] = exercise_id
+            self.slot_of[exercise_id] = slot
+        else:
+            self._clear(slot)
+
+        bit = 1 << slot
+        self.all |= bit
+        for muscle_id in muscle_ids:
+            self.muscles[muscle_id] = self.muscles.get(muscle_id, 0) | bit
+        self.difficulty[difficulty] = self.difficulty.get(difficulty, 0) | bit
+
+    def remove(self, exercise_id: int) -> None:
+        slot = self.slot_of.pop(exercise_id, None)
+        if slot is None:
+            return
+        self._clear(slot)
+        self.exercise_ids[slot] = None
+        self.free_slots.append(slot)
+
+    def _clear(self, slot: int) -> None:
+        mask = ~(1 << slot)
+        self.all &= mask
+        for bitsets in (self.muscles, self.difficulty):
+            for key in [key for key, bits in bitsets.items() if bits >> slot & 1]:
+                bits = bitsets[key] & mask
+                if bits:
+                    bitsets[key] = bits
+                else:
+                    del bitsets[key]
+
+    def mask_of(self, exercise_ids: Iterable[int]) -> int:
+        bits = 0
+        for exercise_id in exercise_ids:
+            slot = self.slot_of.get(exercise_id)
+            if slot is not None:
+                bits |= 1 << slot
+        return bits
+
+    def ids_of(self, bits: int) -> List[int]:
+        ids = []
+        while bits:
+            lowest = bits & -bits
+            ids.append(self.exercise_ids[lowest.bit_length() - 1])
+            bits ^= lowest
+        return ids
+
+
+class MuscleIndex:
+    """
+    Indice in memoria, per coach, dei muscoli allenati dagli esercizi: le
+    query AND/OR/NOT e di copertura sono operazioni su interi Python.
+    Il bitset di un coach viene caricato dal DB al primo uso e aggiornato dai
+    servizi degli esercizi dopo ogni commit. Prima di ogni uso la versione della
+    collezione EXERCISES del coach (lettura per chiave primaria) viene confrontata
+    con quella dell'indice: le scritture fatte da altri worker fanno ricaricare.
+    """
+
+    def __init__(self, max_coaches: int):
+        self.max_coaches = max_coaches
+        self._coaches: "OrderedDict[int, _CoachIndex]" = OrderedDict()
+        self._generations: Dict[int, int] = {}  # scritture per coach, per scartare caricamenti superati
+        self._muscle_ids: Dict[str, int] = {}
+        self._muscle_names: Dict[int, str] = {}
+        self._lock = threading.Lock()
+        self.loads = 0
+
+    async def _coach(self, db: AsyncSession, coach_id: int) -> _CoachIndex:
+        with self._lock:
+            generation = self._generations.get(coach_id, 0)
+        # Letta prima degli esercizi: una scrittura concorrente rende l'indice
+        # caricato più nuovo della sua versione (verrà ricaricato), mai più vecchio
+        version = await db.scalar(
+            select(CollectionVersion.version).where(
+                CollectionVersion.collection == EXERCISES,
+                CollectionVersion.owner_id == coach_id
+            )
+        ) or 0
+        with self._lock:
+            index = self._coaches.get(coach_id)
+            if index is not None and index.version == version:
+                self._coaches.move_to_end(coach_id)
+                return index
+
+        index = _CoachIndex(version)
+        result = await db.execute(
+            select(Exercise.id, Exercise.difficulty, Muscle.id, Muscle.name)
+            .outerjoin(exercise_muscles, exercise_muscles.c.exercise_id == Exercise.id)
+            .outerjoin(Muscle, Muscle.id == exercise_muscles.c.muscle_id)
+            .where(Exercise.coach_id == coach_id)
+        )
+        grouped: Dict[int, tuple] = {}
+        names = []
+        for exercise_id, difficulty, muscle_id, name in result.all():
+            entry = grouped.setdefault(exercise_id, (difficulty, []))
+            if muscle_id is not None:
+                entry[1].append(muscle_id)
+                names.append((muscle_id, name))
+        for exercise_id, (difficulty, muscle_ids) in grouped.items():
+            index.set(exercise_id, muscle_ids, difficulty.value)
+        self._remember(names)
+
+        with self._lock:
+            self.loads += 1
+            # Una scrittura arrivata durante il caricamento potrebbe mancare: l'indice
+            # serve questa richiesta ma non viene tenuto in memoria
+            if self._generations.get(coach_id, 0) == generation and self.max_coaches > 0:
+                self._coaches[coach_id] = index
+                self._coaches.move_to_end(coach_id)
+                while len(self._coaches) > self.max_coaches:
+                    self._coaches.popitem(last=False)
+        return index
+
+    def _remember(self, rows: Iterable[tuple]) -> None:
+        with self._lock:
+            for muscle_id, name in rows:
+                self._muscle_ids[name] = muscle_id
+                self._muscle_names[muscle_id] = name
+
+    async def _resolve(self, db: AsyncSession, names: Iterable[str]) -> List[Optional[int]]:
+        """Nomi -> id muscolo; None per i muscoli che nessun esercizio usa"""
+        normalized = [normalize_muscle(name) for name in names]
+        with self._lock:
+            missing = [name for name in normalized if name not in self._muscle_ids]
+        if missing:
+            result = await db.execute(select(Muscle.id, Muscle.name).where(Muscle.name.in_(missing)))
+            self._remember(result.all())
+        with self._lock:
+            return [self._muscle_ids.get(name) for name in normalized]
+
+    async def query(
+            self,
+            db: AsyncSession,
+            coach_id: int,
+            all_of: Iterable[str] = (),
+            any_of: Iterable[str] = (),
+            none_of: Iterable[str] = (),
+            difficulty: Optional[str] = None
+    ) -> List[int]:
+        """Id degli esercizi del coach che allenano tutti i muscoli all_of, almeno uno di any_of e nessuno di none_of"""
+        index = await self._coach(db, coach_id)
+        bits = index.all
+
+        for muscle_id in await self._resolve(db, all_of):
+            bits &= index.muscles.get(muscle_id, 0)
+        any_ids = await self._resolve(db, any_of)
+        if any_ids:
+            any_bits = 0
+            for muscle_id in any_ids:
+                any_bits |= index.muscles.get(muscle_id, 0)
+            bits &= any_bits
+        for muscle_id in await self._resolve(db, none_of):
+            bits &= ~index.muscles.get(muscle_id, 0)
+        if difficulty is not None:
+            bits &= index.difficulty.get(difficulty, 0)
+        return index.ids_of(bits)
+
+    async def coverage(
+            self,
+            db: AsyncSession,
+            coach_id: int,
+            exercise_ids: Optional[Iterable[int]] = None
+    ) -> Dict[str, int]:
+        """
+        Muscoli della libreria del coach -> numero di esercizi che li allenano,
+        su tutta la libreria o solo sugli esercizi indicati (0 = muscolo scoperto)
+        """
+        index = await self._coach(db, coach_id)
+        # Muscoli creati dopo il caricamento del coach: nomi non ancora noti
+        with self._lock:
+            missing = [muscle_id for muscle_id in index.muscles if muscle_id not in self._muscle_names]
+        if missing:
+            result = await db.execute(select(Muscle.id, Muscle.name).where(Muscle.id.in_(missing)))
+            self._remember(result.all())
+        mask = index.all if exercise_ids is None else index.mask_of(exercise_ids)
+        with self._lock:
+            return {
+                self._muscle_names.get(muscle_id, str(muscle_id)): _bit_count(bits & mask)
+                for muscle_id, bits in index.muscles.items()
+            }
+
+    def exercise_saved(self, coach_id: int, exercise_id: int, muscle_ids: Iterable[int], difficulty) -> None:
+        difficulty = getattr(difficulty, "value", difficulty)
+        with self._lock:
+            index = self._written(coach_id)
+            if index is not None:
+                index.set(exercise_id, muscle_ids, difficulty)
+
+    def exercise_deleted(self, coach_id: int, exercise_id: int) -> None:
+        with self._lock:
+            index = self._written(coach_id)
+            if index is not None:
+                index.remove(exercise_id)
+
+    def _written(self, coach_id: int) -> Optional[_CoachIndex]:
+        # Chiamato con il lock, dopo il commit di una scrittura che ha incrementato
+        # la versione EXERCISES del coach di uno: l'indice aggiornato corrisponde
+        # alla versione successiva. Se nel frattempo ha scritto anche un altro
+        # worker le versioni non coincideranno e l'indice verrà ricaricato.
+        self._generations[coach_id] = self._generations.get(coach_id, 0) + 1
+        index = self._coaches.get(coach_id)
+        if index is not None:
+            index.version += 1
+        return index
+
+    def clear(self) -> None:
+        with self._lock:
+            self._coaches.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "coaches": len(self._coaches),
+                "exercises": sum(len(index.slot_of) for index in self._coaches.values()),
+                "muscles": len(self._muscle_ids),
+                "loads": self.loads,
+            }
+
+
+muscle_index = MuscleIndex(settings.MUSCLE_INDEX_MAX_COACHES)
@@ -0,0 +1,52 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, status
+
+from backend.core.config import settings
+
+
+class InvalidCursor(HTTPException):
+    def __init__(self):
+        super().__init__(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid pagination cursor")
+
+
+def clamp_limit(limit: Optional[int]) -> int:
+    """Limite di pagina richiesto, ricondotto al massimo configurato sul server"""
+    if not limit or limit < 1:
+        return settings.PAGINATION_DEFAULT_LIMIT
+    return min(limit, settings.PAGINATION_MAX_LIMIT)
+
+
+def db_datetime(value: datetime) -> str:
+    """
+    Datetime nel formato in cui SQLite lo salva (CURRENT_TIMESTAMP, senza
+    microsecondi): il cursore va confrontato come stringa con la colonna.
+    """
+    formatted = value.strftime("%Y-%m-%d %H:%M:%S")
+    return f"{formatted}.{value.microsecond:06d}" if value.microsecond else formatted
+
+
+def encode_cursor(*values) -> str:
+    """Cursore opaco: la chiave di ordinamento dell'ultima riga della pagina"""
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> Tuple:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (binascii.Error, ValueError, UnicodeDecodeError):
+        raise InvalidCursor()
+    if not isinstance(values, list) or len(values) != size:
+        raise InvalidCursor()
+    return tuple(values)
+
+
+def escape_like(prefix: str) -> str:
+    """Prefisso per LIKE ... ESCAPE '\\' (l'indice NOCASE viene usato solo senza jolly iniziali)"""
+    return prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
@@ -0,0 +1,203 @@
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, Tuple
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+from backend.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Configurazione: unico contesto di hashing condiviso da tutta l'applicazione.
+# Viene riconfigurato all'avvio da configure_password_context().
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+def calibrate_bcrypt_rounds(target_ms: int, min_rounds: int, max_rounds: int, probe_rounds: int = 8) -> int:
+    """Stima il numero di round bcrypt che rientra nel budget di latenza su questa macchina"""
+    from passlib.hash import bcrypt
+
+    probe = bcrypt.using(rounds=probe_rounds)
+    samples = []
+    for _ in range(3):
+        start = time.perf_counter()
+        probe.hash("calibration-probe")
+        samples.append(time.perf_counter() - start)
+
+    # Ogni round in più raddoppia il costo
+    probe_seconds = max(min(samples), 1e-6)
+    rounds = probe_rounds + math.floor(math.log2((target_ms / 1000) / probe_seconds))
+    return max(min_rounds, min(max_rounds, rounds))
+
+
+def _argon2_available() -> bool:
+    from passlib.hash import argon2
+    return argon2.has_backend()
+
+
+def configure_password_context() -> dict:
+    """
+    Applica la policy di hashing definita in Settings. I round bcrypt vengono
+    calibrati sul budget PASSWORD_HASH_TARGET_MS se non fissati esplicitamente;
+    gli hash con schema o costo diversi risultano da aggiornare al login.
+    """
+    scheme = settings.PASSWORD_HASH_SCHEME
+    if scheme == "argon2" and not _argon2_available():
+        logger.warning("argon2 non disponibile (installare argon2-cffi), uso bcrypt")
+        scheme = "bcrypt"
+
+    rounds = None
+    if scheme == "bcrypt":
+        rounds = settings.PASSWORD_HASH_ROUNDS or calibrate_bcrypt_rounds(
+            settings.PASSWORD_HASH_TARGET_MS,
+            settings.PASSWORD_HASH_MIN_ROUNDS,
+            settings.PASSWORD_HASH_MAX_ROUNDS
+        )
+
+    policy = {"schemes": ["bcrypt"], "deprecated": "auto"}
+    if scheme == "argon2":
+        policy.update({
+            "schemes": ["argon2", "bcrypt"],
+            "argon2__memory_cost": settings.ARGON2_MEMORY_COST,
+            "argon2__time_cost": settings.ARGON2_TIME_COST,
+            "argon2__parallelism": settings.ARGON2_PARALLELISM,
+        })
+    else:
+        # Tolleranza di un round verso l'alto per evitare rehash continui
+        # quando la calibrazione oscilla tra un avvio e l'altro
+        policy.update({
+            "bcrypt__default_rounds": rounds,
+            "bcrypt__min_rounds": rounds,
+            "bcrypt__max_rounds": rounds + 1,
+        })
+
+    pwd_context.load(policy)
+    logger.info(f"Password hashing: {scheme}" + (f" ({rounds} rounds)" if rounds else ""))
+    return password_policy()
+
+
+def password_policy() -> dict:
+    scheme = pwd_context.default_scheme()
+    handler = pwd_context.handler(scheme)
+    if scheme == "argon2":
+        return {
+            "scheme": scheme,
+            "memory_cost": handler.memory_cost,
+            "time_cost": handler.default_rounds,
+            "parallelism": handler.parallelism,
+        }
+    return {"scheme": scheme, "rounds": handler.default_rounds}
+
+
+def get_password_hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verifica la password e, se l'hash è obsoleto rispetto alla policy, ne restituisce uno nuovo"""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+class PasswordHashingBusy(HTTPException):
+    def __init__(self):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server busy, retry later",
+            headers={"Retry-After": "1"}
+        )
+
+
+class PasswordHashExecutor:
+    """
+    Esegue hash e verifica delle password in un pool di thread dedicato,
+    così da non bloccare l'event loop. Le richieste oltre max_workers + max_queue
+    vengono rifiutate subito con 503.
+    Il pool viene creato da start() (lifespan) o al primo uso e ricreato dopo
+    shutdown(): l'app può avere più lifespan nello stesso processo.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int, latency_window: int = 1024):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending = 0
+        self._latencies = deque(maxlen=latency_window)
+        self.completed = 0
+        self.rejected = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return max(0, self._pending - self.max_workers)
+
+    def start(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix="password-hash"
+            )
+        return self._executor
+
+    async def run(self, fn: Callable, *args):
+        if self._pending >= self.max_workers + self.max_queue:
+            self.rejected += 1
+            raise PasswordHashingBusy()
+
+        def timed_call():
+            started = time.perf_counter()
+            result = fn(*args)
+            return result, time.perf_counter() - started
+
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            result, elapsed = await loop.run_in_executor(self.start(), timed_call)
+        finally:
+            self._pending -= 1
+
+        self._latencies.append(elapsed)
+        self.completed += 1
+        return result
+
+    def stats(self) -> dict:
+        latencies = sorted(self._latencies)
+
+        def percentile(p: float) -> float:
+            if not latencies:
+                return 0.0
+            index = min(len(latencies) - 1, int(p * len(latencies)))
+            return round(latencies[index] * 1000, 2)
+
+        return {
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "in_flight": self._pending,
+            "queue_depth": self.queue_depth,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "latency_ms": {
+                "p50": percentile(0.50),
+                "p95": percentile(0.95),
+                "p99": percentile(0.99),
+                "max": percentile(1.0),
+            },
+        }
+
+    def shutdown(self) -> None:
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+password_hasher = PasswordHashExecutor(
+    max_workers=settings.PASSWORD_HASH_MAX_CONCURRENCY,
+    max_queue=settings.PASSWORD_HASH_QUEUE_SIZE
+)
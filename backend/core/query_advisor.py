@@ -0,0 +1,229 @@
+import logging
+import re
+import threading
+
+from sqlalchemy import event
+
+from backend.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+_PARAM_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+\b")
+
+_TABLE_REF = re.compile(r"\b(?:FROM|JOIN)\s+\(?\s*\"?(\w+)\"?(?:\s+AS\s+\"?(\w+)\"?)?", re.IGNORECASE)
+_PREDICATE = re.compile(
+    r"\b(\w+)\.(\w+)\s*(=|!=|<>|<=|>=|<|>|\bIN\b|\bIS\b|\bLIKE\b|\bBETWEEN\b)", re.IGNORECASE
+)
+_REVERSED_PREDICATE = re.compile(r"(=|<=|>=|<|>)\s*(\w+)\.(\w+)\b")
+_ORDER_BY = re.compile(r"\bORDER BY\s+(.+?)(?:\bLIMIT\b|\bOFFSET\b|$)", re.IGNORECASE)
+_COLUMN_REF = re.compile(r"\b(\w+)\.(\w+)\b")
+_PLAN_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$")
+_PLAN_AUTOMATIC = re.compile(r"^SEARCH (?:TABLE )?(\w+).*USING AUTOMATIC (?:COVERING |PARTIAL )*INDEX \((.+)\)")
+
+EXPLAINABLE = ("select", "update", "delete", "with")
+EQUALITY_OPERATORS = {"=", "IN", "IS"}
+
+
+def statement_fingerprint(statement: str) -> str:
+    """Forma normalizzata di uno statement: stessi parametri e liste IN di lunghezza diversa coincidono"""
+    normalized = _WHITESPACE.sub(" ", statement.strip())
+    normalized = _STRING_LITERAL.sub("?", normalized)
+    normalized = _NUMBER_LITERAL.sub("?", normalized)
+    return _PARAM_LIST.sub("(?)", normalized)
+
+
+def _table_aliases(statement: str) -> dict:
+    aliases = {}
+    for table, alias in _TABLE_REF.findall(statement):
+        aliases[alias or table] = table
+    return aliases
+
+
+class QueryPlanAdvisor:
+    """
+    Strumentazione per lo sviluppo: esegue EXPLAIN QUERY PLAN una volta per
+    ogni fingerprint di statement, segnala scansioni complete e B-tree
+    temporanei e propone indici (compositi o coprenti) per le tabelle coinvolte.
+    """
+
+    covering_max_extra_columns = 3
+
+    def __init__(self, max_statements: int):
+        self.max_statements = max_statements
+        self._statements = {}  # fingerprint -> analisi
+        self._suggestions = {}  # nome indice -> suggerimento
+        self._existing_indexes = {}  # tabella -> liste di colonne indicizzate
+        self._engines = set()
+        self._lock = threading.Lock()
+
+    def install(self, sync_engine) -> None:
+        if id(sync_engine) in self._engines:
+            return
+        self._engines.add(id(sync_engine))
+        event.listen(sync_engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if executemany or not statement.lstrip()[:6].lower().startswith(EXPLAINABLE):
+            return
+        if "sqlite_" in statement:
+            return
+
+        fingerprint = statement_fingerprint(statement)
+        with self._lock:
+            entry = self._statements.get(fingerprint)
+            if entry is not None:
+                entry["count"] += 1
+                return
+            if len(self._statements) >= self.max_statements:
+                return
+            entry = self._statements[fingerprint] = {"count": 1}
+
+        try:
+            dbapi_cursor = conn.connection.dbapi_connection.cursor()
+            try:
+                dbapi_cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+                plan = [row[3] for row in dbapi_cursor.fetchall()]
+                entry.update(self._analyze(dbapi_cursor, fingerprint, plan))
+            finally:
+                dbapi_cursor.close()
+        except Exception as e:
+            entry.update({"plan": [], "issues": [f"EXPLAIN failed: {str(e)}"], "suggestions": []})
+            return
+
+        entry["statement"] = fingerprint
+        if entry["issues"]:
+            logger.warning(
+                f"Query plan: {'; '.join(entry['issues'])} -- {fingerprint[:200]}"
+                + (f" -- suggerito: {'; '.join(entry['suggestions'])}" if entry["suggestions"] else "")
+            )
+
+    def _analyze(self, dbapi_cursor, statement: str, plan: list) -> dict:
+        aliases = _table_aliases(statement)
+        issues, targets = [], {}
+
+        for detail in plan:
+            detail = detail.strip()
+            scan = _PLAN_SCAN.match(detail)
+            automatic = _PLAN_AUTOMATIC.match(detail)
+            if scan:
+                alias = scan.group(1)
+                issues.append(f"full scan of {aliases.get(alias, alias)}")
+                targets.setdefault(alias, set())
+            elif automatic:
+                alias = automatic.group(1)
+                issues.append(f"automatic index on {aliases.get(alias, alias)}")
+                targets.setdefault(alias, set())
+            elif detail.startswith("USE TEMP B-TREE"):
+                issues.append(detail.lower())
+                for alias in self._order_by_aliases(statement):
+                    targets.setdefault(alias, set()).add("order")
+
+        suggestions = []
+        for alias, reasons in targets.items():
+            suggestion = self._suggest_index(dbapi_cursor, statement, alias, aliases.get(alias, alias), reasons)
+            if suggestion is not None:
+                suggestions.append(suggestion["ddl"])
+        return {"plan": plan, "issues": issues, "suggestions": suggestions}
+
+    @staticmethod
+    def _order_by_aliases(statement: str) -> list:
+        match = _ORDER_BY.search(statement)
+        if not match:
+            return []
+        return list(dict.fromkeys(alias for alias, _ in _COLUMN_REF.findall(match.group(1))))
+
+    def _suggest_index(self, dbapi_cursor, statement: str, alias: str, table: str, reasons: set):
+        equality, ranges = [], []
+        for ref_alias, column, operator in _PREDICATE.findall(statement):
+            if ref_alias != alias:
+                continue
+            target = equality if operator.upper() in EQUALITY_OPERATORS else ranges
+            if column not in equality and column not in target:
+                target.append(column)
+        for operator, ref_alias, column in _REVERSED_PREDICATE.findall(statement):
+            if ref_alias == alias and column not in equality:
+                (equality if operator == "=" else ranges).append(column)
+
+        # Accesso per rowid (id = ? / id IN ...): l'ordinamento riguarda solo le righe trovate
+        if "id" in equality:
+            return None
+
+        columns = list(equality)
+        if ranges:
+            columns.append(ranges[0])
+        elif "order" in reasons:
+            match = _ORDER_BY.search(statement)
+            columns += [
+                column for ref_alias, column in _COLUMN_REF.findall(match.group(1))
+                if ref_alias == alias and column not in columns
+            ]
+        if not columns:
+            return None
+
+        # Pochi campi selezionati oltre alla chiave: indice coprente (id è il rowid)
+        from_position = statement.upper().find(" FROM ")
+        select_list = statement[:from_position] if statement[:6].upper() == "SELECT" and from_position > 0 else ""
+        selected = list(dict.fromkeys(
+            column for ref_alias, column in _COLUMN_REF.findall(select_list)
+            if ref_alias == alias and column not in columns and column != "id"
+        ))
+        covering = 0 < len(selected) <= self.covering_max_extra_columns
+        if covering:
+            columns += selected
+
+        if self._is_indexed(dbapi_cursor, table, columns, len(equality)):
+            return None
+
+        name = f"ix_{table}_{'_'.join(columns)}"[:60]
+        suggestion = {
+            "table": table,
+            "columns": columns,
+            "covering": covering,
+            "ddl": f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})",
+            "model": f"Index('{name}', {', '.join(repr(column) for column in columns)})",
+        }
+        with self._lock:
+            self._suggestions.setdefault(name, suggestion)
+        return suggestion
+
+    def _is_indexed(self, dbapi_cursor, table: str, columns: list, equality_count: int) -> bool:
+        """Vero se un indice esistente ha già queste colonne come prefisso (in qualsiasi ordine per le uguaglianze)"""
+        if table not in self._existing_indexes:
+            indexed = []
+            dbapi_cursor.execute(f"PRAGMA index_list({table})")
+            for index_row in dbapi_cursor.fetchall():
+                dbapi_cursor.execute(f"PRAGMA index_info({index_row[1]})")
+                indexed.append([row[2] for row in sorted(dbapi_cursor.fetchall())])
+            self._existing_indexes[table] = indexed
+        return any(
+            set(index[:equality_count]) == set(columns[:equality_count])
+            and index[equality_count:len(columns)] == columns[equality_count:]
+            for index in self._existing_indexes[table]
+        )
+
+    def report(self) -> dict:
+        with self._lock:
+            findings = [
+                {"statement": fingerprint, **entry}
+                for fingerprint, entry in self._statements.items()
+                if entry.get("issues")
+            ]
+            suggestions = list(self._suggestions.values())
+        return {
+            "statements_analyzed": len(self._statements),
+            "findings": sorted(findings, key=lambda finding: finding["count"], reverse=True),
+            "suggested_indexes": suggestions,
+            "migration": "\n".join(f"{suggestion['ddl']};" for suggestion in suggestions),
+        }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._statements.clear()
+            self._suggestions.clear()
+            self._existing_indexes.clear()
+
+
+query_advisor = QueryPlanAdvisor(settings.QUERY_ADVISOR_MAX_STATEMENTS)
@@ -0,0 +1,188 @@
+import logging
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from fastapi import HTTPException, Request, status
+from starlette.concurrency import run_in_threadpool
+
+from backend.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitExceeded(HTTPException):
+    def __init__(self, retry_after: float):
+        super().__init__(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many attempts, retry later",
+            headers={"Retry-After": str(max(1, int(retry_after + 0.999)))}
+        )
+
+
+class RateLimiterUnavailable(HTTPException):
+    def __init__(self):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Authentication temporarily unavailable, retry later",
+            headers={"Retry-After": "1"}
+        )
+
+
+class MemoryBucketStore:
+    """Token bucket in memoria: per ogni chiave solo (token residui, ultimo aggiornamento)"""
+
+    blocking = False
+
+    def __init__(self, sweep_interval: float = 60.0):
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._sweep_interval = sweep_interval
+        self._last_sweep = time.monotonic()
+        self._refill_time = 0.0
+
+    def take(self, key: str, capacity: float, rate: float) -> float:
+        now = time.monotonic()
+        with self._lock:
+            self._refill_time = max(self._refill_time, capacity / rate)
+            if now - self._last_sweep >= self._sweep_interval:
+                self._sweep(now)
+
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            if tokens < 1:
+                self._buckets[key] = (tokens, now)
+                return (1 - tokens) / rate
+            self._buckets[key] = (tokens - 1, now)
+            return 0.0
+
+    def _sweep(self, now: float) -> None:
+        # I bucket tornati pieni equivalgono a chiavi mai viste: si possono eliminare
+        self._buckets = {
+            key: bucket for key, bucket in self._buckets.items()
+            if now - bucket[1] < self._refill_time
+        }
+        self._last_sweep = now
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class SQLiteBucketStore:
+    """
+    Token bucket su file SQLite locale, condiviso da tutti i worker uvicorn
+    della stessa macchina. Ogni tentativo è una singola transazione IMMEDIATE.
+    Le chiamate sono bloccanti: AuthRateLimiter le esegue nel threadpool.
+    """
+
+    blocking = True
+
+    def __init__(self, path: str, sweep_interval: float = 60.0):
+        self._conn = sqlite3.connect(path, timeout=1.0, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=OFF")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_buckets "
+            "(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+        )
+        self._lock = threading.Lock()
+        self._sweep_interval = sweep_interval
+        self._last_sweep = time.time()
+        self._refill_time = 0.0
+
+    def take(self, key: str, capacity: float, rate: float) -> float:
+        # time.time() e non monotonic: il valore deve essere confrontabile tra processi
+        now = time.time()
+        with self._lock:
+            self._refill_time = max(self._refill_time, capacity / rate)
+            cursor = self._conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                if now - self._last_sweep >= self._sweep_interval:
+                    cursor.execute("DELETE FROM rate_buckets WHERE updated < ?", (now - self._refill_time,))
+                    self._last_sweep = now
+
+                row = cursor.execute(
+                    "SELECT tokens, updated FROM rate_buckets WHERE key = ?", (key,)
+                ).fetchone()
+                tokens, updated = row if row else (capacity, now)
+                tokens = min(capacity, tokens + max(0.0, now - updated) * rate)
+                wait = 0.0 if tokens >= 1 else (1 - tokens) / rate
+                if not wait:
+                    tokens -= 1
+                cursor.execute(
+                    "INSERT OR REPLACE INTO rate_buckets (key, tokens, updated) VALUES (?, ?, ?)",
+                    (key, tokens, now)
+                )
+                cursor.execute("COMMIT")
+            except Exception:
+                cursor.execute("ROLLBACK")
+                raise
+            return wait
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM rate_buckets").fetchone()[0]
+
+
+class AuthRateLimiter:
+    """
+    Limita i tentativi su login e registrazione per IP e per email, prima di
+    qualsiasi accesso al DB o calcolo bcrypt. Se lo store non risponde la
+    richiesta passa (AUTH_RATE_LIMIT_FAIL_OPEN) oppure riceve un 503.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.rejected = 0
+        self.errors = 0
+
+    async def _take(self, key: str, capacity: float, rate: float) -> float:
+        if self.store.blocking:
+            return await run_in_threadpool(self.store.take, key, capacity, rate)
+        return self.store.take(key, capacity, rate)
+
+    async def check(self, request: Request, scope: str, email: Optional[str] = None) -> None:
+        if not settings.AUTH_RATE_LIMIT_ENABLED:
+            return
+
+        ip = request.client.host if request.client else "unknown"
+        try:
+            wait = await self._take(
+                f"{scope}:ip:{ip}",
+                settings.AUTH_RATE_LIMIT_IP_BURST,
+                settings.AUTH_RATE_LIMIT_IP_PER_MINUTE / 60
+            )
+            if not wait and email:
+                wait = await self._take(
+                    f"{scope}:email:{email.strip().lower()}",
+                    settings.AUTH_RATE_LIMIT_EMAIL_BURST,
+                    settings.AUTH_RATE_LIMIT_EMAIL_PER_MINUTE / 60
+                )
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Rate limiter store failed ({scope}): {str(e)}")
+            if settings.AUTH_RATE_LIMIT_FAIL_OPEN:
+                return
+            raise RateLimiterUnavailable()
+
+        if wait:
+            self.rejected += 1
+            raise RateLimitExceeded(wait)
+
+    async def stats(self) -> dict:
+        try:
+            tracked = await run_in_threadpool(len, self.store) if self.store.blocking else len(self.store)
+        except Exception:
+            tracked = None
+        return {"tracked_keys": tracked, "rejected": self.rejected, "errors": self.errors}
+
+
+def _build_store():
+    if settings.AUTH_RATE_LIMIT_BACKEND == "sqlite":
+        return SQLiteBucketStore(settings.AUTH_RATE_LIMIT_SQLITE_PATH)
+    return MemoryBucketStore()
+
+
+auth_rate_limiter = AuthRateLimiter(_build_store())
@@ -0,0 +1,416 @@
+"""
+Cache delle risposte GET di schede ed esercizi.
+
+La chiave è (utente, ruolo, path, query string); ogni voce ha come tag la
+collezione da cui dipende (backend.core.collection_versions). I servizi che
+scrivono incrementano la versione della collezione: al commit della sessione
+le voci con quel tag vengono invalidate. Un hit non tocca il DB.
+
+Backend "memory": LRU per processo, con TTL e tetto sui byte totali.
+Backend "sqlite": file locale condiviso da tutti i worker uvicorn della
+macchina, così le invalidazioni di un worker valgono per tutti. Le sue
+chiamate sono bloccanti e vengono eseguite nel threadpool.
+
+La cache non è mai indispensabile: un errore dello store vale come miss
+(o come put/invalidazione non eseguita) e la richiesta prosegue sul DB.
+"""
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+from fastapi import Request, Response
+from sqlalchemy import event
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from backend.core.collection_versions import (
+    CHANGED_COLLECTIONS, NotModified, collection_tag, conditional_get, etag_matches
+)
+from backend.core.config import settings
+from backend.core.fast_json import render_json
+
+logger = logging.getLogger(__name__)
+
+Entry = Tuple[bytes, Dict[str, str]]
+
+# Byte stimati per chiave, tuple e dizionari di una voce, oltre al corpo
+_ENTRY_OVERHEAD = 200
+
+
+def _entry_size(key: str, body: bytes, headers: Dict[str, str]) -> int:
+    return len(key) + len(body) + sum(len(name) + len(value) for name, value in headers.items()) + _ENTRY_OVERHEAD
+
+
+class MemoryResponseStore:
+    """LRU in memoria: voci con scadenza, tetto sui byte totali e indice tag -> chiavi"""
+
+    blocking = False
+
+    def __init__(self, max_bytes: int, ttl: int):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # chiave -> (body, headers, tags, scadenza, size)
+        self._tag_keys: Dict[str, set] = {}
+        self._generations: Dict[str, int] = {}  # invalidazioni per tag, per scartare risposte superate
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Entry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[3] <= time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[0], entry[1]
+
+    def generations(self, tags: Iterable[str]) -> tuple:
+        with self._lock:
+            return tuple(self._generations.get(tag, 0) for tag in tags)
+
+    def put(self, key: str, body: bytes, headers: Dict[str, str], tags: tuple, generations: tuple) -> bool:
+        size = _entry_size(key, body, headers)
+        with self._lock:
+            # Invalidata mentre la risposta veniva costruita: potrebbe contenere dati vecchi
+            if tuple(self._generations.get(tag, 0) for tag in tags) != generations:
+                return False
+            self._remove(key)
+            self._entries[key] = (body, headers, tags, time.monotonic() + self.ttl, size)
+            self._size += size
+            for tag in tags:
+                self._tag_keys.setdefault(tag, set()).add(key)
+            while self._size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+            return True
+
+    def invalidate(self, tags: Iterable[str]) -> int:
+        removed = 0
+        with self._lock:
+            for tag in tags:
+                self._generations[tag] = self._generations.get(tag, 0) + 1
+                for key in self._tag_keys.pop(tag, ()):
+                    removed += self._remove(key)
+        return removed
+
+    def _remove(self, key: str) -> int:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return 0
+        self._size -= entry[4]
+        for tag in entry[2]:
+            keys = self._tag_keys.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tag_keys[tag]
+        return 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._tag_keys.clear()
+            self._size = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._size}
+
+
+class SQLiteResponseStore:
+    """
+    Stessa cache su file SQLite locale, condivisa dai worker della macchina.
+    LRU approssimato sull'ultimo accesso; ogni scrittura è una transazione IMMEDIATE.
+    Gli hit non scrivono: gli accessi vengono registrati in memoria e salvati
+    alla put successiva, l'unico momento in cui servono (eviction).
+    """
+
+    blocking = True
+
+    def __init__(self, path: str, max_bytes: int, ttl: int, sweep_interval: float = 60.0):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._conn = sqlite3.connect(path, timeout=1.0, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=OFF")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS cache_entries (
+                key TEXT PRIMARY KEY, body BLOB NOT NULL, headers TEXT NOT NULL,
+                expires_at REAL NOT NULL, accessed_at REAL NOT NULL, size INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS ix_cache_entries_accessed ON cache_entries (accessed_at);
+            CREATE TABLE IF NOT EXISTS cache_tags (
+                tag TEXT NOT NULL, key TEXT NOT NULL, PRIMARY KEY (tag, key)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS cache_generations (tag TEXT PRIMARY KEY, generation INTEGER NOT NULL);
+            """
+        )
+        self._lock = threading.Lock()
+        self._sweep_interval = sweep_interval
+        self._last_sweep = time.time()
+        self._accessed: Dict[str, float] = {}  # chiave -> ultimo hit non ancora salvato
+
+    def _transaction(self, work: Callable[[sqlite3.Cursor], Any]) -> Any:
+        with self._lock:
+            cursor = self._conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                result = work(cursor)
+                cursor.execute("COMMIT")
+            except Exception:
+                cursor.execute("ROLLBACK")
+                raise
+            return result
+
+    def get(self, key: str) -> Optional[Entry]:
+        # time.time() e non monotonic: il valore deve essere confrontabile tra processi
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, headers FROM cache_entries WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+            if row is not None:
+                self._accessed[key] = now
+        return (row[0], json.loads(row[1])) if row is not None else None
+
+    def _generations(self, cursor: sqlite3.Cursor, tags: Iterable[str]) -> tuple:
+        generations = []
+        for tag in tags:
+            row = cursor.execute("SELECT generation FROM cache_generations WHERE tag = ?", (tag,)).fetchone()
+            generations.append(row[0] if row else 0)
+        return tuple(generations)
+
+    def generations(self, tags: Iterable[str]) -> tuple:
+        with self._lock:
+            return self._generations(self._conn.cursor(), tags)
+
+    def put(self, key: str, body: bytes, headers: Dict[str, str], tags: tuple, generations: tuple) -> bool:
+        now = time.time()
+        size = _entry_size(key, body, headers)
+
+        def work(cursor: sqlite3.Cursor) -> bool:
+            if self._generations(cursor, tags) != generations:
+                return False
+            if now - self._last_sweep >= self._sweep_interval:
+                self._delete(cursor, "SELECT key FROM cache_entries WHERE expires_at <= ?", (now,))
+                self._last_sweep = now
+
+            cursor.execute("DELETE FROM cache_tags WHERE key = ?", (key,))
+            cursor.execute(
+                "INSERT OR REPLACE INTO cache_entries (key, body, headers, expires_at, accessed_at, size) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, body, json.dumps(headers), now + self.ttl, now, size)
+            )
+            cursor.executemany("INSERT INTO cache_tags (tag, key) VALUES (?, ?)", [(tag, key) for tag in tags])
+
+            # Ultimi accessi di questo worker, prima di scegliere le voci da eliminare
+            accessed, self._accessed = self._accessed, {}
+            cursor.executemany(
+                "UPDATE cache_entries SET accessed_at = MAX(accessed_at, ?) WHERE key = ?",
+                [(at, accessed_key) for accessed_key, at in accessed.items()]
+            )
+
+            excess = cursor.execute("SELECT COALESCE(SUM(size), 0) FROM cache_entries").fetchone()[0] - self.max_bytes
+            if excess > 0:
+                evicted = []
+                for old_key, old_size in cursor.execute(
+                        "SELECT key, size FROM cache_entries ORDER BY accessed_at").fetchall():
+                    if excess <= 0:
+                        break
+                    evicted.append(old_key)
+                    excess -= old_size
+                self._delete_keys(cursor, evicted)
+            return True
+
+        return self._transaction(work)
+
+    def invalidate(self, tags: Iterable[str]) -> int:
+        tags = list(tags)
+
+        def work(cursor: sqlite3.Cursor) -> int:
+            removed = 0
+            for tag in tags:
+                cursor.execute(
+                    "INSERT INTO cache_generations (tag, generation) VALUES (?, 1) "
+                    "ON CONFLICT (tag) DO UPDATE SET generation = generation + 1",
+                    (tag,)
+                )
+                removed += self._delete(cursor, "SELECT key FROM cache_tags WHERE tag = ?", (tag,))
+            return removed
+
+        return self._transaction(work)
+
+    def _delete(self, cursor: sqlite3.Cursor, select_keys: str, params: tuple) -> int:
+        keys = [row[0] for row in cursor.execute(select_keys, params).fetchall()]
+        self._delete_keys(cursor, keys)
+        return len(keys)
+
+    @staticmethod
+    def _delete_keys(cursor: sqlite3.Cursor, keys: list) -> None:
+        cursor.executemany("DELETE FROM cache_entries WHERE key = ?", [(key,) for key in keys])
+        cursor.executemany("DELETE FROM cache_tags WHERE key = ?", [(key,) for key in keys])
+
+    def clear(self) -> None:
+        def work(cursor: sqlite3.Cursor) -> None:
+            cursor.execute("DELETE FROM cache_entries")
+            cursor.execute("DELETE FROM cache_tags")
+
+        self._transaction(work)
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache_entries"
+            ).fetchone()
+        return {"entries": entries, "bytes": size}
+
+
+class ResponseCache:
+    def __init__(self, store, max_entry_bytes: int):
+        self.store = store
+        self.max_entry_bytes = max_entry_bytes
+        self.hits = 0
+        self.misses = 0
+        self.stored = 0
+        self.discarded = 0  # risposte invalidate mentre venivano costruite
+        self.invalidations = 0
+        self.errors = 0
+        self._pending = set()  # invalidazioni in corso nel threadpool
+
+    async def _call(self, method: Callable, *args, default: Any = None) -> Any:
+        """Chiamata allo store fuori dall'event loop se bloccante; in caso di errore restituisce default"""
+        try:
+            if self.store.blocking:
+                return await run_in_threadpool(method, *args)
+            return method(*args)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Response cache {method.__name__} failed: {str(e)}")
+            return default
+
+    async def respond(
+            self,
+            request: Request,
+            db: AsyncSession,
+            user,
+            collection: str,
+            build: Callable[[], Awaitable[Any]],
+            schema: Any = None
+    ) -> Response:
+        """
+        Risposta JSON per una GET che dipende dalla collezione dell'utente:
+        dalla cache se presente, altrimenti costruita da build() con gli header
+        ETag di conditional_get. If-None-Match viene verificato in entrambi i casi.
+        """
+        enabled = settings.RESPONSE_CACHE_ENABLED
+        tags = (collection_tag(collection, user.id),)
+        query = "&".join(f"{name}={value}" for name, value in sorted(request.query_params.multi_items()))
+        key = f"{user.id}:{getattr(user.role, 'value', user.role)}:{request.url.path}?{query}"
+
+        if enabled:
+            if self._pending:
+                # Le scritture già confermate da questo worker devono essere visibili
+                await asyncio.wait(list(self._pending))
+            entry = await self._call(self.store.get, key)
+            if entry is not None:
+                self.hits += 1
+                body, headers = entry
+                if_none_match = request.headers.get("if-none-match")
+                if if_none_match and "ETag" in headers and etag_matches(if_none_match, headers["ETag"]):
+                    raise NotModified(headers)
+                return Response(body, media_type="application/json", headers={**headers, "X-Cache": "HIT"})
+            self.misses += 1
+            # Letta prima dei dati: una scrittura che arriva nel frattempo scarta la risposta
+            generations = await self._call(self.store.generations, tags)
+
+        conditional = await conditional_get(request, db, collection, user.id)
+        result = await build()
+        body = result.body if isinstance(result, Response) else render_json(result, schema)
+        headers = dict(conditional.headers)
+
+        if enabled:
+            headers["X-Cache"] = "MISS"
+            # generations None: store non raggiungibile, non si può escludere un'invalidazione
+            if generations is not None and len(body) <= self.max_entry_bytes:
+                stored = await self._call(self.store.put, key, body, conditional.headers, tags, generations)
+                if stored:
+                    self.stored += 1
+                elif stored is not None:
+                    self.discarded += 1
+        return Response(body, media_type="application/json", headers=headers)
+
+    def invalidate(self, tags: Iterable[str]) -> None:
+        """
+        Invalida le voci con questi tag. Chiamata dall'evento after_commit (sincrono):
+        con uno store bloccante e un event loop attivo viene eseguita nel threadpool
+        e le richieste successive di questo worker la attendono prima di leggere.
+        """
+        tags = list(tags)
+        if self.store.blocking:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                loop = None
+            if loop is not None:
+                future = loop.run_in_executor(None, self._invalidate, tags)
+                self._pending.add(future)
+                future.add_done_callback(self._pending.discard)
+                return
+        self._invalidate(tags)
+
+    def _invalidate(self, tags: list) -> None:
+        try:
+            self.invalidations += self.store.invalidate(tags)
+        except Exception as e:
+            # Le voci restano al più fino alla scadenza del TTL
+            self.errors += 1
+            logger.warning(f"Response cache invalidation failed: {str(e)}")
+
+    async def clear(self) -> None:
+        await self._call(self.store.clear)
+
+    async def stats(self) -> dict:
+        return {
+            "backend": settings.RESPONSE_CACHE_BACKEND,
+            **await self._call(self.store.stats, default={}),
+            "hits": self.hits,
+            "misses": self.misses,
+            "stored": self.stored,
+            "discarded": self.discarded,
+            "invalidations": self.invalidations,
+            "errors": self.errors,
+        }
+
+
+def _build_store():
+    if settings.RESPONSE_CACHE_BACKEND == "sqlite":
+        return SQLiteResponseStore(
+            settings.RESPONSE_CACHE_SQLITE_PATH, settings.RESPONSE_CACHE_MAX_BYTES, settings.RESPONSE_CACHE_TTL_SECONDS
+        )
+    return MemoryResponseStore(settings.RESPONSE_CACHE_MAX_BYTES, settings.RESPONSE_CACHE_TTL_SECONDS)
+
+
+response_cache = ResponseCache(_build_store(), settings.RESPONSE_CACHE_MAX_ENTRY_BYTES)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session):
+    # Solo dopo il commit: una lettura concorrente non può rimettere in cache i dati vecchi
+    tags = session.info.pop(CHANGED_COLLECTIONS, None)
+    if tags:
+        response_cache.invalidate(tags)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_rolled_back(session, transaction):
+    # Transazione principale annullata: le collezioni non sono cambiate
+    if transaction.parent is None:
+        session.info.pop(CHANGED_COLLECTIONS, None)
@@ -0,0 +1,139 @@
+import asyncio
+import hashlib
+import logging
+import math
+import threading
+import time
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.core.config import settings
+from backend.core.database import AsyncSessionLocal, ReadSessionLocal
+from backend.db_models.revoked_token import RevokedToken
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    """Filtro di Bloom su bytearray: nessun falso negativo, falsi positivi ~error_rate"""
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, key: str) -> None:
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class RevocationList:
+    """
+    Elenco in memoria dei jti revocati, con un filtro di Bloom davanti: per i
+    token non revocati (il caso comune) basta il filtro. La tabella
+    revoked_tokens è la fonte condivisa: ogni worker la rilegge periodicamente
+    per ricevere le revoche fatte dagli altri processi.
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._revoked = {}  # jti -> exp (epoch)
+        self._last_seen_id = 0
+        self._lock = threading.Lock()
+        self.filter_positives = 0
+
+    def is_revoked(self, jti: Optional[str]) -> bool:
+        if not jti or jti not in self._bloom:
+            return False
+        self.filter_positives += 1
+        expires_at = self._revoked.get(jti)
+        return expires_at is not None and expires_at > time.time()
+
+    def add(self, jti: str, expires_at: float) -> None:
+        with self._lock:
+            self._revoked[jti] = expires_at
+            self._bloom.add(jti)
+
+    def _purge_expired(self) -> None:
+        # Un filtro di Bloom non supporta la rimozione: lo ricostruiamo senza i jti scaduti
+        now = time.time()
+        with self._lock:
+            self._revoked = {jti: exp for jti, exp in self._revoked.items() if exp > now}
+            bloom = BloomFilter(max(self.capacity, len(self._revoked)), self.error_rate)
+            for jti in self._revoked:
+                bloom.add(jti)
+            self._bloom = bloom
+
+    async def refresh(self, db: AsyncSession) -> None:
+        result = await db.execute(
+            select(RevokedToken.id, RevokedToken.jti, RevokedToken.expires_at)
+            .where(RevokedToken.id > self._last_seen_id)
+            .order_by(RevokedToken.id)
+        )
+        for row_id, jti, expires_at in result.all():
+            self.add(jti, _to_epoch(expires_at))
+            self._last_seen_id = row_id
+
+    async def run_sync_loop(self) -> None:
+        """Task di background: propaga le revoche tra i worker e pulisce quelle scadute"""
+        last_purge = time.monotonic()
+        while True:
+            await asyncio.sleep(settings.REVOCATION_SYNC_SECONDS)
+            try:
+                async with ReadSessionLocal() as db:
+                    await self.refresh(db)
+                if time.monotonic() - last_purge >= settings.REVOCATION_PURGE_SECONDS:
+                    async with AsyncSessionLocal() as db:
+                        await db.execute(
+                            delete(RevokedToken).where(RevokedToken.expires_at < datetime.utcnow())
+                        )
+                        await db.commit()
+                    self._purge_expired()
+                    last_purge = time.monotonic()
+            except Exception as e:
+                logger.warning(f"Revocation sync failed: {str(e)}")
+
+    def stats(self) -> dict:
+        return {
+            "revoked": len(self._revoked),
+            "filter_bits": self._bloom.size,
+            "filter_hashes": self._bloom.hash_count,
+            "filter_positives": self.filter_positives,
+        }
+
+
+def _to_epoch(value: datetime) -> float:
+    return (value.replace(tzinfo=None) - datetime(1970, 1, 1)).total_seconds()
+
+
+revocation_list = RevocationList(
+    settings.REVOCATION_FILTER_CAPACITY,
+    settings.REVOCATION_FILTER_ERROR_RATE
+)
+
+
+async def revoke_access_token(db: AsyncSession, payload: dict) -> None:
+    jti = payload.get("jti")
+    exp = payload.get("exp")
+    if not jti or not exp:
+        return
+
+    revocation_list.add(jti, float(exp))
+    existing = await db.execute(select(RevokedToken.id).where(RevokedToken.jti == jti))
+    if existing.scalar_one_or_none() is None:
+        db.add(RevokedToken(jti=jti, expires_at=datetime.utcfromtimestamp(exp)))
+        await db.commit()
@@ -0,0 +1,147 @@
+import hashlib
+import json
+import logging
+
+from sqlalchemy import inspect, text
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from backend.core.config import settings
+from backend.core.muscle_index import backfill_muscle_tags
+from backend.core.search_index import SEARCH_INDEX_DDL, ensure_search_index
+from backend.core.trainee_feed import rebuild_all_feeds
+from backend.db_models.base import Base
+
+logger = logging.getLogger(__name__)
+
+# Indici aggiuntivi richiesti, non dichiarati sui modelli
+REQUIRED_INDEXES = {
+    'users': [
+        {'name': 'uidx_users_email', 'columns': ['email'], 'unique': True},
+    ],
+    'workout_assignments': [
+        {'name': 'uidx_assignments_user_workout',
+         'columns': ['user_id', 'workout_id'], 'unique': True}
+    ]
+}
+
+SCHEMA_META_DDL = "CREATE TABLE IF NOT EXISTS schema_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+FINGERPRINT_KEY = "schema_fingerprint"
+
+
+def schema_fingerprint() -> str:
+    """Hash del DDL di tutte le tabelle e indici dei modelli, degli indici aggiuntivi e dell'indice full-text"""
+    dialect = sqlite.dialect()
+    digest = hashlib.sha256()
+    for table_name in sorted(Base.metadata.tables):
+        table = Base.metadata.tables[table_name]
+        digest.update(str(CreateTable(table).compile(dialect=dialect)).encode())
+        for index in sorted(table.indexes, key=lambda idx: idx.name):
+            digest.update(str(CreateIndex(index).compile(dialect=dialect)).encode())
+    digest.update(json.dumps(REQUIRED_INDEXES, sort_keys=True).encode())
+    for statement in SEARCH_INDEX_DDL:
+        digest.update(statement.encode())
+    return digest.hexdigest()
+
+
+def _full_schema_check(sync_conn) -> None:
+    """Riflette il DB e crea tabelle, colonne e indici mancanti"""
+    inspector = inspect(sync_conn)
+    existing_tables = set(inspector.get_table_names())
+
+    tables_to_create = [
+        table for name, table in Base.metadata.tables.items() if name not in existing_tables
+    ]
+    if tables_to_create:
+        Base.metadata.create_all(sync_conn, tables=tables_to_create, checkfirst=True)
+        logger.info("\n✅ Tabelle create:")
+        for table in tables_to_create:
+            logger.info(f"- {table.name}")
+
+        # Tabelle derivate aggiunte a un DB esistente: popolate dai dati già presenti
+        created = {table.name for table in tables_to_create}
+        if "exercise_muscles" in created and "exercises" in existing_tables:
+            count = backfill_muscle_tags(sync_conn)
+            logger.info(f"  ✅ Tag muscolari generati per {count} esercizi")
+        if "trainee_feeds" in created and "workout_assignments" in existing_tables:
+            count = rebuild_all_feeds(sync_conn)
+            logger.info(f"  ✅ Feed generati per {count} allievi")
+    else:
+        logger.info("\nℹ️ Tutte le tabelle esistono già")
+
+    logger.info("\n🔍 Verifica colonne e indici:")
+    for table_name, table in Base.metadata.tables.items():
+        if table_name not in existing_tables:
+            continue
+
+        # Colonne aggiunte ai modelli dopo la creazione delle tabelle
+        existing_column_names = {col['name'] for col in inspector.get_columns(table_name)}
+        for column in table.columns:
+            if column.name not in existing_column_names:
+                column_ddl = f"{column.name} {column.type.compile(dialect=sync_conn.dialect)}"
+                # SQLite accetta NOT NULL su ADD COLUMN solo con un default costante
+                if column.server_default is not None and isinstance(column.server_default.arg, str):
+                    column_ddl += f" DEFAULT '{column.server_default.arg}'"
+                    if not column.nullable:
+                        column_ddl += " NOT NULL"
+                sync_conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {column_ddl}"))
+                logger.info(f"  ✅ Aggiunta colonna {column.name} a {table_name}")
+
+        existing_index_names = {idx['name'] for idx in inspector.get_indexes(table_name)}
+        for index in table.indexes:
+            if index.name not in existing_index_names:
+                try:
+                    index.create(sync_conn)
+                    logger.info(f"  ✅ Creato indice {index.name} su {table_name}")
+                except Exception as e:
+                    logger.warning(f"  ⚠️ Errore creazione indice {index.name}: {str(e)}")
+            else:
+                logger.debug(f"  ✔️ Indice {index.name} esiste già su {table_name}")
+
+    for table, indexes in REQUIRED_INDEXES.items():
+        for index in indexes:
+            try:
+                columns = ", ".join(index['columns'])
+                unique = "UNIQUE" if index['unique'] else ""
+                sync_conn.execute(text(
+                    f"CREATE {unique} INDEX IF NOT EXISTS {index['name']} "
+                    f"ON {table} ({columns})"
+                ))
+            except Exception as e:
+                logger.error(f"  ❌ Errore creazione indice aggiuntivo {index['name']}: {str(e)}")
+
+    ensure_search_index(sync_conn)
+
+
+async def sync_schema(engine: AsyncEngine, force: bool = False) -> bool:
+    """
+    Allinea lo schema del DB ai modelli. Se l'impronta salvata in schema_meta
+    coincide con quella dei modelli la riflessione viene saltata del tutto.
+    Restituisce True se è stato eseguito il controllo completo.
+    """
+    fingerprint = schema_fingerprint()
+    async with engine.begin() as conn:
+        await conn.execute(text(SCHEMA_META_DDL))
+        result = await conn.execute(
+            text("SELECT value FROM schema_meta WHERE key = :key"), {"key": FINGERPRINT_KEY}
+        )
+        stored = result.scalar_one_or_none()
+
+        if stored == fingerprint and not force and settings.SCHEMA_FINGERPRINT_ENABLED:
+            logger.info("\nℹ️ Schema invariato, verifica tabelle e indici saltata")
+            return False
+
+        await conn.run_sync(_full_schema_check)
+        await conn.execute(
+            text("INSERT OR REPLACE INTO schema_meta (key, value) VALUES (:key, :value)"),
+            {"key": FINGERPRINT_KEY, "value": fingerprint}
+        )
+        return True
+
+
+async def clear_schema_fingerprint(engine: AsyncEngine) -> None:
+    """Forza il controllo completo al prossimo avvio"""
+    async with engine.begin() as conn:
+        await conn.execute(text(SCHEMA_META_DDL))
+        await conn.execute(text("DELETE FROM schema_meta WHERE key = :key"), {"key": FINGERPRINT_KEY})
@@ -0,0 +1,91 @@
+"""
+Indice full-text FTS5 sugli esercizi (name, description, target_muscles).
+La tabella è a contenuto esterno: il testo resta in exercises e i trigger
+tengono allineato l'indice a ogni INSERT, UPDATE e DELETE.
+
+Ricostruzione per i dati esistenti: python -m backend.core.search_index --rebuild
+"""
+import logging
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = "exercises_fts"
+
+# Pesi BM25 per colonna, nell'ordine di dichiarazione della tabella: sono la
+# funzione di rank persistente dell'indice, così ORDER BY rank viene risolto
+# dentro FTS5 senza un sort temporaneo
+BM25_WEIGHTS = (10.0, 1.0, 4.0)
+
+SEARCH_INDEX_DDL = (
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        name, description, target_muscles,
+        content='exercises', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON exercises BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, description, target_muscles)
+        VALUES (new.id, new.name, new.description, new.target_muscles);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON exercises BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description, target_muscles)
+        VALUES ('delete', old.id, old.name, old.description, old.target_muscles);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF name, description, target_muscles ON exercises BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description, target_muscles)
+        VALUES ('delete', old.id, old.name, old.description, old.target_muscles);
+        INSERT INTO {FTS_TABLE}(rowid, name, description, target_muscles)
+        VALUES (new.id, new.name, new.description, new.target_muscles);
+    END""",
+    f"""INSERT INTO {FTS_TABLE}({FTS_TABLE}, rank)
+        VALUES ('rank', 'bm25({", ".join(str(weight) for weight in BM25_WEIGHTS)})')""",
+)
+
+
+def ensure_search_index(sync_conn) -> bool:
+    """Crea tabella FTS e trigger se mancano; un indice nuovo viene popolato subito"""
+    exists = sync_conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": FTS_TABLE}
+    ).first() is not None
+    for statement in SEARCH_INDEX_DDL:
+        sync_conn.execute(text(statement))
+    if not exists:
+        rebuild_search_index(sync_conn)
+        logger.info(f"  ✅ Creato indice full-text {FTS_TABLE}")
+    return not exists
+
+
+def rebuild_search_index(sync_conn) -> None:
+    """Rigenera l'indice dal contenuto attuale di exercises e lo compatta"""
+    sync_conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+    sync_conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')"))
+
+
+def drop_search_index(sync_conn) -> None:
+    # I trigger vengono eliminati insieme alla tabella exercises
+    sync_conn.execute(text(f"DROP TABLE IF EXISTS {FTS_TABLE}"))
+
+
+if __name__ == "__main__":
+    import argparse
+    import asyncio
+
+    parser = argparse.ArgumentParser(description="Indice full-text degli esercizi")
+    parser.add_argument("--rebuild", action="store_true", help="Ricostruisce l'indice dai dati esistenti")
+    args = parser.parse_args()
+
+    async def main():
+        from backend.core.database import async_engine, dispose_engines
+
+        async with async_engine.begin() as conn:
+            await conn.run_sync(ensure_search_index)
+            if args.rebuild:
+                await conn.run_sync(rebuild_search_index)
+            # count(*) sulla tabella FTS leggerebbe exercises: docsize ha una riga per documento indicizzato
+            count = (await conn.execute(text(f"SELECT count(*) FROM {FTS_TABLE}_docsize"))).scalar_one()
+        await dispose_engines()
+        print(f"{FTS_TABLE}: {count} esercizi indicizzati")
+
+    asyncio.run(main())
@@ -0,0 +1,109 @@
+import logging
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional
+
+from fastapi import Request
+from sqlalchemy import event
+
+from backend.core.config import settings
+from backend.core.query_advisor import statement_fingerprint
+
+logger = logging.getLogger(__name__)
+
+
+class RequestSQLStats:
+    """Statement e tempo DB accumulati durante una singola richiesta"""
+
+    __slots__ = ("statements", "db_time", "fingerprints")
+
+    def __init__(self, track_fingerprints: bool):
+        self.statements = 0
+        self.db_time = 0.0
+        self.fingerprints = Counter() if track_fingerprints else None
+
+
+_current_stats: ContextVar[Optional[RequestSQLStats]] = ContextVar("request_sql_stats", default=None)
+
+
+class SQLMetrics:
+    """
+    Hook SQLAlchemy che contano statement e tempo DB per richiesta.
+    Le richieste vengono riconosciute tramite una ContextVar impostata dal
+    middleware: le query dei task di background non vengono attribuite.
+    """
+
+    def __init__(self, n_plus_one_threshold: int):
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self._engines = set()
+        self.requests = 0
+        self.statements = 0
+        self.n_plus_one_warnings = 0
+
+    def install(self, sync_engine) -> None:
+        if id(sync_engine) in self._engines:
+            return
+        self._engines.add(id(sync_engine))
+        event.listen(sync_engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", self._after_cursor_execute)
+
+    @staticmethod
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if _current_stats.get() is not None:
+            conn.info["sql_metrics_start"] = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        stats = _current_stats.get()
+        start = conn.info.pop("sql_metrics_start", None)
+        if stats is None or start is None:
+            return
+
+        stats.db_time += time.perf_counter() - start
+        stats.statements += 1
+        if stats.fingerprints is not None:
+            stats.fingerprints[statement_fingerprint(statement)] += 1
+
+    async def middleware(self, request: Request, call_next):
+        stats = RequestSQLStats(track_fingerprints=settings.SQL_N_PLUS_ONE_DETECTION)
+        token = _current_stats.set(stats)
+        start = time.perf_counter()
+        try:
+            response = await call_next(request)
+        finally:
+            _current_stats.reset(token)
+        total_ms = (time.perf_counter() - start) * 1000
+        db_ms = stats.db_time * 1000
+
+        self.requests += 1
+        self.statements += stats.statements
+        response.headers["Server-Timing"] = (
+            f'db;dur={db_ms:.2f};desc="{stats.statements} queries", '
+            f'app;dur={total_ms:.2f}'
+        )
+        # DEBUG: una riga per ogni richiesta, probe /livez e /readyz comprese
+        logger.debug(
+            f"{request.method} {request.url.path} {response.status_code} {total_ms:.1f}ms "
+            f"sql={stats.statements} db={db_ms:.1f}ms"
+        )
+
+        if stats.fingerprints:
+            for fingerprint, count in stats.fingerprints.items():
+                if count > self.n_plus_one_threshold:
+                    self.n_plus_one_warnings += 1
+                    logger.warning(
+                        f"Possible N+1: statement executed {count} times in "
+                        f"{request.method} {request.url.path}: {fingerprint[:200]}"
+                    )
+        return response
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "statements": self.statements,
+            "avg_statements_per_request": round(self.statements / self.requests, 2) if self.requests else 0,
+            "n_plus_one_warnings": self.n_plus_one_warnings,
+        }
+
+
+sql_metrics = SQLMetrics(settings.SQL_N_PLUS_ONE_THRESHOLD)
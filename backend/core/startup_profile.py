@@ -0,0 +1,71 @@
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+# Eseguito in un processo nuovo: gli import devono essere tutti "a freddo"
+CHILD_CODE = """
+import asyncio, time
+start = time.perf_counter()
+from backend.main import create_app
+imported = time.perf_counter()
+app = create_app()
+created = time.perf_counter()
+
+async def boot():
+    async with app.router.lifespan_context(app):
+        return time.perf_counter()
+
+ready = asyncio.run(boot())
+print(f"STARTUP {imported - start:.6f} {created - imported:.6f} {ready - created:.6f}")
+"""
+
+
+def _parse_importtime(stderr: str) -> list:
+    """Righe di -X importtime: (modulo, self_us, cumulative_us)"""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append((name.strip(), int(self_us), int(cumulative_us)))
+    return modules
+
+
+def profile_startup(top: int = 25) -> None:
+    """Stampa il costo di import per modulo e le fasi di avvio dell'app"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD_CODE],
+        capture_output=True, text=True,
+        cwd=Path(__file__).resolve().parents[2]
+    )
+    if result.returncode != 0:
+        print(result.stderr, file=sys.stderr)
+        raise SystemExit(result.returncode)
+
+    timings = next(line for line in result.stdout.splitlines() if line.startswith("STARTUP"))
+    import_s, create_s, lifespan_s = (float(value) for value in timings.split()[1:])
+    modules = _parse_importtime(result.stderr)
+
+    # Costo proprio aggregato per pacchetto di primo livello
+    packages = defaultdict(int)
+    for name, self_us, _ in modules:
+        packages[name.split(".")[0]] += self_us
+
+    print("Fasi di avvio")
+    print(f"  import backend.main   {import_s * 1000:9.1f} ms")
+    print(f"  create_app()          {create_s * 1000:9.1f} ms")
+    print(f"  lifespan startup      {lifespan_s * 1000:9.1f} ms")
+    print(f"  totale                {(import_s + create_s + lifespan_s) * 1000:9.1f} ms")
+
+    print(f"\nModuli backend per costo cumulativo (top {top})")
+    backend_modules = sorted(
+        (module for module in modules if module[0].startswith("backend")),
+        key=lambda module: module[2], reverse=True
+    )
+    for name, self_us, cumulative_us in backend_modules[:top]:
+        print(f"  {cumulative_us / 1000:9.1f} ms  (self {self_us / 1000:7.1f} ms)  {name}")
+
+    print(f"\nPacchetti per costo proprio (top {top})")
+    for name, self_us in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]:
+        print(f"  {self_us / 1000:9.1f} ms  {name}")
@@ -0,0 +1,80 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from jose import jwt
+from jose.exceptions import ExpiredSignatureError, JWTError
+
+from backend.core.config import settings
+from backend.core.revocation import revocation_list
+
+
+class VerifiedTokenCache:
+    """
+    LRU limitata dei token JWT già verificati, con scadenza pari all'exp del token.
+    Ogni get restituisce una copia del payload: le richieste che lo modificano
+    (request.state.principal) non si influenzano a vicenda.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                self.misses += 1
+                return None
+            payload, expires_at = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._entries[token]
+                raise ExpiredSignatureError("Signature has expired.")
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return dict(payload)
+
+    def put(self, token: str, payload: dict) -> None:
+        if self.max_size <= 0:
+            return
+        expires_at = payload.get("exp")
+        with self._lock:
+            self._entries[token] = (dict(payload), expires_at)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def discard(self, token: str) -> None:
+        with self._lock:
+            self._entries.pop(token, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+token_cache = VerifiedTokenCache(settings.TOKEN_CACHE_SIZE)
+
+
+def decode_access_token(token: str) -> dict:
+    """
+    Decodifica e verifica un JWT una sola volta: le chiamate successive con lo
+    stesso token vengono servite dalla cache senza rifare la verifica HMAC.
+    Solleva le stesse eccezioni di jwt.decode (ExpiredSignatureError, JWTError),
+    anche per i token revocati.
+    """
+    payload = token_cache.get(token)
+    if payload is None:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        token_cache.put(token, payload)
+
+    if revocation_list.is_revoked(payload.get("jti")):
+        raise JWTError("Token has been revoked")
+    return payload
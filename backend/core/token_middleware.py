@@ -3,6 +3,7 @@ from fastapi.responses import JSONResponse
 import logging
 from jose import jwt, JWTError
 from backend.core.config import settings
+from backend.core.token_cache import decode_access_token
 from typing import Optional
 
 logger = logging.getLogger(__name__)
@@ -16,34 +17,59 @@ class TokenValidationError(HTTPException):
         )
 
 EXCLUDED_PATHS = {
-    "/", "/auth/login", "/auth/logout", "/auth/me",
-    "/docs", "/openapi.json", "/favicon.ico", "/redoc"
+    "/", "/auth/login", "/auth/register", "/auth/refresh", "/auth/logout", "/auth/me",
+    "/docs", "/openapi.json", "/favicon.ico", "/redoc", "/livez", "/readyz"
 }
 
-async def token_validator_middleware(request: Request, call_next):
-    if request.url.path in EXCLUDED_PATHS:
-        return await call_next(request)
-
+def _extract_token(request: Request) -> str:
     # Cerca il token in 3 possibili posizioni
-    token = (
+    return (
         request.cookies.get("access_token") or
         request.headers.get("authorization", "").replace("Bearer ", "") or
         request.headers.get("x-access-token", "")
     )
 
+
+def resolve_principal(request: Request) -> dict:
+    """
+    Restituisce i claim del token della richiesta, decodificati una sola volta.
+    Il risultato viene salvato in request.state.principal e riusato da tutte
+    le dipendenze della stessa richiesta.
+    """
+    principal = getattr(request.state, "principal", None)
+    if principal is not None:
+        return principal
+
+    token = _extract_token(request)
     if not token:
-        print("=== ERRORE: TOKEN NON TROVATO ===")
-        raise HTTPException(status_code=401, detail="Not authenticated")
+        raise TokenValidationError("Not authenticated")
 
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        request.state.user = payload
-        print(f"=== TOKEN VALIDO PER: {payload.get('sub')} ===")
+        principal = decode_access_token(token)
     except jwt.ExpiredSignatureError:
-        raise HTTPException(status_code=401, detail="Token expired")
-    except jwt.JWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
+        raise TokenValidationError("Token expired")
+    except JWTError:
+        raise TokenValidationError("Invalid token")
+
+    request.state.principal = principal
+    request.state.user = principal
+    return principal
+
 
+async def token_validator_middleware(request: Request, call_next):
+    if request.url.path in EXCLUDED_PATHS:
+        return await call_next(request)
+
+    try:
+        principal = resolve_principal(request)
+    except TokenValidationError as e:
+        return JSONResponse(
+            status_code=e.status_code,
+            content={"detail": e.detail},
+            headers=e.headers
+        )
+
+    logger.debug(f"Token valido per: {principal.get('sub')}")
     return await call_next(request)
 
 def _extract_token_from_headers(request: Request) -> Optional[str]:
@@ -54,11 +80,7 @@ def _extract_token_from_headers(request: Request) -> Optional[str]:
 
 def _validate_jwt(token: str) -> dict:
     try:
-        payload = jwt.decode(
-            token,
-            settings.SECRET_KEY,
-            algorithms=[settings.ALGORITHM]
-        )
+        payload = decode_access_token(token)
         if not payload.get("sub"):
             raise TokenValidationError("Invalid token payload")
         return payload
@@ -0,0 +1,136 @@
+"""
+Feed materializzato delle schede di ogni allievo (tabella trainee_feeds).
+Le funzioni sono sincrone e accettano una Connection o una Session
+(via AsyncSession.run_sync): il feed viene riscritto nella stessa
+transazione della modifica che lo rende obsoleto.
+
+Ricostruzione completa: python -m backend.core.trainee_feed --rebuild
+"""
+import json
+from typing import Dict, Iterable, List
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from backend.core.collection_versions import TRAINEE, bump_versions
+from backend.db_models.exercise import Exercise
+from backend.db_models.trainee_feed import TraineeFeed
+from backend.db_models.workout import Workout, WorkoutAssignment, workout_exercises
+from backend.schemas.workout_schemas import WorkoutOut
+
+REBUILD_CHUNK_SIZE = 500
+
+
+def _build_payloads(conn, trainee_ids: List[int]) -> Dict[int, list]:
+    """Schede (con esercizi) di ciascun allievo, assegnate più di recente prima"""
+    assignments = conn.execute(
+        select(WorkoutAssignment.user_id, *Workout.__table__.columns)
+        .join(Workout, Workout.id == WorkoutAssignment.workout_id)
+        .where(WorkoutAssignment.user_id.in_(trainee_ids))
+        .order_by(WorkoutAssignment.assigned_at.desc(), Workout.id.desc())
+    ).all()
+
+    workout_ids = {row.id for row in assignments}
+    exercises: Dict[int, list] = {workout_id: [] for workout_id in workout_ids}
+    if workout_ids:
+        for row in conn.execute(
+            select(workout_exercises.c.workout_id, *Exercise.__table__.columns)
+            .join(Exercise, Exercise.id == workout_exercises.c.exercise_id)
+            .where(workout_exercises.c.workout_id.in_(workout_ids))
+            .order_by(Exercise.id)
+        ):
+            exercises[row.workout_id].append(row._mapping)
+
+    # Ogni scheda viene serializzata una volta sola anche se assegnata a più allievi
+    serialized = {}
+    payloads: Dict[int, list] = {trainee_id: [] for trainee_id in trainee_ids}
+    for row in assignments:
+        if row.id not in serialized:
+            workout = WorkoutOut.model_validate({**row._mapping, "exercises": exercises[row.id]})
+            serialized[row.id] = workout.model_dump(mode="json")
+        payloads[row.user_id].append(serialized[row.id])
+    return payloads
+
+
+def refresh_trainee_feeds(conn, trainee_ids: Iterable[int]) -> int:
+    trainee_ids = sorted(set(trainee_ids))
+    if not trainee_ids:
+        return 0
+
+    payloads = _build_payloads(conn, trainee_ids)
+    statement = sqlite_insert(TraineeFeed)
+    conn.execute(
+        statement.on_conflict_do_update(
+            index_elements=[TraineeFeed.trainee_id],
+            set_={
+                "payload": statement.excluded.payload,
+                "workouts": statement.excluded.workouts,
+                "updated_at": func.now(),
+            }
+        ),
+        [
+            {
+                "trainee_id": trainee_id,
+                "payload": json.dumps(workouts, separators=(",", ":"), ensure_ascii=False),
+                "workouts": len(workouts),
+            }
+            for trainee_id, workouts in payloads.items()
+        ]
+    )
+    # Feed cambiato: cambia anche l'ETag delle liste dell'allievo
+    bump_versions(conn, TRAINEE, trainee_ids)
+    return len(trainee_ids)
+
+
+def workouts_with_exercise(conn, exercise_id: int) -> List[int]:
+    """Schede che contengono l'esercizio: da leggere prima di eliminarne i collegamenti"""
+    return list(conn.execute(
+        select(workout_exercises.c.workout_id).where(workout_exercises.c.exercise_id == exercise_id)
+    ).scalars())
+
+
+def refresh_feeds_for_workouts(conn, workout_ids: Iterable[int]) -> int:
+    """Riscrive il feed degli allievi a cui sono assegnate le schede modificate"""
+    workout_ids = list(workout_ids)
+    if not workout_ids:
+        return 0
+    trainee_ids = conn.execute(
+        select(WorkoutAssignment.user_id).where(WorkoutAssignment.workout_id.in_(workout_ids))
+    ).scalars().all()
+    return refresh_trainee_feeds(conn, trainee_ids)
+
+
+def rebuild_all_feeds(sync_conn) -> int:
+    """Rigenera i feed di tutti gli allievi con almeno una scheda assegnata"""
+    sync_conn.execute(delete(TraineeFeed))
+    trainee_ids = sync_conn.execute(
+        select(WorkoutAssignment.user_id).distinct().order_by(WorkoutAssignment.user_id)
+    ).scalars().all()
+    for start in range(0, len(trainee_ids), REBUILD_CHUNK_SIZE):
+        refresh_trainee_feeds(sync_conn, trainee_ids[start:start + REBUILD_CHUNK_SIZE])
+    return len(trainee_ids)
+
+
+if __name__ == "__main__":
+    import argparse
+    import asyncio
+
+    parser = argparse.ArgumentParser(description="Feed materializzato delle schede degli allievi")
+    parser.add_argument("--rebuild", action="store_true", help="Rigenera tutti i feed dai dati attuali")
+    args = parser.parse_args()
+
+    async def main():
+        from backend.core.database import async_engine, dispose_engines
+        # Fuori dall'app: registra User, a cui puntano le relazioni dei modelli
+        import backend.db_models.user_models  # noqa: F401
+
+        async with async_engine.begin() as conn:
+            if args.rebuild:
+                count = await conn.run_sync(rebuild_all_feeds)
+                print(f"trainee_feeds: {count} feed rigenerati")
+            else:
+                count = (await conn.execute(select(func.count()).select_from(TraineeFeed))).scalar_one()
+                print(f"trainee_feeds: {count} feed")
+        await dispose_engines()
+
+    asyncio.run(main())
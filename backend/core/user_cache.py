@@ -0,0 +1,136 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm import Session, make_transient_to_detached, object_session
+
+from backend.core.config import settings
+from backend.db_models.user_models import User as UserModel
+
+_USER_COLUMNS = [column.key for column in UserModel.__table__.columns]
+
+# Utenti modificati dalla transazione in corso (Session.info), invalidati dopo il commit
+CHANGED_USERS = "changed_users"
+
+
+class UserCache:
+    """
+    Cache in-process degli utenti autenticati, indicizzata per id ed email.
+    Le voci scadono dopo ttl secondi e la cache è limitata a max_size utenti (LRU).
+    Vengono salvati solo i valori delle colonne: ogni hit restituisce una nuova
+    istanza User detached, così le sessioni delle varie richieste non la condividono.
+    """
+
+    def __init__(self, max_size: int, ttl: int):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        self._email_index = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _lookup(self, user_id: Optional[int]) -> Optional[UserModel]:
+        entry = self._entries.get(user_id) if user_id is not None else None
+        if entry is None or entry[1] <= time.monotonic():
+            if entry is not None:
+                self._remove(user_id)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(user_id)
+        self.hits += 1
+        user = UserModel(**entry[0])
+        make_transient_to_detached(user)
+        return user
+
+    def get_by_id(self, user_id: int) -> Optional[UserModel]:
+        with self._lock:
+            return self._lookup(user_id)
+
+    def get_by_email(self, email: str) -> Optional[UserModel]:
+        with self._lock:
+            return self._lookup(self._email_index.get(email))
+
+    def put(self, user: UserModel) -> None:
+        if self.max_size <= 0:
+            return
+        values = {key: getattr(user, key) for key in _USER_COLUMNS}
+        with self._lock:
+            self._remove(user.id)
+            self._entries[user.id] = (values, time.monotonic() + self.ttl)
+            self._email_index[user.email] = user.id
+            while len(self._entries) > self.max_size:
+                oldest_id = next(iter(self._entries))
+                self._remove(oldest_id)
+
+    def invalidate(self, user_id: Optional[int] = None, email: Optional[str] = None) -> None:
+        with self._lock:
+            if user_id is None and email is not None:
+                user_id = self._email_index.get(email)
+            if user_id in self._entries:
+                self.invalidations += 1
+            self._remove(user_id)
+
+    def _remove(self, user_id: Optional[int]) -> None:
+        entry = self._entries.pop(user_id, None)
+        if entry is not None:
+            self._email_index.pop(entry[0]["email"], None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._email_index.clear()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+        }
+
+
+user_cache = UserCache(settings.USER_CACHE_SIZE, settings.USER_CACHE_TTL_SECONDS)
+
+
+@event.listens_for(UserModel, "after_update")
+@event.listens_for(UserModel, "after_delete")
+def _record_changed_user(mapper, connection, target):
+    # Modifiche via ORM (profilo, disattivazione): la voce viene invalidata solo
+    # dopo il commit, altrimenti una lettura concorrente potrebbe rimettere in
+    # cache la riga ancora confermata. Gli UPDATE Core invalidano esplicitamente.
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(CHANGED_USERS, set()).add(target.id)
+    else:
+        user_cache.invalidate(user_id=target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_users(session):
+    for user_id in session.info.pop(CHANGED_USERS, ()):
+        user_cache.invalidate(user_id=user_id)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_rolled_back_users(session, transaction):
+    if transaction.parent is None:
+        session.info.pop(CHANGED_USERS, None)
+
+
+async def get_user_by_email_cached(db: AsyncSession, email: str) -> Optional[UserModel]:
+    user = user_cache.get_by_email(email)
+    if user is not None:
+        return user
+
+    result = await db.execute(select(UserModel).where(UserModel.email == email))
+    user = result.scalar_one_or_none()
+    if user is not None:
+        user_cache.put(user)
+    return user
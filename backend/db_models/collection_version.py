@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime
+from sqlalchemy.sql import func
+from backend.db_models.base import Base
+
+
+class CollectionVersion(Base):
+    """
+    Contatore di versione di una collezione di un utente (es. le schede di un
+    coach): incrementato nella stessa transazione di ogni scrittura che la
+    modifica, è la base degli ETag delle liste (backend.core.collection_versions).
+    """
+    __tablename__ = "collection_versions"
+    __table_args__ = {'extend_existing': True}
+
+    collection = Column(String(32), primary_key=True)
+    owner_id = Column(Integer, ForeignKey('users.id', ondelete="CASCADE"), primary_key=True)
+    version = Column(Integer, nullable=False, default=1)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<CollectionVersion({self.collection}:{self.owner_id}, version={self.version})>"
@@ -1,13 +1,41 @@
-from sqlalchemy import Column, Integer, String, Text, Enum, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, Text, Enum, ForeignKey, DateTime, Index, Table, text
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from backend.db_models.base import Base
 from backend.routers.enums import ExerciseDifficulty
 
+# Muscoli target normalizzati: una riga per coppia esercizio-muscolo,
+# ricavata da Exercise.target_muscles a ogni creazione e modifica
+exercise_muscles = Table(
+    'exercise_muscles',
+    Base.metadata,
+    Column('exercise_id', Integer, ForeignKey('exercises.id', ondelete="CASCADE"), primary_key=True),
+    Column('muscle_id', Integer, ForeignKey('muscles.id'), primary_key=True),
+    Index('ix_exercise_muscles_muscle', 'muscle_id', 'exercise_id')
+)
+
+
+class Muscle(Base):
+    __tablename__ = "muscles"
+    __table_args__ = {'extend_existing': True}
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String(50), nullable=False, unique=True)  # minuscolo, spazi normalizzati
+
+    def __repr__(self):
+        return f"<Muscle(id={self.id}, name='{self.name}')>"
+
 
 class Exercise(Base):
     __tablename__ = "exercises"
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        # Listing per coach: uno per ogni ordinamento, con e senza filtro difficoltà
+        Index('ix_exercises_coach_created', 'coach_id', 'created_at', 'id'),
+        Index('ix_exercises_coach_name', 'coach_id', text('name COLLATE NOCASE'), 'id'),
+        Index('ix_exercises_coach_difficulty_created', 'coach_id', 'difficulty', 'created_at', 'id'),
+        Index('ix_exercises_coach_difficulty_name', 'coach_id', 'difficulty', text('name COLLATE NOCASE'), 'id'),
+        {'extend_existing': True},
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(100), nullable=False)
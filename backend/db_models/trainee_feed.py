@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, Text, ForeignKey, DateTime
+from sqlalchemy.sql import func
+from backend.db_models.base import Base
+
+
+class TraineeFeed(Base):
+    """
+    Schede assegnate a un allievo, già serializzate come lista JSON di WorkoutOut.
+    Riscritta da backend.core.trainee_feed a ogni modifica che la riguarda:
+    la home dell'allievo è una lettura per chiave primaria.
+    """
+    __tablename__ = "trainee_feeds"
+    __table_args__ = {'extend_existing': True}
+
+    trainee_id = Column(Integer, ForeignKey('users.id', ondelete="CASCADE"), primary_key=True)
+    payload = Column(Text, nullable=False)
+    workouts = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<TraineeFeed(trainee_id={self.trainee_id}, workouts={self.workouts})>"
@@ -1,8 +1,9 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Table
+from sqlalchemy import Boolean, Column, Enum, Integer, String, ForeignKey, DateTime, Table, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from backend.db_models.base import Base
 from sqlalchemy import Index
+from backend.routers.enums import WorkoutStatus
 
 # Tabella di associazione molti-a-molti
 workout_exercises = Table(
@@ -10,17 +11,32 @@ workout_exercises = Table(
     Base.metadata,
     Column('workout_id', Integer, ForeignKey('workouts.id'), primary_key=True),
     Column('exercise_id', Integer, ForeignKey('exercises.id'), primary_key=True),
-    Column('created_at', DateTime(timezone=True), server_default=func.now())
+    Column('created_at', DateTime(timezone=True), server_default=func.now()),
+    # Schede che contengono un esercizio (modifica/eliminazione dell'esercizio, feed degli allievi)
+    Index('ix_workout_exercises_exercise', 'exercise_id', 'workout_id')
 )
 
 class Workout(Base):
     __tablename__ = "workouts"
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        # Paginazione keyset per coach, più recenti prima: (created_at, id)
+        Index('ix_workouts_coach_created', 'coach_id', 'created_at', 'id'),
+        Index('ix_workouts_coach_status_created', 'coach_id', 'status', 'created_at', 'id'),
+        # Ricerca per prefisso del nome (LIKE case-insensitive)
+        Index('ix_workouts_coach_name', 'coach_id', text('name COLLATE NOCASE')),
+        {'extend_existing': True}
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(100), nullable=False)
     description = Column(String(500))
     coach_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    status = Column(
+        Enum(WorkoutStatus),
+        nullable=False,
+        default=WorkoutStatus.DRAFT,
+        server_default=WorkoutStatus.DRAFT.name
+    )
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
@@ -57,9 +73,11 @@ class WorkoutAssignment(Base):
     )
 
     id = Column(Integer, primary_key=True, index=True)
-    workout_id = Column(Integer, ForeignKey('workouts.id', ondelete="CASCADE"), nullable=False)
+    workout_id = Column(Integer, ForeignKey('workouts.id', ondelete="CASCADE"), nullable=False, index=True)
     user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
     assigned_at = Column(DateTime(timezone=True), server_default=func.now())
+    is_completed = Column(Boolean, default=False)
+    completed_at = Column(DateTime(timezone=True))
 
     # Relazioni
     workout = relationship("Workout", back_populates="assignments")
@@ -1,49 +1,71 @@
-from fastapi import FastAPI, Depends, Request, HTTPException
+from fastapi import APIRouter, FastAPI, Depends, Request, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse, Response
+from fastapi.responses import HTMLResponse, JSONResponse, Response
 from fastapi.security import OAuth2PasswordBearer
 from contextlib import asynccontextmanager
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import text, inspect, create_engine
 from pathlib import Path
+import asyncio
+import importlib
 import logging
 
 from backend.core.config import settings
 from backend.core.dependencies import get_current_active_user
-from backend.core.database import async_engine, AsyncSessionLocal, get_db_session
-from backend.routers.auth import router as auth_router
-from backend.routers.coach import router as coach_router
-from backend.routers.trainee import router as trainee_router
-from backend.routers.workout_router import router as workout_router
-from backend.routers.exercise_router import router as exercise_router
-from backend.core.auth_dependencies import get_db
+from backend.core.database import (
+    async_engine, async_read_engine, AsyncSessionLocal, get_db_session, dispose_engines,
+    run_sqlite_maintenance
+)
 from backend.db_models.base import Base
 from backend.schemas.workout_schemas import resolve_forward_refs
-resolve_forward_refs()
 from backend.core.token_middleware import token_validator_middleware
+from backend.core.token_cache import token_cache
+from backend.core.user_cache import user_cache
+from backend.core.rate_limiter import auth_rate_limiter
+from backend.core.revocation import revocation_list
+from backend.core.group_commit import group_commit_writer
+from backend.core.schema_sync import sync_schema
+from backend.core.health import health_monitor
+from backend.core.query_advisor import query_advisor
+from backend.core.sql_metrics import sql_metrics
+from backend.core.muscle_index import muscle_index
+from backend.core.response_cache import response_cache
+from backend.core.fast_json import FastJSONResponse, fast_json_enabled
+from backend.core.password_hashing import password_hasher, configure_password_context, password_policy
 
-# Motore sincrono per inspect in health check
-sync_engine = create_engine(settings.SYNC_DATABASE_URL)
-
-# Configurazione logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler('app.log')
-    ]
-)
 logger = logging.getLogger(__name__)
 
 
+def configure_logging():
+    """Configura gli handler di logging una sola volta, alla creazione dell'app"""
+    root_logger = logging.getLogger()
+    if getattr(root_logger, "_fitapp_configured", False):
+        return
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.StreamHandler(),
+            # delay: il file viene aperto alla prima scrittura
+            logging.FileHandler('app.log', delay=True)
+        ]
+    )
+    root_logger._fitapp_configured = True
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    revocation_task = None
+    maintenance_task = None
     try:
         from backend.db_models.user_models import User as UserModel
         from backend.db_models.workout import Workout as WorkoutModel
         from backend.db_models.workout import WorkoutAssignment as WorkoutAssignmentModel
         from backend.db_models.exercise import Exercise as ExerciseModel
+        from backend.db_models.exercise import Muscle as MuscleModel
+        from backend.db_models.refresh_token import RefreshToken as RefreshTokenModel
+        from backend.db_models.revoked_token import RevokedToken as RevokedTokenModel
+        from backend.db_models.trainee_feed import TraineeFeed as TraineeFeedModel
+        from backend.db_models.collection_version import CollectionVersion as CollectionVersionModel
 
         logger.info("\n🔧 Configurazione ambiente:")
         logger.info(f"- DEV_MODE: {settings.DEV_MODE}")
@@ -54,86 +76,35 @@ async def lifespan(app: FastAPI):
         logger.info(f"- User: {UserModel.__tablename__}")
         logger.info(f"- Workout: {WorkoutModel.__tablename__}")
         logger.info(f"- Exercise: {ExerciseModel.__tablename__}")
+        logger.info(f"- Muscle: {MuscleModel.__tablename__}")
         logger.info(f"- WorkoutAssignment: {WorkoutAssignmentModel.__tablename__}")
+        logger.info(f"- RefreshToken: {RefreshTokenModel.__tablename__}")
+        logger.info(f"- RevokedToken: {RevokedTokenModel.__tablename__}")
+        logger.info(f"- TraineeFeed: {TraineeFeedModel.__tablename__}")
+        logger.info(f"- CollectionVersion: {CollectionVersionModel.__tablename__}")
 
         if settings.DEV_MODE:
             logger.info("\n⚙️ Modalità sviluppo attiva")
             db_path = settings.SYNC_DATABASE_URL.replace("sqlite:///", "")
             logger.info(f"📂 Percorso database: {Path(db_path).absolute()}")
 
-        # Creazione tabelle e indici
-        async with async_engine.begin() as conn:
-            inspector = await conn.run_sync(lambda sync_conn: inspect(sync_conn))
-
-            existing_tables = set(await conn.run_sync(lambda sync_conn: inspector.get_table_names()))
-            required_tables = set(Base.metadata.tables.keys())
-
-            tables_to_create = [Base.metadata.tables[table] for table in (required_tables - existing_tables)]
-            if tables_to_create:
-                await conn.run_sync(
-                    lambda sync_conn: Base.metadata.create_all(
-                        sync_conn,
-                        tables=tables_to_create,
-                        checkfirst=True
-                    )
-                )
-                logger.info("\n✅ Tabelle create:")
-                for table in tables_to_create:
-                    logger.info(f"- {table.name}")
-            else:
-                logger.info("\nℹ️ Tutte le tabelle esistono già")
-
-            logger.info("\n🔍 Verifica indici:")
-            for table_name, table in Base.metadata.tables.items():
-                if table_name not in existing_tables:
-                    continue
-
-                existing_indexes = await conn.run_sync(
-                    lambda sync_conn, tn=table_name: inspector.get_indexes(tn)
-                )
-                existing_index_names = {idx['name'] for idx in existing_indexes}
-
-                for index in table.indexes:
-                    if index.name not in existing_index_names:
-                        try:
-                            await conn.run_sync(
-                                lambda sync_conn, idx=index: idx.create(sync_conn)
-                            )
-                            logger.info(f"  ✅ Creato indice {index.name} su {table_name}")
-                        except Exception as e:
-                            logger.warning(f"  ⚠️ Errore creazione indice {index.name}: {str(e)}")
-                    else:
-                        logger.debug(f"  ✔️ Indice {index.name} esiste già su {table_name}")
-
-            # Indici aggiuntivi richiesti
-            required_indexes = {
-                'users': [
-                    {'name': 'uidx_users_email', 'columns': ['email'], 'unique': True},
-                ],
-                'workout_assignments': [
-                    {'name': 'uidx_assignments_user_workout',
-                     'columns': ['user_id', 'workout_id'], 'unique': True}
-                ]
-            }
+        # Calibrazione del costo di hashing delle password su questa macchina
+        policy = configure_password_context()
+        logger.info(f"\n🔐 Policy hashing password: {policy}")
+        password_hasher.start()
+
+        # Creazione tabelle e indici (solo se i modelli sono cambiati)
+        await sync_schema(async_engine)
 
-            for table, indexes in required_indexes.items():
-                existing_indexes = await conn.run_sync(
-                    lambda sync_conn, t=table: inspector.get_indexes(t))
-
-                existing_index_names = {idx['name'] for idx in existing_indexes}
-
-                for index in indexes:
-                    if index['name'] not in existing_index_names:
-                        try:
-                            columns = ", ".join(index['columns'])
-                            unique = "UNIQUE" if index['unique'] else ""
-                            await conn.execute(text(
-                                f"CREATE {unique} INDEX IF NOT EXISTS {index['name']} "
-                                f"ON {table} ({columns})"
-                            ))
-                            logger.info(f"  ✅ Creato indice aggiuntivo {index['name']} su {table}")
-                        except Exception as e:
-                            logger.error(f"  ❌ Errore creazione indice aggiuntivo {index['name']}: {str(e)}")
+        # Revoche dei token: caricamento iniziale e sincronizzazione tra worker
+        async with AsyncSessionLocal() as db:
+            await revocation_list.refresh(db)
+        revocation_task = asyncio.create_task(revocation_list.run_sync_loop())
+        maintenance_task = asyncio.create_task(run_sqlite_maintenance())
+        if settings.GROUP_COMMIT_ENABLED:
+            group_commit_writer.start()
+        await health_monitor.refresh()
+        health_monitor.start()
 
         if settings.POPULATE_TEST_DATA:
             logger.info("\n🌱 Popolamento dati di test...")
@@ -154,31 +125,18 @@ async def lifespan(app: FastAPI):
         raise
     finally:
         logger.info("\n🔌 Pulizia risorse...")
-        await async_engine.dispose()
-
-
-app = FastAPI(
-    title="FitApp API",
-    description="API completa per la gestione di palestre e allenamenti",
-    version="1.0.0",
-    lifespan=lifespan,
-    docs_url="/docs" if settings.DEV_MODE else None,
-    redoc_url="/redoc" if settings.DEV_MODE else None,
-    openapi_url="/openapi.json" if settings.DEV_MODE else None,
-    swagger_ui_parameters={
-        "syntaxHighlight": False,
-        "tryItOutEnabled": True,
-        "displayRequestDuration": True,
-        "filter": True,
-        "showExtensions": True,
-    },
-    responses={
-        401: {"description": "Non autorizzato"},
-        403: {"description": "Operazione non permessa"},
-        404: {"description": "Risorsa non trovata"},
-        500: {"description": "Errore interno del server"}
-    }
-)
+        if settings.QUERY_ADVISOR_ENABLED:
+            migration = query_advisor.report()["migration"]
+            if migration:
+                logger.info(f"\n📈 Indici suggeriti dall'advisor:\n{migration}")
+        for task in (revocation_task, maintenance_task):
+            if task is not None:
+                task.cancel()
+        await health_monitor.stop()
+        await group_commit_writer.stop()
+        password_hasher.shutdown()
+        await dispose_engines()
+
 
 # CORS
 origins = [
@@ -188,20 +146,19 @@ origins = [
     "http://127.0.0.1:8000"
 ]
 
-# Middleware personalizzato per validazione token
-app.middleware("http")(token_validator_middleware)
+# Router importati solo alla creazione dell'app
+ROUTERS = [
+    ("backend.routers.auth", "/auth", "Authentication"),
+    ("backend.routers.coach", "/coaches", "Coaches"),
+    ("backend.routers.trainee", "/trainees", "Trainees"),
+    ("backend.routers.workout_router", "/workouts", "Workouts"),
+    ("backend.routers.exercise_router", "/exercises", "Exercises")
+]
+
+system_router = APIRouter()
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=origins,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-    expose_headers=["*"]
-)
 
 # Middleware logging richieste in DEV_MODE
-@app.middleware("http")
 async def add_security_headers(request: Request, call_next):
     response = await call_next(request)
     if settings.DEV_MODE:
@@ -212,7 +169,7 @@ async def add_security_headers(request: Request, call_next):
 
 
 # Endpoint principale (home page)
-@app.get("/", response_class=HTMLResponse, include_in_schema=False)
+@system_router.get("/", response_class=HTMLResponse, include_in_schema=False)
 async def root(request: Request):
     return f"""
     <!DOCTYPE html>
@@ -229,7 +186,7 @@ async def root(request: Request):
         <body>
             <div class="container">
                 <h1>FitApp API</h1>
-                <p>Versione: {app.version}</p>
+                <p>Versione: {request.app.version}</p>
                 <p>Ambiente: {'Sviluppo' if settings.DEV_MODE else 'Produzione'}</p>
 
                 <h2>Documentazione</h2>
@@ -249,70 +206,77 @@ async def root(request: Request):
     """
 
 
-# Health check
-@app.get("/health", include_in_schema=False)
-async def health_check(db: AsyncSession = Depends(get_db)):
-    try:
-        # Verifica connessione DB
-        await db.execute(text("SELECT 1"))
-
-        # Controllo presenza tabelle (usando motore sync per inspect)
-        required_tables = {"users", "workouts", "exercises", "workout_assignments"}
-        inspector = inspect(sync_engine)
-        existing_tables = set(inspector.get_table_names())
-
-        status = {
-            "status": "healthy",
-            "database": "connected",
-            "missing_tables": list(required_tables - existing_tables),
-            "environment": "development" if settings.DEV_MODE else "production",
-            "version": app.version
-        }
+# Probe per l'orchestratore: leggono solo lo snapshot del monitor, mai il DB
+@system_router.get("/livez", include_in_schema=False)
+async def livez():
+    alive, payload = health_monitor.liveness()
+    return JSONResponse(payload, status_code=200 if alive else 503)
 
-        if status["missing_tables"]:
-            logger.warning(f"Tabelle mancanti: {status['missing_tables']}")
-            status["status"] = "degraded"
 
-        return status
+@system_router.get("/readyz", include_in_schema=False)
+async def readyz():
+    ready, snapshot = health_monitor.readiness()
+    return JSONResponse(snapshot, status_code=200 if ready else 503)
 
-    except Exception as e:
-        logger.error(f"Health check fallito: {str(e)}")
+
+# Health check
+@system_router.get("/health", include_in_schema=False)
+async def health_check(request: Request):
+    ready, snapshot = health_monitor.readiness()
+    database = snapshot.get("database", {})
+
+    if not database.get("connected"):
+        logger.error(f"Health check fallito: {database.get('error', snapshot['status'])}")
         raise HTTPException(
             status_code=503,
             detail={
                 "status": "unhealthy",
-                "error": str(e),
+                "error": database.get("error", snapshot["status"]),
                 "environment": "development" if settings.DEV_MODE else "production"
             }
         )
 
+    status = {
+        "status": "healthy" if ready else "degraded",
+        "database": "connected",
+        "missing_tables": database["missing_tables"],
+        "environment": "development" if settings.DEV_MODE else "production",
+        "version": request.app.version
+    }
 
-# Registrazione router con gestione errori e dipendenze
-routers = [
-    (auth_router, "/auth", "Authentication"),
-    (coach_router, "/coaches", "Coaches"),
-    (trainee_router, "/trainees", "Trainees"),
-    (workout_router, "/workouts", "Workouts"),
-    (exercise_router, "/exercises", "Exercises")
-]
-
-for router, prefix, tags in routers:
-    try:
-        app.include_router(
-            router,
-            prefix=prefix,
-            tags=[tags],
-            dependencies=[Depends(get_current_active_user)] if prefix != "/auth" else None
-        )
-        logger.info(f"✅ Router registrato: {prefix}")
-    except Exception as e:
-        logger.error(f"❌ Errore registrazione router {prefix}: {str(e)}")
-        if settings.DEV_MODE:
-            raise
+    if status["missing_tables"]:
+        logger.warning(f"Tabelle mancanti: {status['missing_tables']}")
+
+    return status
+
+
+# Report dell'advisor degli indici (solo sviluppo)
+@system_router.get("/dev/index-advisor", include_in_schema=False)
+async def index_advisor_report():
+    if not settings.QUERY_ADVISOR_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return query_advisor.report()
+
+
+# Metriche interne
+@system_router.get("/metrics", include_in_schema=False)
+async def metrics():
+    return {
+        "password_hashing": password_hasher.stats(),
+        "password_policy": password_policy(),
+        "token_cache": token_cache.stats(),
+        "user_cache": user_cache.stats(),
+        "auth_rate_limiter": await auth_rate_limiter.stats(),
+        "token_revocation": revocation_list.stats(),
+        "group_commit": group_commit_writer.stats(),
+        "sql": sql_metrics.stats(),
+        "muscle_index": muscle_index.stats(),
+        "response_cache": await response_cache.stats()
+    }
 
 
 # Endpoint favicon
-@app.get("/favicon.ico", include_in_schema=False)
+@system_router.get("/favicon.ico", include_in_schema=False)
 async def favicon():
     return Response(status_code=204)
 
@@ -321,13 +285,109 @@ async def favicon():
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
 
+def create_app() -> FastAPI:
+    configure_logging()
+    resolve_forward_refs()
+
+    app = FastAPI(
+        title="FitApp API",
+        description="API completa per la gestione di palestre e allenamenti",
+        version="1.0.0",
+        lifespan=lifespan,
+        default_response_class=FastJSONResponse if fast_json_enabled() else JSONResponse,
+        docs_url="/docs" if settings.DEV_MODE else None,
+        redoc_url="/redoc" if settings.DEV_MODE else None,
+        openapi_url="/openapi.json" if settings.DEV_MODE else None,
+        swagger_ui_parameters={
+            "syntaxHighlight": False,
+            "tryItOutEnabled": True,
+            "displayRequestDuration": True,
+            "filter": True,
+            "showExtensions": True,
+        },
+        responses={
+            401: {"description": "Non autorizzato"},
+            403: {"description": "Operazione non permessa"},
+            404: {"description": "Risorsa non trovata"},
+            500: {"description": "Errore interno del server"}
+        }
+    )
+
+    # Middleware personalizzato per validazione token
+    app.middleware("http")(token_validator_middleware)
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=origins,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["*"]
+    )
+    app.middleware("http")(add_security_headers)
+
+    # Più esterno di tutti: conta anche le query fatte dagli altri middleware
+    if settings.SQL_METRICS_ENABLED:
+        sql_metrics.install(async_engine.sync_engine)
+        sql_metrics.install(async_read_engine.sync_engine)
+        app.middleware("http")(sql_metrics.middleware)
+
+    app.include_router(system_router)
+
+    if settings.QUERY_ADVISOR_ENABLED:
+        query_advisor.install(async_engine.sync_engine)
+        query_advisor.install(async_read_engine.sync_engine)
+
+    # Registrazione router con gestione errori e dipendenze
+    for module_path, prefix, tags in ROUTERS:
+        try:
+            router = importlib.import_module(module_path).router
+            app.include_router(
+                router,
+                prefix=prefix,
+                tags=[tags],
+                dependencies=[Depends(get_current_active_user)] if prefix != "/auth" else None
+            )
+            logger.info(f"✅ Router registrato: {prefix}")
+        except Exception as e:
+            logger.error(f"❌ Errore registrazione router {prefix}: {str(e)}")
+            if settings.DEV_MODE:
+                raise
+
+    return app
+
+
+def __getattr__(name):
+    # "backend.main:app" continua a funzionare: l'app viene creata al primo accesso
+    if name == "app":
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 if __name__ == "__main__":
-    import uvicorn
-
-    uvicorn.run(
-        app,
-        host=settings.APP_HOST,
-        port=settings.APP_PORT,
-        reload=settings.DEV_MODE,
-        log_level="info"
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--profile-startup",
+        action="store_true",
+        help="Mostra il costo di import per modulo e i tempi di avvio, senza avviare il server"
     )
+    args = parser.parse_args()
+
+    if args.profile_startup:
+        from backend.core.startup_profile import profile_startup
+        profile_startup()
+    else:
+        import uvicorn
+
+        uvicorn.run(
+            "backend.main:create_app",
+            factory=True,
+            host=settings.APP_HOST,
+            port=settings.APP_PORT,
+            reload=settings.DEV_MODE,
+            log_level="info"
+        )
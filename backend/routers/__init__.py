@@ -1,7 +1,19 @@
-from .auth import router as auth
-from .coach import router as coach
-from .exercise_router import router as exercise_router
-from .trainee import router as trainee
-from .workout_router import router as workout_router
+import importlib
+
+# I router vengono importati solo quando servono (es. backend.routers.enums
+# non deve caricare tutti i router con i relativi servizi e schemi)
+_ROUTER_MODULES = {
+    'auth': '.auth',
+    'coach': '.coach',
+    'exercise_router': '.exercise_router',
+    'trainee': '.trainee',
+    'workout_router': '.workout_router',
+}
 
 __all__ = ['auth', 'coach', 'exercise_router', 'trainee', 'workout_router']
+
+
+def __getattr__(name):
+    if name in _ROUTER_MODULES:
+        return importlib.import_module(_ROUTER_MODULES[name], __name__).router
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
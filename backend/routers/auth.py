@@ -2,29 +2,33 @@ from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
 from fastapi.security import OAuth2PasswordRequestForm
 from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from passlib.context import CryptContext
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
 from jose import jwt
 from datetime import datetime, timedelta
+import secrets
+from typing import Optional
 
 from backend.schemas.user import UserCreate, UserOut, Token
+from backend.schemas.auth_schemas import RefreshTokenRequest
 from backend.db_models.user_models import User
 from backend.core.config import settings
-from backend.core.database import get_db
+from backend.core.database import get_db, get_read_db
 from backend.core.logger import logger
+from backend.core.rate_limiter import auth_rate_limiter
+from backend.core.password_hashing import password_hasher, get_password_hash, verify_and_update_password
+from backend.core.revocation import revoke_access_token
+from backend.core.token_cache import decode_access_token
+from backend.core.token_middleware import TokenValidationError, resolve_principal
+from backend.core.user_cache import user_cache
+from backend.services.auth_service import issue_refresh_token, rotate_refresh_token, revoke_refresh_token
 
 router = APIRouter(tags=["Authentication"])
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
 def hash_password(password: str) -> str:
     """Hash a password for storing."""
-    return pwd_context.hash(password)
-
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify a stored password against one provided by user."""
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_password_hash(password)
 
 
 def validate_password_complexity(password: str) -> bool:
@@ -42,7 +46,7 @@ def create_access_token(data: dict, expires_delta: timedelta = None) -> str:
         expires_delta if expires_delta
         else timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     )
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "jti": secrets.token_hex(16)})
     return jwt.encode(
         to_encode,
         settings.SECRET_KEY,
@@ -55,10 +59,18 @@ async def get_user_by_email(email: str, db: AsyncSession) -> User:
 
 
 @router.post("/register", response_model=UserOut, status_code=status.HTTP_201_CREATED)
-async def register(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
+async def register(
+        request: Request,
+        user_data: UserCreate,
+        db: AsyncSession = Depends(get_db),
+        read_db: AsyncSession = Depends(get_read_db)
+):
     """Register a new user."""
+    await auth_rate_limiter.check(request, "register", user_data.email)
     try:
-        existing_user = await get_user_by_email(user_data.email, db)
+        # Controllo sul pool di lettura: il writer viene usato solo per l'INSERT finale,
+        # non durante l'hash della password
+        existing_user = await get_user_by_email(user_data.email, read_db)
         if existing_user:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -73,18 +85,28 @@ async def register(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
 
         new_user = User(
             email=user_data.email,
-            hashed_password=hash_password(user_data.password),
+            hashed_password=await password_hasher.run(hash_password, user_data.password),
             full_name=user_data.full_name,
             role=user_data.role
         )
 
         db.add(new_user)
-        await db.commit()
+        try:
+            await db.commit()
+        except IntegrityError:
+            # Registrazione concorrente con la stessa email
+            await db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Email already registered"
+            )
         await db.refresh(new_user)
 
         logger.info(f"New user registered: {user_data.email}")
         return new_user
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Registration error: {str(e)}")
         raise HTTPException(
@@ -95,13 +117,23 @@ async def register(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
 
 @router.post("/login")
 async def login(
+        request: Request,
         response: Response,
         form_data: OAuth2PasswordRequestForm = Depends(),
-        db: AsyncSession = Depends(get_db)
+        db: AsyncSession = Depends(get_db),
+        read_db: AsyncSession = Depends(get_read_db)
 ):
-    user = await get_user_by_email(form_data.username, db)
+    await auth_rate_limiter.check(request, "login", form_data.username)
+    # Lettura sul pool di lettura: il writer non resta occupato durante la verifica bcrypt
+    user = await get_user_by_email(form_data.username, read_db)
+
+    valid, new_hash = False, None
+    if user:
+        valid, new_hash = await password_hasher.run(
+            verify_and_update_password, form_data.password, user.hashed_password
+        )
 
-    if not user or not pwd_context.verify(form_data.password, user.hashed_password):
+    if not valid:
         logger.warning(f"Failed login attempt for: {form_data.username}")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -109,6 +141,22 @@ async def login(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    # Hash obsoleto (schema o costo diversi dalla policy attuale): lo aggiorniamo
+    if new_hash:
+        await db.execute(update(User).where(User.id == user.id).values(hashed_password=new_hash))
+        await db.commit()
+        # UPDATE Core: nessun evento del mapper, la voce in cache va invalidata qui
+        user_cache.invalidate(user_id=user.id)
+        logger.info(f"Credential hash upgraded for: {user.email}")
+
+    refresh_token = await issue_refresh_token(db, user.id)
+    response = _token_response(user, refresh_token)
+
+    logger.info(f"User logged in: {user.email}")
+    return response
+
+
+def _token_response(user: User, refresh_token: str) -> JSONResponse:
     access_token = create_access_token(
         data={
             "sub": user.email,
@@ -118,6 +166,7 @@ async def login(
     )
     response = JSONResponse(content={
         "access_token": access_token,
+        "refresh_token": refresh_token,
         "token_type": "bearer",
         "user": {
             "id": user.id,
@@ -137,11 +186,38 @@ async def login(
         path="/"
 
     )
-
-    logger.info(f"User logged in: {user.email}")
+    response.set_cookie(
+        key="refresh_token",
+        value=refresh_token,
+        domain=None,
+        httponly=True,
+        secure=False,  # mettere True in vase di produzione
+        samesite="lax",
+        max_age=settings.jwt_config["refresh_expire"],
+        path="/auth"
+    )
     return response
 
 
+@router.post("/refresh")
+async def refresh(
+        request: Request,
+        body: Optional[RefreshTokenRequest] = None,
+        db: AsyncSession = Depends(get_db)
+):
+    """Rinnova l'access token ruotando il refresh token (nessuna verifica bcrypt)."""
+    token = (body.refresh_token if body else None) or request.cookies.get("refresh_token")
+    if not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Refresh token missing",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    user, refresh_token = await rotate_refresh_token(db, token)
+    return _token_response(user, refresh_token)
+
+
 async def get_token_from_cookie(request: Request) -> str:
     token = request.cookies.get("access_token")
     if not token:
@@ -170,7 +246,7 @@ async def get_current_user(
         )
 
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        payload = decode_access_token(token)
         email = payload.get("sub")
         if not email:
             raise HTTPException(status_code=400, detail="Invalid token payload")
@@ -187,7 +263,18 @@ async def get_current_user(
         raise HTTPException(status_code=401, detail="Invalid token")
 
 @router.post("/logout")
-async def logout():
+async def logout(request: Request, db: AsyncSession = Depends(get_db)):
+    # Revoca dell'access token: resta invalido fino alla sua scadenza naturale
+    try:
+        await revoke_access_token(db, resolve_principal(request))
+    except TokenValidationError:
+        pass
+
+    refresh_token = request.cookies.get("refresh_token")
+    if refresh_token:
+        await revoke_refresh_token(db, refresh_token)
+
     response = JSONResponse(content={"message": "Successfully logged out"})
     response.delete_cookie("access_token", path="/")
+    response.delete_cookie("refresh_token", path="/auth")
     return response
@@ -29,7 +29,7 @@ async def create_workout(
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Solo i coach possono creare schede")
     return await create_workout_for_coach(
         db=db,
-        coach_id=current_user["user_id"],
+        coach_id=int(current_user["user_id"]),
         workout_data=workout_data
     )
 @router.post("/workouts/assign", response_model=WorkoutOut, status_code=status.HTTP_201_CREATED)
@@ -18,4 +18,12 @@ class ExerciseDifficulty(str, Enum):
 class ExerciseType(str, Enum):
     CARDIO = "cardio"
     STRENGTH = "strength"
-    FLEXIBILITY = "flexibility"
\ No newline at end of file
+    FLEXIBILITY = "flexibility"
+
+class ExerciseSort(str, Enum):
+    RECENT = "recent"
+    NAME = "name"
+
+class FieldSet(str, Enum):
+    SUMMARY = "summary"
+    FULL = "full"
@@ -1,32 +1,46 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
-
-# Import per evitare circular imports
-def get_db():
-    from backend.core.database import get_db as db_session
-    return db_session()
-
-def get_current_active_user():
-    from backend.core.auth_dependencies import get_current_active_user
-    return get_current_active_user()
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from backend.core.database import get_db
+from backend.core.auth_dependencies import get_current_active_user
+from backend.core.collection_versions import EXERCISES, TRAINEE
+from backend.core.pagination import clamp_limit
+from backend.core.response_cache import response_cache
 
 # Import dei modelli e schemi
 from backend.db_models.user_models import User, UserRole
-from backend.schemas.exercise_schemas import ExerciseCreate, ExerciseOut, ExerciseUpdate
+from backend.routers.enums import ExerciseDifficulty, ExerciseSort, FieldSet
+from backend.schemas.exercise_schemas import (
+    ExerciseCreate,
+    ExerciseMuscleQuery,
+    ExerciseOut,
+    ExerciseSearchHit,
+    ExerciseUpdate,
+    MuscleCoverage
+)
+from backend.schemas.pagination import CursorPage
 from backend.services.exercise_service import (
+    EXERCISE_PROFILES,
     create_exercise_for_coach,
+    find_exercises_by_muscles,
+    get_muscle_coverage,
     get_exercises_for_user,
+    search_exercises,
     update_exercise_by_coach,
     delete_exercise_by_coach
 )
 
 router = APIRouter(prefix="/exercises", tags=["Exercises"])
 
+
+def _collection_of(user: User) -> str:
+    # Per gli allievi gli esercizi visibili dipendono dalle schede assegnate: stessa collezione del feed
+    return EXERCISES if user.role == UserRole.COACH else TRAINEE
+
 @router.post("/", response_model=ExerciseOut, status_code=status.HTTP_201_CREATED)
-def create_exercise(
+async def create_exercise(
     exercise_data: ExerciseCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     if current_user.role != UserRole.COACH:
@@ -34,25 +48,141 @@ def create_exercise(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only coaches can create exercises"
         )
-    return create_exercise_for_coach(db=db, exercise_data=exercise_data, coach_id=current_user.id)
+    return await create_exercise_for_coach(db=db, exercise_data=exercise_data, coach_id=current_user.id)
 
-@router.get("/", response_model=List[ExerciseOut])
-def list_exercises(
-    db: Session = Depends(get_db),
+# Lo schema dipende da fields/include: quello documentato è il profilo di default
+@router.get("/", response_model=None, responses={200: {"model": CursorPage[ExerciseOut]}})
+async def list_exercises(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, description="Elementi per pagina (massimo configurato sul server)"),
+    cursor: Optional[str] = Query(None, description="next_cursor della pagina precedente"),
+    difficulty: Optional[ExerciseDifficulty] = Query(None),
+    muscle: Optional[str] = Query(None, min_length=1, max_length=50, description="Muscolo target"),
+    sort: ExerciseSort = Query(ExerciseSort.RECENT),
+    fields: FieldSet = Query(FieldSet.FULL, description="summary: solo id, nome, difficoltà, muscoli e data"),
+    include: Optional[str] = Query(None, description="Relazioni da includere: coach"),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
 ):
     """
-    Ottenere la lista degli esercizi disponibili.
+    Ottenere la lista degli esercizi disponibili, paginata con cursore.
     Per i coach: mostra tutti gli esercizi creati da loro.
     Per gli allievi: mostra gli esercizi assegnati nelle schede attive.
     """
-    return get_exercises_for_user(db=db, user_id=current_user.id, role=current_user.role)
+    profile = EXERCISE_PROFILES.resolve(fields, include)
+
+    async def build():
+        exercises, next_cursor = await get_exercises_for_user(
+            db=db,
+            user_id=current_user.id,
+            role=current_user.role,
+            limit=clamp_limit(limit),
+            cursor=cursor,
+            difficulty=difficulty,
+            muscle=muscle,
+            sort=sort,
+            profile=profile
+        )
+        return profile.page(exercises, next_cursor)
+
+    return await response_cache.respond(
+        request, db, current_user, _collection_of(current_user), build, schema=profile.page_schema
+    )
+
+@router.get("/search", response_model=None, responses={200: {"model": List[ExerciseSearchHit]}})
+async def search(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=200, description="Testo da cercare (le parole sono cercate per prefisso)"),
+    limit: Optional[int] = Query(None, ge=1, description="Numero massimo di risultati"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    """
+    Ricerca full-text su nome, descrizione e muscoli target, ordinata per rilevanza.
+    Stessa visibilità della lista: esercizi del coach o delle schede assegnate all'allievo.
+    """
+
+    async def build():
+        return await search_exercises(
+            db=db,
+            user_id=current_user.id,
+            role=current_user.role,
+            query=q,
+            limit=clamp_limit(limit)
+        )
+
+    return await response_cache.respond(
+        request, db, current_user, _collection_of(current_user), build, schema=List[ExerciseSearchHit]
+    )
+
+def _muscle_list(value: Optional[str]) -> List[str]:
+    return [name for name in (value or "").split(",") if name.strip()]
+
+@router.get("/by-muscles", response_model=None, responses={200: {"model": ExerciseMuscleQuery}})
+async def exercises_by_muscles(
+    request: Request,
+    all_of: Optional[str] = Query(None, alias="all", description="Muscoli tutti richiesti, separati da virgola"),
+    any_of: Optional[str] = Query(None, alias="any", description="Almeno uno di questi muscoli"),
+    none_of: Optional[str] = Query(None, alias="none", description="Nessuno di questi muscoli"),
+    difficulty: Optional[ExerciseDifficulty] = Query(None),
+    limit: Optional[int] = Query(None, ge=1, description="Elementi restituiti"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    """
+    Esercizi del coach per combinazione di muscoli, es. ?all=petto,tricipiti&difficulty=intermediate
+    """
+    if current_user.role != UserRole.COACH:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only coaches can query their exercise library"
+        )
+
+    async def build():
+        total, exercises = await find_exercises_by_muscles(
+            db=db,
+            coach_id=current_user.id,
+            all_of=_muscle_list(all_of),
+            any_of=_muscle_list(any_of),
+            none_of=_muscle_list(none_of),
+            difficulty=difficulty,
+            limit=clamp_limit(limit)
+        )
+        return {"total": total, "items": exercises}
+
+    return await response_cache.respond(
+        request, db, current_user, EXERCISES, build, schema=ExerciseMuscleQuery
+    )
+
+@router.get("/muscles", response_model=None, responses={200: {"model": List[MuscleCoverage]}})
+async def muscle_coverage(
+    request: Request,
+    exercise_id: Optional[List[int]] = Query(None, description="Limita il conteggio a questi esercizi (es. quelli di una scheda)"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    """
+    Copertura muscolare: per ogni muscolo della libreria del coach, quanti esercizi lo allenano.
+    Con exercise_id il conteggio è ristretto a quegli esercizi; 0 indica un muscolo scoperto.
+    """
+    if current_user.role != UserRole.COACH:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only coaches can query their exercise library"
+        )
+
+    async def build():
+        return await get_muscle_coverage(db=db, coach_id=current_user.id, exercise_ids=exercise_id)
+
+    return await response_cache.respond(
+        request, db, current_user, EXERCISES, build, schema=List[MuscleCoverage]
+    )
 
 @router.put("/{exercise_id}", response_model=ExerciseOut)
-def update_exercise(
+async def update_exercise(
     exercise_id: int,
     exercise_data: ExerciseUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
 ):
     if current_user.role != UserRole.COACH:
@@ -60,7 +190,7 @@ def update_exercise(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only coaches can update exercises"
         )
-    return update_exercise_by_coach(
+    return await update_exercise_by_coach(
         db=db,
         exercise_id=exercise_id,
         coach_id=current_user.id,
@@ -68,9 +198,9 @@ def update_exercise(
     )
 
 @router.delete("/{exercise_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_exercise(
+async def delete_exercise(
     exercise_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
 ):
     if current_user.role != UserRole.COACH:
@@ -78,7 +208,7 @@ def delete_exercise(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only coaches can delete exercises"
         )
-    delete_exercise_by_coach(
+    await delete_exercise_by_coach(
         db=db,
         exercise_id=exercise_id,
         coach_id=current_user.id
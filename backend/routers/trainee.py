@@ -1,15 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
+from backend.core.database import get_db
 
-# Import per evitare circular imports
-def get_db():
-    from backend.core.database import get_async_db
-    return get_async_db()
-
-def get_current_active_user():
-    from backend.core.auth_dependencies import get_current_active_user
-    return get_current_active_user()
+from backend.core.auth_dependencies import get_current_active_user
+from backend.core.collection_versions import TRAINEE
+from backend.core.response_cache import response_cache
 
 # Import dei modelli e schemi
 from backend.db_models.user_models import UserRole, User
@@ -19,15 +15,17 @@ from backend.schemas.workout_schemas import (
     WorkoutProgressUpdate
 )
 from backend.services.trainee_service import (
-    get_assigned_workouts,
+    get_trainee_feed,
     get_workout_with_exercises,
     update_workout_progress
 )
 
 router = APIRouter(prefix="/trainees", tags=["Trainees"])
 
-@router.get("/workouts/", response_model=List[WorkoutOut])
+# Il feed è già serializzato: viene restituito così com'è, lo schema serve alla documentazione
+@router.get("/workouts/", response_model=None, responses={200: {"model": List[WorkoutOut]}})
 async def get_my_workouts(
+    request: Request,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
 ):
@@ -37,11 +35,17 @@ async def get_my_workouts(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only trainees can access this endpoint"
         )
-    return await get_assigned_workouts(db=db, trainee_id=current_user.id)
 
-@router.get("/workouts/{workout_id}", response_model=WorkoutWithExercises)
+    async def build():
+        payload = await get_trainee_feed(db=db, trainee_id=current_user.id)
+        return Response(content=payload, media_type="application/json")
+
+    return await response_cache.respond(request, db, current_user, TRAINEE, build)
+
+@router.get("/workouts/{workout_id}", response_model=None, responses={200: {"model": WorkoutWithExercises}})
 async def get_workout_details(
     workout_id: int,
+    request: Request,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
 ):
@@ -51,10 +55,16 @@ async def get_workout_details(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only trainees can access this endpoint"
         )
-    return await get_workout_with_exercises(
-        db=db,
-        workout_id=workout_id,
-        trainee_id=current_user.id
+
+    async def build():
+        return await get_workout_with_exercises(
+            db=db,
+            workout_id=workout_id,
+            trainee_id=current_user.id
+        )
+
+    return await response_cache.respond(
+        request, db, current_user, TRAINEE, build, schema=WorkoutWithExercises
     )
 
 @router.patch("/workouts/{workout_id}/progress", response_model=WorkoutOut)
@@ -1,21 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from backend.db_models.workout import Workout
 from backend.db_models.exercise import Exercise
 from backend.db_models.user_models import User as UserModel
 from backend.core.auth_dependencies import get_current_coach
-
-
-def get_db():
-    from backend.core.database import get_db as db_session
-    return db_session()
+from backend.core.collection_versions import WORKOUTS
+from backend.core.database import get_db
+from backend.core.pagination import clamp_limit
+from backend.core.response_cache import response_cache
+from backend.routers.enums import FieldSet, WorkoutStatus
+from backend.services.coach_service import create_workout_for_coach
+from backend.services.workout_service import WORKOUT_PROFILES, list_workouts_for_coach
 
 
 # Import dei modelli e schemi
 from backend.schemas.schemas import WorkoutCreate, WorkoutOut
+from backend.schemas.pagination import CursorPage
 
 router = APIRouter(prefix="/workouts", tags=["workouts"])
 
@@ -33,45 +36,43 @@ async def create_workout(
             detail="Solo i coach possono creare workout"
         )
 
-    # Crea il workout
-    workout = Workout(
-        name=workout_data.name,
-        description=workout_data.description,
-        status=workout_data.status,
-        coach_id=current_user.id
+    return await create_workout_for_coach(
+        db=db,
+        coach_id=current_user.id,
+        workout_data=workout_data
     )
 
-    db.add(workout)
-    await db.commit()
-    await db.refresh(workout)
-
-    # Associa gli esercizi
-    if workout_data.exercises:
-        exercises = await db.execute(
-            select(Exercise).where(Exercise.id.in_(workout_data.exercises))
-        )
-        exercises = exercises.scalars().all()
-
-        if len(exercises) != len(workout_data.exercises):
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Uno o più esercizi non trovati"
-            )
-
-        workout.exercises.extend(exercises)
-        await db.commit()
-        await db.refresh(workout)
 
-    return workout
-
-
-@router.get("/", response_model=List[WorkoutOut])
+# Lo schema dipende da fields/include: quello documentato è il profilo di default
+@router.get("/", response_model=None, responses={200: {"model": CursorPage[WorkoutOut]}})
 async def list_workouts(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, description="Elementi per pagina (massimo configurato sul server)"),
+    cursor: Optional[str] = Query(None, description="next_cursor della pagina precedente"),
+    status: Optional[WorkoutStatus] = Query(None),
+    name: Optional[str] = Query(None, min_length=1, max_length=100, description="Prefisso del nome"),
+    fields: FieldSet = Query(FieldSet.FULL, description="summary: solo id, nome, stato e data"),
+    include: Optional[str] = Query(None, description="Relazioni da includere: exercises,coach (vuoto per nessuna)"),
     db: AsyncSession = Depends(get_db),
     current_user: UserModel = Depends(get_current_coach)
 ):
     """
-    Lista tutti i workout (solo per coach)
+    Lista paginata dei workout del coach autenticato, più recenti prima
     """
-    result = await db.execute(select(Workout))
-    return result.scalars().all()
\ No newline at end of file
+    profile = WORKOUT_PROFILES.resolve(fields, include)
+
+    async def build():
+        workouts, next_cursor = await list_workouts_for_coach(
+            db=db,
+            coach_id=current_user.id,
+            limit=clamp_limit(limit),
+            cursor=cursor,
+            status=status,
+            name_prefix=name,
+            profile=profile
+        )
+        return profile.page(workouts, next_cursor)
+
+    return await response_cache.respond(
+        request, db, current_user, WORKOUTS, build, schema=profile.page_schema
+    )
@@ -1 +1,9 @@
-from . import exercise_schemas, schemas, user, workout_schemas
\ No newline at end of file
+import importlib
+
+__all__ = ['exercise_schemas', 'schemas', 'user', 'workout_schemas']
+
+
+def __getattr__(name):
+    if name in __all__:
+        return importlib.import_module(f".{name}", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -8,4 +8,7 @@ class Token(BaseModel):
 
 class TokenData(BaseModel):
     email: Optional[str] = None
-    user_id: Optional[int] = None
\ No newline at end of file
+    user_id: Optional[int] = None
+
+class RefreshTokenRequest(BaseModel):
+    refresh_token: Optional[str] = None
@@ -1,7 +1,8 @@
 from __future__ import annotations
 from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
+from backend.routers.enums import ExerciseDifficulty
 
 class ExerciseBase(BaseModel):
     name: str = Field(..., min_length=3, max_length=100)
@@ -18,6 +19,36 @@ class ExerciseUpdate(BaseModel):
     difficulty: Optional[str]  # str temporaneamente
     target_muscles: Optional[str] = Field(None, max_length=200)
 
+class ExerciseSummary(BaseModel):
+    """Riepilogo per le liste (fields=summary): solo colonne, nessuna relazione"""
+    id: int
+    name: str
+    difficulty: ExerciseDifficulty
+    target_muscles: str
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class ExerciseSearchHit(ExerciseSummary):
+    """
+    Risultato di /exercises/search: i campi *_highlight / *_snippet sono HTML
+    (testo escapato, termini trovati racchiusi tra <mark> e </mark>)
+    """
+    name_highlight: str
+    description_snippet: Optional[str]
+    muscles_highlight: str
+    score: float
+
+class ExerciseMuscleQuery(BaseModel):
+    """Risultato di /exercises/by-muscles: totale degli esercizi trovati e prima pagina"""
+    total: int
+    items: List[ExerciseSummary]
+
+class MuscleCoverage(BaseModel):
+    name: str
+    exercises: int
+
 class ExerciseOut(ExerciseBase):
     id: int
     coach_id: int
@@ -28,8 +59,5 @@ class ExerciseOut(ExerciseBase):
         from_attributes = True
 
 
-from backend.routers.enums import ExerciseDifficulty
-
-
 ExerciseBase.__annotations__['difficulty'] = ExerciseDifficulty
 ExerciseUpdate.__annotations__['difficulty'] = ExerciseDifficulty
@@ -97,15 +97,27 @@ class WorkoutUpdate(WorkoutBase):
     description: Optional[str] = Field(None, max_length=500)
     status: Optional[WorkoutStatus]
 
-class WorkoutOut(WorkoutBase):
+class WorkoutSummary(BaseModel):
+    """Riepilogo per le liste (fields=summary): solo colonne, nessuna relazione"""
+    id: int
+    name: str
+    status: WorkoutStatus
+    created_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+class WorkoutFields(WorkoutBase):
+    """Tutte le colonne della scheda, senza relazioni (fields=full&include=)"""
     id: int
     coach_id: int
     created_at: datetime
     updated_at: Optional[datetime]
-    exercises: List[ExerciseOut]
 
     model_config = ConfigDict(from_attributes=True)
 
+class WorkoutOut(WorkoutFields):
+    exercises: List[ExerciseOut]
+
 
 # ASSIGNMENT SCHEMAS
 class WorkoutAssignmentBase(BaseModel):
@@ -60,6 +60,7 @@ class WorkoutWithExercises(WorkoutWithCoach):
 
 
 class WorkoutAssignmentCreate(BaseModel):
+    workout_id: int = Field(..., description="ID della scheda da assegnare")
     trainee_id: int = Field(..., description="ID dell'allievo")
     notes: Optional[str] = Field(
         None,
@@ -98,7 +99,15 @@ class WorkoutProgressUpdate(BaseModel):
 
 
 
+_forward_refs_resolved = False
+
+
 def resolve_forward_refs():
+    """Risolve i riferimenti circolari degli schemi, una sola volta per processo"""
+    global _forward_refs_resolved
+    if _forward_refs_resolved:
+        return
+
     from .exercise_schemas import ExerciseOut
     from .user import UserOut
 
@@ -114,6 +123,7 @@ def resolve_forward_refs():
         'ExerciseOut': ExerciseOut,
         'UserOut': UserOut
     })
+    _forward_refs_resolved = True
 
 
 # Chiamata alla funzione di risoluzione
@@ -1 +1,9 @@
-from . import auth_service, coach_service, exercise_service, trainee_service, workout_service
\ No newline at end of file
+import importlib
+
+__all__ = ['auth_service', 'coach_service', 'exercise_service', 'trainee_service', 'workout_service']
+
+
+def __getattr__(name):
+    if name in __all__:
+        return importlib.import_module(f".{name}", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
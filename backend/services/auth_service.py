@@ -1,20 +1,30 @@
 from typing import TYPE_CHECKING
+from datetime import datetime, timedelta
+import hashlib
+import hmac
+import secrets
+from fastapi import HTTPException, status
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from backend.schemas.auth_schemas import TokenData
-from passlib.context import CryptContext
+from backend.core.config import settings
+from backend.core.logger import logger
+from backend.core.password_hashing import get_password_hash, verify_password as _verify_password
+from backend.core.user_cache import user_cache
+from backend.db_models.refresh_token import RefreshToken
+from backend.db_models.user_models import User as UserModel
 from typing import Optional, Tuple
 
 
 if TYPE_CHECKING:
     from backend.db_models.user import User
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 
 def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+    return get_password_hash(password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return _verify_password(plain_password, hashed_password)
 
 def validate_password_complexity(password: str) -> Tuple[bool, Optional[str]]:
     if len(password) < 8:
@@ -31,11 +41,99 @@ def some_service_function(user: 'User'):
 
 def create_user(email: str, password: str) -> TokenData:
     from backend.core.database import SessionLocal
-    from backend.core.security import get_password_hash
 
     db = SessionLocal()
     try:
         hashed_password = get_password_hash(password)
         return TokenData(email=email)
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+# REFRESH TOKEN
+def hash_refresh_token(token: str) -> str:
+    """HMAC-SHA256 con la SECRET_KEY: i refresh token sono casuali, bcrypt non serve"""
+    return hmac.new(settings.SECRET_KEY.encode(), token.encode(), hashlib.sha256).hexdigest()
+
+
+async def issue_refresh_token(db: AsyncSession, user_id: int, family_id: Optional[str] = None) -> str:
+    token = secrets.token_urlsafe(32)
+    db.add(RefreshToken(
+        user_id=user_id,
+        token_hash=hash_refresh_token(token),
+        family_id=family_id or secrets.token_hex(16),
+        expires_at=datetime.utcnow() + timedelta(seconds=settings.jwt_config["refresh_expire"])
+    ))
+    await db.commit()
+    return token
+
+
+async def revoke_refresh_token_family(db: AsyncSession, family_id: str) -> None:
+    await db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.family_id == family_id, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=datetime.utcnow())
+    )
+    await db.commit()
+
+
+async def rotate_refresh_token(db: AsyncSession, token: str) -> Tuple[UserModel, str]:
+    """
+    Scambia un refresh token valido con uno nuovo della stessa famiglia.
+    Se viene presentato un token già ruotato o revocato (riuso) l'intera
+    famiglia viene revocata e il client deve rifare il login.
+
+    Il token viene "consumato" con un solo UPDATE condizionato su revoked_at IS NULL:
+    tra due rotazioni concorrenti dello stesso token (anche da worker diversi)
+    solo una aggiorna la riga, l'altra è trattata come riuso.
+    """
+    invalid_token = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid refresh token",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    token_hash = hash_refresh_token(token)
+    now = datetime.utcnow()
+
+    claimed = (await db.execute(
+        update(RefreshToken)
+        .where(
+            RefreshToken.token_hash == token_hash,
+            RefreshToken.revoked_at.is_(None),
+            RefreshToken.expires_at > now
+        )
+        .values(revoked_at=now)
+        .returning(RefreshToken.user_id, RefreshToken.family_id)
+        .execution_options(synchronize_session=False)
+    )).first()
+
+    if claimed is None:
+        # Token sconosciuto, scaduto oppure già ruotato/revocato
+        stored = (await db.execute(
+            select(RefreshToken.user_id, RefreshToken.family_id, RefreshToken.revoked_at)
+            .where(RefreshToken.token_hash == token_hash)
+        )).first()
+        if stored is not None and stored.revoked_at is not None:
+            logger.warning(f"Refresh reuse detected for user {stored.user_id}, revoking session family")
+            await revoke_refresh_token_family(db, stored.family_id)
+        raise invalid_token
+
+    user = user_cache.get_by_id(claimed.user_id)
+    if user is None:
+        user = await db.get(UserModel, claimed.user_id)
+        if user is not None:
+            user_cache.put(user)
+    if user is None or not user.is_active:
+        raise invalid_token
+
+    new_token = await issue_refresh_token(db, user.id, claimed.family_id)
+    return user, new_token
+
+
+async def revoke_refresh_token(db: AsyncSession, token: str) -> None:
+    result = await db.execute(
+        select(RefreshToken).where(RefreshToken.token_hash == hash_refresh_token(token))
+    )
+    stored = result.scalar_one_or_none()
+    if stored is not None:
+        await revoke_refresh_token_family(db, stored.family_id)
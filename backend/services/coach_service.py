@@ -1,8 +1,12 @@
 from sqlalchemy.orm import Session
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import HTTPException
+from backend.core.collection_versions import WORKOUTS, bump_versions
+from backend.core.group_commit import run_write
+from backend.core.trainee_feed import refresh_trainee_feeds
 from backend.schemas.workout_schemas import WorkoutCreate
-from backend.db_models.workout import Workout
+from backend.db_models.workout import Workout, WorkoutAssignment
 from backend.db_models.user_models import User, UserRole
 
 
@@ -11,57 +15,70 @@ async def create_workout_for_coach(
     coach_id: int,
     workout_data: WorkoutCreate
 ) -> Workout:
-    # Verificare che l'utente sia un coach
-    result = await db.execute(select(User).where(User.id == coach_id))
-    coach = result.scalars().first()
-
-    if not coach or coach.role != "coach":
-        raise HTTPException(status_code=404, detail="Coach not found")
-
     workout_dict = workout_data.model_dump()
     if 'status' in workout_dict and not hasattr(Workout, 'status'):
         del workout_dict['status']
 
-    # Creare il workout
-    db_workout = Workout(
-        **workout_dict,
-        coach_id=coach_id
-    )
+    async def operation(session: AsyncSession) -> Workout:
+        # Verificare che l'utente sia un coach
+        result = await session.execute(select(User).where(User.id == coach_id))
+        coach = result.scalars().first()
 
-    db.add(db_workout)
-    await db.commit()
-    await db.refresh(db_workout)
+        if not coach or coach.role != "coach":
+            raise HTTPException(status_code=404, detail="Coach not found")
 
-    return db_workout
+        # Creare il workout
+        db_workout = Workout(
+            **workout_dict,
+            coach_id=coach_id
+        )
+        session.add(db_workout)
+        await session.flush()
+        await session.refresh(db_workout)
+        await session.run_sync(bump_versions, WORKOUTS, [coach_id])
+        return db_workout
 
-def assign_workout_to_trainee(db: Session, coach_id: int, workout_id: int, trainee_id: int):
-    # Verifica che la scheda appartenga al coach
-    workout = db.query(Workout).filter(
-        Workout.id == workout_id,
-        Workout.coach_id == coach_id
-    ).first()
-    if not workout:
-        raise HTTPException(status_code=404, detail="Scheda non trovata")
+    return await run_write(db, operation)
 
-    # Verifica che l'utente sia un allievo
-    trainee = db.query(User).filter(
-        User.id == trainee_id,
-        User.role == UserRole.TRAINEE
-    ).first()
-    if not trainee:
-        raise HTTPException(status_code=404, detail="Allievo non valido")
 
-    # Crea l'assegnazione
-    assignment = WorkoutAssignment(
-        workout_id=workout_id,
-        trainee_id=trainee_id
-    )
-    db.add(assignment)
-    db.commit()
-    return workout
+async def assign_workout_to_trainee(db: AsyncSession, coach_id: int, workout_id: int, trainee_id: int) -> Workout:
+
+    async def operation(session: AsyncSession) -> Workout:
+        # Verifica che la scheda appartenga al coach
+        result = await session.execute(
+            select(Workout).where(Workout.id == workout_id, Workout.coach_id == coach_id)
+        )
+        workout = result.scalars().first()
+        if not workout:
+            raise HTTPException(status_code=404, detail="Scheda non trovata")
+
+        # Verifica che l'utente sia un allievo
+        result = await session.execute(
+            select(User.id).where(User.id == trainee_id, User.role == UserRole.TRAINEE)
+        )
+        if result.scalar_one_or_none() is None:
+            raise HTTPException(status_code=404, detail="Allievo non valido")
+
+        result = await session.execute(
+            select(WorkoutAssignment.id).where(
+                WorkoutAssignment.workout_id == workout_id,
+                WorkoutAssignment.user_id == trainee_id
+            )
+        )
+        if result.scalar_one_or_none() is not None:
+            raise HTTPException(status_code=400, detail="Scheda già assegnata all'allievo")
+
+        # Crea l'assegnazione
+        session.add(WorkoutAssignment(workout_id=workout_id, user_id=trainee_id))
+        await session.flush()
+        # Il feed dell'allievo viene riscritto nella stessa transazione
+        await session.run_sync(refresh_trainee_feeds, [trainee_id])
+        return workout
+
+    return await run_write(db, operation)
 
 def get_coach_trainees(db: Session, coach_id: int):
     return db.query(User).filter(
         User.coach_id == coach_id,
         User.role == UserRole.TRAINEE
-    ).all()
\ No newline at end of file
+    ).all()
@@ -1,76 +1,297 @@
-from typing import TYPE_CHECKING, List
-from sqlalchemy.orm import Session
+import html
+import re
+from typing import TYPE_CHECKING, List, Optional, Tuple
+from sqlalchemy import Column, Float, Integer, MetaData, Table, Text, delete, func, insert, literal, literal_column, or_, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException, status
 
-from backend.routers.enums import UserRole
+from backend.core.collection_versions import EXERCISES, WORKOUTS, bump_versions
+from backend.core.loading_profiles import LoadingProfile, LoadingProfiles
+from backend.core.muscle_index import muscle_index, normalize_muscle, replace_exercise_muscles
+from backend.core.pagination import InvalidCursor, db_datetime, decode_cursor, encode_cursor
+from backend.core.search_index import FTS_TABLE
+from backend.core.trainee_feed import refresh_feeds_for_workouts, workouts_with_exercise
+from backend.routers.enums import ExerciseDifficulty, ExerciseSort, UserRole
 
 try:
-    from backend.db_models.exercise import Exercise
+    from backend.db_models.exercise import Exercise, Muscle, exercise_muscles
+    from backend.db_models.workout import WorkoutAssignment, workout_exercises
 except ImportError:
     import sys
     from pathlib import Path
     sys.path.append(str(Path(__file__).parent.parent))
-    from db_models.exercise import Exercise
+    from db_models.exercise import Exercise, Muscle, exercise_muscles
+    from db_models.workout import WorkoutAssignment, workout_exercises
+
+from backend.schemas.exercise_schemas import ExerciseOut, ExerciseSummary
+from backend.schemas.schemas import UserOut
 
 if TYPE_CHECKING:
-    from backend.schemas.exercise import ExerciseCreate, ExerciseUpdate
+    from backend.schemas.exercise_schemas import ExerciseCreate, ExerciseUpdate
+
+# Tabella FTS5 mantenuta da backend.core.search_index: fuori da Base.metadata,
+# create_all non deve crearla come tabella normale
+exercises_fts = Table(
+    FTS_TABLE, MetaData(),
+    Column("rowid", Integer), Column("name", Text), Column("description", Text), Column("target_muscles", Text),
+    Column("rank", Float)
+)
+_SEARCH_TOKEN = re.compile(r"\w+", re.UNICODE)
+HIGHLIGHT_OPEN, HIGHLIGHT_CLOSE = "<mark>", "</mark>"
+# FTS5 racchiude i termini trovati tra segnaposto (caratteri Unicode ad uso privato):
+# il testo, scritto dai coach, viene escapato per l'HTML e solo dopo i
+# segnaposto diventano <mark>...</mark>
+_MARK_OPEN, _MARK_CLOSE = "\ue000", "\ue001"
+
+EXERCISE_PROFILES = LoadingProfiles(
+    Exercise,
+    summary_columns=(
+        Exercise.id, Exercise.name, Exercise.difficulty, Exercise.target_muscles, Exercise.created_at
+    ),
+    summary_schema=ExerciseSummary,
+    full_schema=ExerciseOut,
+    relations={"coach": UserOut}
+)
 
 
-def create_exercise_for_coach(
-        db: Session,
+async def create_exercise_for_coach(
+        db: AsyncSession,
         coach_id: int,
         exercise_data: 'ExerciseCreate'
 ) -> Exercise:
+    # Il ruolo di coach è già verificato dal router sull'utente autenticato:
+    # un solo INSERT ... RETURNING, senza query preliminari
+    result = await db.scalars(
+        insert(Exercise).returning(Exercise),
+        [{**exercise_data.model_dump(), "coach_id": coach_id}]
+    )
+    db_exercise = result.one()
+    muscle_ids = await db.run_sync(replace_exercise_muscles, db_exercise.id, db_exercise.target_muscles)
+    await db.run_sync(bump_versions, EXERCISES, [coach_id])
+    await db.commit()
 
-    from backend.db_models.user_models import User
-    coach = db.query(User).filter(
-        User.id == coach_id,
-        User.role == UserRole.COACH.value
-    ).first()
+    muscle_index.exercise_saved(coach_id, db_exercise.id, muscle_ids, db_exercise.difficulty)
+    return db_exercise
 
-    if not coach:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="User is not a coach or doesn't exist"
-        )
 
-    db_exercise = Exercise(
-        **exercise_data.model_dump(),
-        coach_id=coach_id
+def _visible_exercises(user_id: int, role: UserRole):
+    """Condizione di visibilità: esercizi del coach o presenti nelle schede dell'allievo"""
+    if role == UserRole.COACH:
+        return Exercise.coach_id == user_id
+    # Un solo semi-join, senza DISTINCT sulle righe duplicate da più schede
+    assigned = (
+        select(workout_exercises.c.exercise_id)
+        .join(WorkoutAssignment, WorkoutAssignment.workout_id == workout_exercises.c.workout_id)
+        .where(WorkoutAssignment.user_id == user_id)
     )
+    return Exercise.id.in_(assigned)
 
-    db.add(db_exercise)
-    db.commit()
-    db.refresh(db_exercise)
 
-    return db_exercise
+def _muscle_filter(muscle: str):
+    """Esercizi taggati con il muscolo: lookup su muscles.name e ix_exercise_muscles_muscle"""
+    tagged = (
+        select(exercise_muscles.c.exercise_id)
+        .join(Muscle, Muscle.id == exercise_muscles.c.muscle_id)
+        .where(Muscle.name == normalize_muscle(muscle))
+    )
+    return Exercise.id.in_(tagged)
 
 
-def get_exercises_for_user(
-        db: Session,
+async def get_exercises_for_user(
+        db: AsyncSession,
         user_id: int,
-        role: UserRole
-) -> List[Exercise]:
+        role: UserRole,
+        limit: int,
+        cursor: Optional[str] = None,
+        difficulty: Optional[ExerciseDifficulty] = None,
+        muscle: Optional[str] = None,
+        sort: ExerciseSort = ExerciseSort.RECENT,
+        profile: Optional[LoadingProfile] = None
+) -> Tuple[list, Optional[str]]:
+    """
+    Esercizi visibili all'utente con paginazione keyset. Per i coach ogni
+    combinazione di filtro difficoltà e ordinamento ha il suo indice
+    ix_exercises_coach_*: la pagina è una range scan, senza sort temporanei.
+    """
+    profile = profile or EXERCISE_PROFILES.resolve()
+    query = profile.select().where(_visible_exercises(user_id, role))
 
-    if role == UserRole.COACH:
-        return db.query(Exercise).filter(Exercise.coach_id == user_id).all()
+    if difficulty is not None:
+        query = query.where(Exercise.difficulty == difficulty)
+    if muscle:
+        query = query.where(_muscle_filter(muscle))
+
+    name_key = Exercise.name.collate("NOCASE")
+    if cursor:
+        cursor_sort, key, exercise_id = decode_cursor(cursor, 3)
+        if cursor_sort != sort.value or not isinstance(key, str) or not isinstance(exercise_id, int):
+            raise InvalidCursor()
+        if sort == ExerciseSort.NAME:
+            # Forma esplicita: SQLite non usa l'indice per un row value con COLLATE
+            query = query.where(
+                name_key >= key,
+                or_(name_key > key, Exercise.id > exercise_id)
+            )
+        else:
+            query = query.where(
+                tuple_(Exercise.created_at, Exercise.id) < tuple_(literal(key), literal(exercise_id))
+            )
+
+    if sort == ExerciseSort.NAME:
+        query = query.order_by(name_key, Exercise.id)
     else:
-        return db.query(Exercise).filter(
-            Exercise.is_public == True  # Esempio
-        ).all()
+        query = query.order_by(Exercise.created_at.desc(), Exercise.id.desc())
+
+    result = await db.execute(query.limit(limit + 1))
+    exercises = profile.fetch(result)
+
+    next_cursor = None
+    if len(exercises) > limit:
+        exercises = exercises[:limit]
+        last = exercises[-1]
+        key = last.name if sort == ExerciseSort.NAME else db_datetime(last.created_at)
+        next_cursor = encode_cursor(sort.value, key, last.id)
+    return exercises, next_cursor
+
+
+def _match_expression(query: str) -> Optional[str]:
+    """
+    Testo dell'utente -> espressione MATCH FTS5: ogni parola diventa una frase
+    tra virgolette con ricerca per prefisso ("pan" trova "panca"), in AND.
+    Gli operatori FTS5 nel testo non vengono interpretati.
+    """
+    tokens = _SEARCH_TOKEN.findall(query)
+    if not tokens:
+        return None
+    return " ".join(f'"{token}"*' for token in tokens[:10])
+
 
+def _html_highlight(text: Optional[str]) -> Optional[str]:
+    """Testo marcato da FTS5 -> HTML sicuro: escape del testo, poi i segnaposto diventano <mark>"""
+    if text is None:
+        return None
+    return html.escape(text).replace(_MARK_OPEN, HIGHLIGHT_OPEN).replace(_MARK_CLOSE, HIGHLIGHT_CLOSE)
 
-def update_exercise_by_coach(
-        db: Session,
+
+async def search_exercises(
+        db: AsyncSession,
+        user_id: int,
+        role: UserRole,
+        query: str,
+        limit: int
+) -> list:
+    """
+    Ricerca full-text sugli esercizi visibili all'utente, ordinata per BM25
+    (il nome pesa più dei muscoli, i muscoli più della descrizione; vedi BM25_WEIGHTS).
+    """
+    match = _match_expression(query)
+    if match is None:
+        return []
+
+    fts = literal_column(FTS_TABLE)
+    statement = (
+        select(
+            Exercise.id,
+            Exercise.name,
+            Exercise.difficulty,
+            Exercise.target_muscles,
+            Exercise.created_at,
+            func.highlight(fts, 0, _MARK_OPEN, _MARK_CLOSE).label("name_highlight"),
+            func.snippet(fts, 1, _MARK_OPEN, _MARK_CLOSE, "…", 12).label("description_snippet"),
+            func.highlight(fts, 2, _MARK_OPEN, _MARK_CLOSE).label("muscles_highlight"),
+            (-exercises_fts.c.rank).label("score"),
+        )
+        .select_from(exercises_fts)
+        .join(Exercise, Exercise.id == exercises_fts.c.rowid)
+        .where(fts.op("MATCH")(match), _visible_exercises(user_id, role))
+        .order_by(exercises_fts.c.rank)
+        .limit(limit)
+    )
+    result = await db.execute(statement)
+    return [
+        {
+            **row._mapping,
+            "name_highlight": _html_highlight(row.name_highlight),
+            "description_snippet": _html_highlight(row.description_snippet),
+            "muscles_highlight": _html_highlight(row.muscles_highlight),
+        }
+        for row in result
+    ]
+
+
+async def find_exercises_by_muscles(
+        db: AsyncSession,
+        coach_id: int,
+        all_of: List[str],
+        any_of: List[str],
+        none_of: List[str],
+        difficulty: Optional[ExerciseDifficulty],
+        limit: int
+) -> Tuple[int, list]:
+    """
+    Esercizi del coach per combinazione di muscoli, risolta sull'indice in memoria:
+    il DB legge solo le righe della pagina, per chiave primaria. Più recenti prima.
+    """
+    exercise_ids = await muscle_index.query(
+        db, coach_id,
+        all_of=all_of,
+        any_of=any_of,
+        none_of=none_of,
+        difficulty=difficulty.value if difficulty is not None else None
+    )
+    if not exercise_ids:
+        return 0, []
+
+    page_ids = sorted(exercise_ids, reverse=True)[:limit]
+    result = await db.execute(
+        EXERCISE_PROFILES.summary.select()
+        .where(Exercise.id.in_(page_ids))
+        .order_by(Exercise.id.desc())
+    )
+    return len(exercise_ids), result.all()
+
+
+async def get_muscle_coverage(
+        db: AsyncSession,
+        coach_id: int,
+        exercise_ids: Optional[List[int]] = None
+) -> List[dict]:
+    """Muscoli della libreria del coach con il numero di esercizi (tra quelli indicati) che li allenano"""
+    counts = await muscle_index.coverage(db, coach_id, exercise_ids)
+    return [
+        {"name": name, "exercises": count}
+        for name, count in sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+    ]
+
+
+async def _bump_coach_versions(db: AsyncSession, coach_id: int, workout_ids: List[int]) -> None:
+    # Le schede del coach includono i loro esercizi: cambiano solo se l'esercizio ne faceva parte
+    await db.run_sync(bump_versions, EXERCISES, [coach_id])
+    if workout_ids:
+        await db.run_sync(bump_versions, WORKOUTS, [coach_id])
+
+
+async def update_exercise_by_coach(
+        db: AsyncSession,
         exercise_id: int,
         coach_id: int,
         exercise_data: 'ExerciseUpdate'
 ) -> Exercise:
 
-    exercise = db.query(Exercise).filter(
-        Exercise.id == exercise_id,
-        Exercise.coach_id == coach_id
-    ).first()
+    update_data = exercise_data.model_dump(exclude_unset=True)
+    ownership = (Exercise.id == exercise_id, Exercise.coach_id == coach_id)
+
+    if update_data:
+        result = await db.scalars(
+            update(Exercise)
+            .where(*ownership)
+            .values(**update_data)
+            .returning(Exercise)
+            .execution_options(synchronize_session=False)
+        )
+    else:
+        result = await db.scalars(select(Exercise).where(*ownership))
+    exercise = result.one_or_none()
 
     if not exercise:
         raise HTTPException(
@@ -78,31 +299,52 @@ def update_exercise_by_coach(
             detail="Exercise not found or you don't have permission"
         )
 
-    update_data = exercise_data.model_dump(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(exercise, field, value)
+    muscle_ids = None
+    if "target_muscles" in update_data:
+        muscle_ids = await db.run_sync(replace_exercise_muscles, exercise.id, exercise.target_muscles)
+    elif "difficulty" in update_data:
+        muscle_ids = (await db.scalars(
+            select(exercise_muscles.c.muscle_id).where(exercise_muscles.c.exercise_id == exercise.id)
+        )).all()
+    if update_data:
+        workout_ids = await db.run_sync(workouts_with_exercise, exercise.id)
+        await db.run_sync(refresh_feeds_for_workouts, workout_ids)
+        await _bump_coach_versions(db, coach_id, workout_ids)
+    await db.commit()
 
-    db.commit()
-    db.refresh(exercise)
+    if muscle_ids is not None:
+        muscle_index.exercise_saved(coach_id, exercise.id, muscle_ids, exercise.difficulty)
     return exercise
 
 
-def delete_exercise_by_coach(
-        db: Session,
+async def delete_exercise_by_coach(
+        db: AsyncSession,
         exercise_id: int,
         coach_id: int
 ) -> None:
 
-    exercise = db.query(Exercise).filter(
-        Exercise.id == exercise_id,
-        Exercise.coach_id == coach_id
-    ).first()
+    result = await db.execute(
+        delete(Exercise)
+        .where(Exercise.id == exercise_id, Exercise.coach_id == coach_id)
+        .returning(Exercise.id)
+        .execution_options(synchronize_session=False)
+    )
 
-    if not exercise:
+    if result.scalar_one_or_none() is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Exercise not found or you don't have permission"
         )
 
-    db.delete(exercise)
-    db.commit()
\ No newline at end of file
+    # Stessa transazione: rimuove l'esercizio dalle schede che lo contenevano
+    workout_ids = await db.run_sync(workouts_with_exercise, exercise_id)
+    await db.execute(
+        delete(workout_exercises).where(workout_exercises.c.exercise_id == exercise_id)
+    )
+    await db.execute(
+        delete(exercise_muscles).where(exercise_muscles.c.exercise_id == exercise_id)
+    )
+    await db.run_sync(refresh_feeds_for_workouts, workout_ids)
+    await _bump_coach_versions(db, coach_id, workout_ids)
+    await db.commit()
+    muscle_index.exercise_deleted(coach_id, exercise_id)
@@ -1,28 +1,37 @@
-from datetime import datetime
-from typing import Optional
-from sqlalchemy.orm import Session, joinedload
+from datetime import datetime, time
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
 from fastapi import HTTPException, status
+from backend.core.collection_versions import TRAINEE, bump_versions
+from backend.core.group_commit import run_write
+from backend.db_models.trainee_feed import TraineeFeed
 from backend.db_models.workout import Workout, WorkoutAssignment
+from backend.schemas.workout_schemas import WorkoutProgressUpdate
 
 
-def get_assigned_workouts(db: Session, trainee_id: int) -> list[Workout]:
+async def get_trainee_feed(db: AsyncSession, trainee_id: int) -> str:
+    """
+    Schede assegnate all'allievo come JSON già serializzato: una lettura per
+    chiave primaria su trainee_feeds, senza join né caricamento degli esercizi
+    """
+    payload = await db.scalar(select(TraineeFeed.payload).where(TraineeFeed.trainee_id == trainee_id))
+    # Nessuna riga: all'allievo non è mai stata assegnata una scheda
+    return payload if payload is not None else "[]"
 
-    return db.query(Workout) \
-        .join(WorkoutAssignment) \
-        .filter(WorkoutAssignment.trainee_id == trainee_id) \
-        .all()
 
+async def get_workout_with_exercises(db: AsyncSession, workout_id: int, trainee_id: int) -> Workout:
 
-def get_workout_with_exercises(db: Session, workout_id: int, trainee_id: int) -> Workout:
-
-    workout = db.query(Workout) \
-        .join(WorkoutAssignment) \
-        .options(joinedload(Workout.exercises)) \
-        .filter(
-        Workout.id == workout_id,
-        WorkoutAssignment.trainee_id == trainee_id
-    ) \
-        .first()
+    result = await db.execute(
+        select(Workout)
+        .join(WorkoutAssignment)
+        .options(joinedload(Workout.exercises), joinedload(Workout.coach))
+        .where(
+            Workout.id == workout_id,
+            WorkoutAssignment.user_id == trainee_id
+        )
+    )
+    workout = result.unique().scalars().first()
 
     if not workout:
         raise HTTPException(
@@ -32,23 +41,41 @@ def get_workout_with_exercises(db: Session, workout_id: int, trainee_id: int) ->
     return workout
 
 
-def update_workout_progress(
-        db: Session,
+async def update_workout_progress(
+        db: AsyncSession,
         workout_id: int,
         trainee_id: int,
-        is_completed: bool,
-        exercise_id: Optional[int] = None
-) -> None:
-
-    if exercise_id is not None:
-        pass
-    else:
-        assignment = db.query(WorkoutAssignment).filter(
-            WorkoutAssignment.workout_id == workout_id,
-            WorkoutAssignment.trainee_id == trainee_id
-        ).first()
-
-        if assignment:
-            assignment.is_completed = is_completed
-            assignment.completed_at = datetime.utcnow() if is_completed else None
-            db.commit()
\ No newline at end of file
+        progress_data: WorkoutProgressUpdate
+) -> Workout:
+
+    completed_at = None
+    if progress_data.completed:
+        completed_at = (
+            datetime.combine(progress_data.date_completed, time.min)
+            if progress_data.date_completed else datetime.utcnow()
+        )
+
+    async def operation(session: AsyncSession) -> Workout:
+        result = await session.execute(
+            select(WorkoutAssignment)
+            .options(selectinload(WorkoutAssignment.workout))
+            .where(
+                WorkoutAssignment.workout_id == workout_id,
+                WorkoutAssignment.user_id == trainee_id
+            )
+        )
+        assignment = result.scalars().first()
+
+        if not assignment:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Workout not found or not assigned to you"
+            )
+
+        assignment.is_completed = progress_data.completed
+        assignment.completed_at = completed_at
+        await session.flush()
+        await session.run_sync(bump_versions, TRAINEE, [trainee_id])
+        return assignment.workout
+
+    return await run_write(db, operation)
@@ -0,0 +1,63 @@
+from typing import List, Optional, Tuple
+from sqlalchemy import literal, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.core.loading_profiles import LoadingProfile, LoadingProfiles
+from backend.core.pagination import InvalidCursor, db_datetime, decode_cursor, encode_cursor, escape_like
+from backend.db_models.workout import Workout
+from backend.routers.enums import WorkoutStatus
+from backend.schemas.schemas import ExerciseOut, UserOut, WorkoutFields, WorkoutSummary
+
+# Senza include= la lista mantiene la forma storica di WorkoutOut (con gli esercizi)
+WORKOUT_PROFILES = LoadingProfiles(
+    Workout,
+    summary_columns=(Workout.id, Workout.name, Workout.status, Workout.created_at),
+    summary_schema=WorkoutSummary,
+    full_schema=WorkoutFields,
+    relations={"exercises": List[ExerciseOut], "coach": UserOut},
+    default_include=("exercises",)
+)
+
+
+async def list_workouts_for_coach(
+        db: AsyncSession,
+        coach_id: int,
+        limit: int,
+        cursor: Optional[str] = None,
+        status: Optional[WorkoutStatus] = None,
+        name_prefix: Optional[str] = None,
+        profile: Optional[LoadingProfile] = None
+) -> Tuple[list, Optional[str]]:
+    """
+    Schede del coach, più recenti prima, con paginazione keyset su
+    (created_at, id): ogni pagina è una range scan sugli indici ix_workouts_coach_*,
+    a costo costante qualunque sia la dimensione della tabella.
+    Il profilo decide se leggere solo le colonne di riepilogo o l'entità con le relazioni.
+    """
+    profile = profile or WORKOUT_PROFILES.resolve()
+    query = profile.select().where(Workout.coach_id == coach_id)
+
+    if status is not None:
+        query = query.where(Workout.status == status)
+    if name_prefix:
+        query = query.where(Workout.name.like(escape_like(name_prefix), escape="\\"))
+
+    if cursor:
+        created_at, workout_id = decode_cursor(cursor, 2)
+        if not isinstance(created_at, str) or not isinstance(workout_id, int):
+            raise InvalidCursor()
+        # Confronto come stringa: è il formato in cui SQLite salva created_at
+        query = query.where(
+            tuple_(Workout.created_at, Workout.id) < tuple_(literal(created_at), literal(workout_id))
+        )
+
+    result = await db.execute(
+        query.order_by(Workout.created_at.desc(), Workout.id.desc()).limit(limit + 1)
+    )
+    workouts = profile.fetch(result)
+
+    next_cursor = None
+    if len(workouts) > limit:
+        workouts = workouts[:limit]
+        last = workouts[-1]
+        next_cursor = encode_cursor(db_datetime(last.created_at), last.id)
+    return workouts, next_cursor
@@ -1,11 +1,9 @@
-from passlib.context import CryptContext
+from backend.core.password_hashing import pwd_context
 
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 def hash_password(password: str) -> str:
     """
-    Riceve una password in chiaro e restituisce la versione hashed con bcrypt.
+    Riceve una password in chiaro e restituisce la versione hashed secondo la policy condivisa.
     """
     return pwd_context.hash(password)
 